@@ -0,0 +1,133 @@
+"""Serialization cost of activity listings, before and after the JSON column.
+
+Seeds a throwaway SQLite database and times, per 1k rows:
+
+  before  ORM objects with details as TEXT, json.loads per row,
+          hand-built dicts, jsonable_encoder + json.dumps (FastAPI's default)
+  after   column-projected rows with details as native JSON, orjson.dumps
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_activity_serialization --rows 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Column, DateTime, String, Text, create_engine, insert, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+LegacyBase = declarative_base()
+
+
+class LegacyActivityLogDB(LegacyBase):
+    """activity_logs as it was mapped before details became a JSON column"""
+    __tablename__ = "activity_logs"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String)
+    user_name = Column(String)
+    type = Column(String)
+    description = Column(String)
+    details = Column(Text)
+    ip_address = Column(String)
+    user_agent = Column(String)
+    timestamp = Column(DateTime)
+
+
+def seed(session_factory, table, rows):
+    now = datetime.utcnow()
+    batch = [{
+        "id": str(uuid.uuid4()),
+        "user_id": str(uuid.uuid4()),
+        "user_name": f"Student {i}",
+        "type": "login" if i % 3 else "dashboard_view",
+        "description": f"Student {i} logged in",
+        "details": {"email": f"student{i}@example.edu", "attempt": i % 5},
+        "ip_address": "10.0.0.1",
+        "user_agent": "Mozilla/5.0",
+        "timestamp": now - timedelta(seconds=i),
+    } for i in range(rows)]
+    with session_factory() as session:
+        session.execute(insert(table), batch)
+        session.commit()
+
+
+def legacy_listing(session_factory):
+    with session_factory() as session:
+        started = time.perf_counter()
+        activities = session.scalars(select(LegacyActivityLogDB).order_by(LegacyActivityLogDB.timestamp.desc())).all()
+        data = [{
+            "id": activity.id,
+            "user_id": activity.user_id,
+            "user_name": activity.user_name,
+            "type": activity.type,
+            "description": activity.description,
+            "details": json.loads(activity.details) if activity.details else None,
+            "ip_address": activity.ip_address,
+            "user_agent": activity.user_agent,
+            "timestamp": activity.timestamp,
+        } for activity in activities]
+        fetched = time.perf_counter()
+        body = json.dumps(jsonable_encoder({"activities": data, "total": len(data)})).encode()
+        return fetched - started, time.perf_counter() - fetched, len(body)
+
+
+def projected_listing(session_factory, columns, order_by):
+    with session_factory() as session:
+        started = time.perf_counter()
+        data = [row._asdict() for row in session.execute(select(*columns).order_by(order_by))]
+        fetched = time.perf_counter()
+        body = orjson.dumps({"activities": data, "total": len(data)})
+        return fetched - started, time.perf_counter() - fetched, len(body)
+
+
+def report(name, samples, rows):
+    per_k = 1000 / rows * 1000
+    fetch = statistics.median(sample[0] for sample in samples) * per_k
+    encode = statistics.median(sample[1] for sample in samples) * per_k
+    print(f"{name:<8} fetch+build {fetch:8.2f} ms/1k rows   serialize {encode:8.2f} ms/1k rows   "
+          f"total {fetch + encode:8.2f} ms/1k rows   body {samples[0][2] / 1024:8.1f} KiB")
+    return fetch + encode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        import main as app_main  # imported late so it picks up the throwaway DATABASE_URL
+
+        app_main.run_migrations()
+        session_factory = sessionmaker(bind=app_main.engine)
+        seed(session_factory, app_main.ActivityLogDB, args.rows)
+
+        # The legacy mapping reads the same JSON text back as a plain string
+        legacy_engine = create_engine(os.environ["DATABASE_URL"])
+        legacy_factory = sessionmaker(bind=legacy_engine)
+
+        before = [legacy_listing(legacy_factory) for _ in range(args.repeat)]
+        after = [projected_listing(session_factory, app_main.ACTIVITY_LIST_COLUMNS, app_main.ActivityLogDB.timestamp.desc())
+                 for _ in range(args.repeat)]
+
+        print(f"{args.rows} rows, median of {args.repeat} runs")
+        before_total = report("before", before, args.rows)
+        after_total = report("after", after, args.rows)
+        print(f"speedup  {before_total / after_total:.2f}x")
+
+        legacy_engine.dispose()
+        app_main.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
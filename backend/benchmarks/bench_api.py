@@ -0,0 +1,377 @@
+"""Load test for the main API endpoints, in-process or over real uvicorn.
+
+Seeds a throwaway database, then drives each scenario with a fixed number of
+requests at a fixed concurrency and reports throughput, p50/p95/p99 latency
+and, in-process, the number of SQL statements each request issued. Every
+scenario runs --rounds times and the median of each number is reported, so
+one noisy round does not decide the result. Results are compared with
+baseline.json and the run fails on a regression.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_api                       # 10k users / log rows, in-process
+    python -m benchmarks.bench_api --size 100k --transport uvicorn
+    python -m benchmarks.bench_api --scenarios me,admin_users --requests 2000
+    python -m benchmarks.bench_api --update-baseline     # record this machine's numbers
+
+Baselines are keyed by transport, dataset size, --requests and --concurrency,
+and record the machine they were measured on. Latency and throughput are
+only compared on that machine (name it with --machine or BENCH_MACHINE when
+the hostname is not stable, e.g. in containers); elsewhere only query
+counts and errors, which are deterministic, are checked. A p95 only
+counts as a regression when it is worse by more than --tolerance and by
+more than --min-delta-ms.
+
+Scenarios that hash a password (register, login) run a tenth of --requests.
+--database-url points the run at a dedicated, empty database instead of a
+temporary SQLite file; it is seeded and left in place.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from benchmarks.seed import SEED_PASSWORD, is_active_index, recount_counters, seed_activities, seed_email, seed_users
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+@dataclass
+class Scenario:
+    method: str
+    path: str
+    auth: Optional[str] = None  # "user" or "admin"
+    body: Optional[Callable[[int, int], dict]] = None
+    hashes_password: bool = False
+
+
+SCENARIOS = {
+    "register": Scenario(
+        "POST", "/register", hashes_password=True,
+        body=lambda i, users: {"name": f"Bench {i}", "email": f"bench-{os.getpid()}-{i}@bench.example.edu",
+                               "password": "benchmark-password"}
+    ),
+    "login": Scenario(
+        "POST", "/login", hashes_password=True,
+        body=lambda i, users: login_body(i, users)
+    ),
+    "me": Scenario("GET", "/me", auth="user"),
+    "dashboard": Scenario("GET", "/dashboard", auth="user"),
+    "admin_users": Scenario("GET", "/admin/users?limit=50&sort_by=created_at&sort_order=desc", auth="admin"),
+    "admin_activities": Scenario("GET", "/admin/activities?time_range=24h", auth="admin"),
+}
+
+
+def login_body(i, users):
+    # Spread logins over the seeded users, skipping the deactivated ones
+    index = i * 7919 % users
+    if not is_active_index(index):
+        index = (index + 1) % users
+    return {"email": seed_email(index), "password": SEED_PASSWORD}
+
+
+def machine_fingerprint(name=None):
+    """What latency and throughput depend on; timings are only compared between equal fingerprints"""
+    return {
+        "name": name or platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class QueryCounter:
+    """Counts SQL statements on the request engine (background threads use the sync engine)"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+async def run_scenario(client, name, scenario, requests, concurrency, users, headers, queries=None, first_index=0):
+    # Warm caches and connection pools without counting it
+    for i in range(min(concurrency, requests)):
+        await send(client, scenario, first_index + requests + i, users, headers)
+
+    latencies = []
+    errors = {}
+    next_index = iter(range(first_index, first_index + requests))
+    queries_before = queries.count if queries is not None else None
+
+    async def worker():
+        for i in next_index:
+            started = time.perf_counter()
+            response = await send(client, scenario, i, users, headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "queries_per_request": round((queries.count - queries_before) / requests, 2) if queries is not None else None,
+    }
+
+
+def summarize(rounds):
+    """Median of each number across rounds; errors are summed"""
+    errors = {}
+    for result in rounds:
+        for status, count in result["errors"].items():
+            errors[status] = errors.get(status, 0) + count
+    queries = [result["queries_per_request"] for result in rounds if result["queries_per_request"] is not None]
+    return {
+        "requests": rounds[0]["requests"],
+        "rounds": len(rounds),
+        "errors": errors,
+        **{key: round(statistics.median(result[key] for result in rounds), 2)
+           for key in ("rps", "p50_ms", "p95_ms", "p99_ms")},
+        "queries_per_request": round(statistics.median(queries), 2) if queries else None,
+    }
+
+
+async def run_rounds(client, args, users, headers, scenarios, queries=None):
+    # Rounds interleave the scenarios so a slow stretch on the host is spread across all of them
+    rounds = {name: [] for name in scenarios}
+    for number in range(args.rounds):
+        for name in scenarios:
+            requests = requests_for(name, args)
+            # Each round gets its own request indexes, so registrations use fresh emails
+            rounds[name].append(await run_scenario(client, name, SCENARIOS[name], requests, args.concurrency,
+                                                   users, headers, queries, number * (requests + args.concurrency)))
+    results = {name: summarize(runs) for name, runs in rounds.items()}
+    for name in scenarios:
+        print_result(name, results[name])
+    return results
+
+
+async def send(client, scenario, i, users, headers):
+    kwargs = {"headers": headers.get(scenario.auth, {})}
+    if scenario.body is not None:
+        kwargs["json"] = scenario.body(i, users)
+    return await client.request(scenario.method, scenario.path, **kwargs)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_live(base_url, process, timeout=60.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                if (await client.get("/livez")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not become live in time")
+
+
+async def run(args, app_main, users, headers, scenarios):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    if args.transport == "asgi":
+        queries = QueryCounter(app_main.async_engine.sync_engine)
+        # ASGITransport does not run the lifespan, so start the app's workers here
+        async with app_main.app.router.lifespan_context(app_main.app):
+            transport = httpx.ASGITransport(app=app_main.app, client=("127.0.0.1", 50000))
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+                return await run_rounds(client, args, users, headers, scenarios, queries)
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=os.environ.copy()
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await wait_until_live(base_url, process)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+            return await run_rounds(client, args, users, headers, scenarios)
+    finally:
+        process.terminate()
+        process.wait(30)
+
+
+def requests_for(name, args):
+    return max(10, args.requests // 10) if SCENARIOS[name].hashes_password else args.requests
+
+
+def print_result(name, result):
+    queries = result["queries_per_request"]
+    print(f"{name:<18} {result['requests']:>6} req  {result['rps']:>9.1f} req/s  "
+          f"p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  "
+          f"queries/req {'-' if queries is None else queries:>5}  errors {result['errors'] or '-'}")
+
+
+def compare(results, baseline, tolerance, min_delta_ms, compare_timings=True):
+    """Regressions against the baseline: slower p95, lower throughput, more queries, new errors"""
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if compare_timings:
+            # The band is relative and absolute, so a few ms of jitter on a fast route is not a regression
+            if (result["p95_ms"] > expected["p95_ms"] * (1 + tolerance)
+                    and result["p95_ms"] - expected["p95_ms"] > min_delta_ms):
+                failures.append(f"{name}: p95 {result['p95_ms']} ms > baseline {expected['p95_ms']} ms")
+            if result["rps"] < expected["rps"] * (1 - tolerance):
+                failures.append(f"{name}: {result['rps']} req/s < baseline {expected['rps']} req/s")
+        if (result["queries_per_request"] is not None and expected.get("queries_per_request") is not None
+                and result["queries_per_request"] > expected["queries_per_request"] + 0.05):
+            failures.append(f"{name}: {result['queries_per_request']} queries/request > "
+                            f"baseline {expected['queries_per_request']}")
+        if result["errors"]:
+            failures.append(f"{name}: error responses {result['errors']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SIZES), default="10k", help="seeded users and activity log rows")
+    parser.add_argument("--users", type=int, help="override the number of seeded users")
+    parser.add_argument("--activities", type=int, help="override the number of seeded activity log rows")
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3, help="runs per scenario; the median is reported")
+    parser.add_argument("--database-url", help="dedicated empty database to seed instead of a temporary SQLite file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before failing")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="allowed absolute slowdown before failing, for fast routes where 25%% is jitter")
+    parser.add_argument("--machine", default=os.getenv("BENCH_MACHINE"),
+                        help="name of this benchmark host in the baseline (default: the hostname)")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.rounds < 1:
+        parser.error("--rounds must be at least 1")
+    user_count = args.users if args.users is not None else SIZES[args.size]
+    activity_count = args.activities if args.activities is not None else SIZES[args.size]
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        os.environ["ACTIVITY_ARCHIVE_DIR"] = os.path.join(directory, "archive")
+        # Every request comes from one client address; don't let the login limiter skew results
+        os.environ["LOGIN_RATE_LIMIT_PER_IP"] = "0"
+        os.environ["LOGIN_RATE_LIMIT_PER_EMAIL"] = "0"
+        # Measure hashing throughput rather than how quickly the hash queue sheds load
+        os.environ.setdefault("PASSWORD_HASH_MAX_PENDING", "1000")
+        sys.path.insert(0, BACKEND_DIR)
+        import main as app_main  # imported late so it picks up the settings above
+
+        app_main.prepare_database()
+        print(f"Seeding {user_count} users and {activity_count} activity log rows...")
+        started = time.perf_counter()
+        password_hash = app_main.password_hasher.hash(SEED_PASSWORD)
+        user_ids = seed_users(app_main.engine, app_main.UserDB.__table__, user_count, password_hash)
+        seed_activities(app_main.engine, app_main.ActivityLogDB.__table__, activity_count, user_ids)
+        recount_counters(app_main.engine)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+        admin_email = os.getenv("DEFAULT_ADMIN_EMAIL", "admin@example.com")
+        headers = {
+            "user": {"Authorization": "Bearer " + app_main.create_access_token({"sub": seed_email(1)})},
+            "admin": {"Authorization": "Bearer " + app_main.create_access_token({"sub": admin_email}, is_admin=True)},
+        }
+
+        print(f"transport={args.transport} concurrency={args.concurrency} rounds={args.rounds}")
+        results = asyncio.run(run(args, app_main, user_count, headers, scenarios))
+        app_main.engine.dispose()
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+    # Percentiles of a short run are noisier than those of a long one, so the run size is part of the key
+    key = f"{args.transport}-{user_count}-{activity_count}-{args.requests}x{args.concurrency}"
+    machine = machine_fingerprint(args.machine)
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baselines = json.load(baseline_file)
+    if args.update_baseline:
+        previous = baselines.get(key, {})
+        scenarios_before = previous.get("scenarios", {}) if previous.get("machine") == machine else {}
+        baselines[key] = {
+            "machine": machine,
+            "parameters": {"transport": args.transport, "users": user_count, "activities": activity_count,
+                           "requests": args.requests, "concurrency": args.concurrency, "rounds": args.rounds},
+            "scenarios": {**scenarios_before, **results},
+        }
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"Baseline {key} updated in {args.baseline}")
+        return 0
+    if key not in baselines:
+        print(f"No baseline for {key}; run with --update-baseline to record one")
+        return 0
+
+    baseline = baselines[key]
+    same_machine = baseline.get("machine") == machine
+    if not same_machine:
+        differences = sorted(field for field in machine if baseline.get("machine", {}).get(field) != machine[field])
+        print(f"Baseline {key} was recorded on another machine ({', '.join(differences)} differ); "
+              "checking query counts and errors only")
+    failures = compare(results, baseline["scenarios"], args.tolerance, args.min_delta_ms, same_machine)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if not failures:
+        print(f"No regressions against baseline {key} "
+              f"(tolerance {args.tolerance:.0%} and {args.min_delta_ms:g} ms{'' if same_machine else ', timings skipped'})")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
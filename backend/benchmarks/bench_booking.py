@@ -0,0 +1,162 @@
+"""Booking rush: availability lookups and concurrent reservations.
+
+Seeds a throwaway SQLite database (or --database-url) with counselors and
+bookings covering part of the booking horizon, then times the availability
+index's conflict check and "next free slots" query, and finally sends
+--students simultaneous POST /bookings for a handful of slots through the
+ASGI app. Fails when a lookup's p95 is over --budget-ms or any slot ends
+up with more than one booking.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_booking --counselors 200 --students 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.seed import seed_users
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int((len(ordered) - 1) * q))]
+
+
+def seed_bookings(app_main, counselors, fill, user_ids):
+    """Counselors with ``fill`` of their open slots over the horizon already booked"""
+    rng = random.Random(3)
+    grid, index = app_main.booking_index.grid, app_main.booking_index
+    today = app_main.booking_now().date()
+    counselor_ids = [f"bench-{number}" for number in range(counselors)]
+    rows = []
+    for counselor_id in counselor_ids:
+        for offset in range(1, index.horizon_days):
+            for slot in grid.open_slots():
+                if rng.random() < fill:
+                    rows.append({
+                        "id": str(uuid.uuid4()), "counselor_id": counselor_id, "user_id": rng.choice(user_ids),
+                        "slot_start": grid.start_of(today.toordinal() + offset, slot), "status": "booked",
+                        "session_type": "phone", "urgency": "normal", "created_at": datetime.utcnow(),
+                    })
+    with app_main.engine.begin() as connection:
+        connection.execute(insert(app_main.CounselorDB.__table__), [
+            {"id": counselor_id, "name": f"Counselor {counselor_id}", "is_active": True, "created_at": datetime.utcnow()}
+            for counselor_id in counselor_ids
+        ])
+        for start in range(0, len(rows), 10000):
+            connection.execute(insert(app_main.BookingDB.__table__), rows[start:start + 10000])
+    return counselor_ids, len(rows)
+
+
+def time_lookups(name, lookup, arguments, budget_ms):
+    timings = []
+    for argument in arguments:
+        started = time.perf_counter()
+        lookup(*argument)
+        timings.append((time.perf_counter() - started) * 1000)
+    p95 = percentile(timings, 0.95)
+    print(f"{name:<12} p50 {statistics.median(timings):7.4f} ms   p95 {p95:7.4f} ms"
+          f"{'   OVER BUDGET' if p95 > budget_ms else ''}")
+    return p95 <= budget_ms
+
+
+async def booking_rush(app_main, tokens, slots):
+    import httpx
+
+    async with app_main.app.router.lifespan_context(app_main.app):
+        transport = httpx.ASGITransport(app=app_main.app, client=("127.0.0.1", 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+            async def book(number, token):
+                counselor_id, slot_start = slots[number % len(slots)]
+                response = await client.post(
+                    "/bookings", headers={"Authorization": f"Bearer {token}"},
+                    json={"counselor_id": counselor_id, "slot_start": slot_start.isoformat()}
+                )
+                return response.status_code
+
+            started = time.perf_counter()
+            codes = await asyncio.gather(*(book(number, token) for number, token in enumerate(tokens)))
+            return codes, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counselors", type=int, default=200)
+    parser.add_argument("--fill", type=float, default=0.7, help="share of slots already booked")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--slots", type=int, default=10, help="slots the students compete for")
+    parser.add_argument("--repeat", type=int, default=10000)
+    parser.add_argument("--budget-ms", type=float, default=1.0)
+    parser.add_argument("--database-url", help="benchmark an existing, empty database instead of SQLite")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        import main as app_main  # imported late so it picks up the throwaway DATABASE_URL
+
+        app_main.prepare_database()
+        user_ids = seed_users(app_main.engine, app_main.UserDB.__table__, args.students, "not-a-real-hash")
+        started = time.perf_counter()
+        counselor_ids, booked = seed_bookings(app_main, args.counselors, args.fill, user_ids)
+        index = app_main.booking_index
+        index.refresh(app_main.booking_now().date())
+        print(f"seeded {len(counselor_ids)} counselors with {booked} bookings; index built "
+              f"in {time.perf_counter() - started:.1f} s")
+
+        rng = random.Random(4)
+        now = app_main.booking_now()
+        candidates = [
+            (rng.choice(counselor_ids), index.grid.start_of(now.toordinal() + rng.randrange(1, index.horizon_days),
+                                                           rng.choice(index.grid.open_slots())))
+            for _ in range(args.repeat)
+        ]
+        ok = time_lookups("is_free", index.is_free, candidates, args.budget_ms)
+        ok = time_lookups("next_free", index.next_free,
+                          [(counselor_id, now, 5) for counselor_id, _ in candidates], args.budget_ms) and ok
+
+        # Free slots that every student then tries to book at once
+        slots = []
+        for counselor_id in counselor_ids:
+            slots.extend((counselor_id, slot_start) for slot_start in index.next_free(counselor_id, now, limit=1))
+            if len(slots) >= args.slots:
+                break
+        with app_main.SessionLocal() as session:
+            emails = session.scalars(select(app_main.UserDB.email).where(app_main.UserDB.id.in_(user_ids))).all()
+        tokens = [app_main.create_access_token({"sub": email}, timedelta(minutes=30)) for email in emails]
+        codes, elapsed = asyncio.run(booking_rush(app_main, tokens, slots))
+        print(f"{len(codes)} simultaneous bookings for {len(slots)} slots in {elapsed:.2f} s: "
+              f"{codes.count(201)} booked, {codes.count(409)} conflicts, "
+              f"{len(codes) - codes.count(201) - codes.count(409)} other")
+
+        table = app_main.BookingDB.__table__
+        with app_main.engine.connect() as connection:
+            oversold = connection.execute(
+                select(table.c.counselor_id, table.c.slot_start)
+                .where(table.c.status == "booked")
+                .group_by(table.c.counselor_id, table.c.slot_start)
+                .having(func.count() > 1)
+            ).all()
+        app_main.engine.dispose()
+
+    if oversold or codes.count(201) != len(slots):
+        print(f"FAIL {len(oversold)} slot(s) booked twice, {codes.count(201)} of {len(slots)} slots booked")
+        return 1
+    if not ok:
+        print(f"FAIL lookup p95 over the {args.budget_ms} ms budget")
+        return 1
+    print(f"OK no slot oversold and every lookup within the {args.budget_ms} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
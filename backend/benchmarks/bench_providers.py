@@ -0,0 +1,106 @@
+"""Latency of nearest-provider lookups against a synthetic provider dataset.
+
+Writes --providers random providers spread over India to a temporary CSV,
+loads it the way the application does, checks a sample of k-nearest
+answers against a brute-force scan, then times k-nearest and radius
+queries, including while the dataset is being reloaded. Fails when a p95
+is over --budget-ms or any answer differs from the brute-force one.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_providers --providers 100000
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from services.providers import ProviderDirectory, haversine_km
+
+SPECIALIZATIONS = ["Psychiatrist", "Clinical Psychologist", "Counselor", "General Physician"]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int((len(ordered) - 1) * q))]
+
+
+def write_dataset(path, count):
+    rng = random.Random(1)
+    with open(path, "w", newline="") as dataset:
+        writer = csv.writer(dataset)
+        writer.writerow(["name", "latitude", "longitude", "specialization", "phone"])
+        for index in range(count):
+            writer.writerow([f"Dr. Provider {index}", round(rng.uniform(8.0, 35.0), 6), round(rng.uniform(68.0, 97.0), 6),
+                             rng.choice(SPECIALIZATIONS), f"+91{index:010d}"])
+
+
+def timed(name, query, points, budget_ms):
+    timings = []
+    for lat, lon in points:
+        started = time.perf_counter()
+        query(lat, lon)
+        timings.append((time.perf_counter() - started) * 1000)
+    p95 = percentile(timings, 0.95)
+    print(f"{name:<28} p50 {statistics.median(timings):6.3f} ms   p95 {p95:6.3f} ms"
+          f"{'   OVER BUDGET' if p95 > budget_ms else ''}")
+    return p95 <= budget_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--radius-km", type=float, default=25.0)
+    parser.add_argument("--cell-degrees", type=float, default=0.25)
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "providers.csv")
+        write_dataset(path, args.providers)
+        providers_dir = ProviderDirectory(path, cell_degrees=args.cell_degrees)
+        providers = providers_dir.reload()
+        print(f"loaded {len(providers)} providers in {providers_dir.stats()['last_reload_ms']:.0f} ms")
+
+        rng = random.Random(2)
+        points = [(rng.uniform(6.0, 37.0), rng.uniform(66.0, 99.0)) for _ in range(args.queries)]
+        wrong = 0
+        for lat, lon in points[:200]:
+            distances = haversine_km(math.radians(lat), math.radians(lon), providers.latitudes, providers.longitudes)
+            expected = np.sort(distances)[:args.k]
+            found = [distance for _, distance in providers.nearest(lat, lon, args.k)]
+            wrong += not np.allclose(found, expected)
+        print(f"k-nearest checked against a full scan: {wrong} of 200 differ")
+
+        ok = timed(f"nearest k={args.k}", lambda lat, lon: providers.nearest(lat, lon, args.k), points, args.budget_ms)
+        ok = timed(f"within {args.radius_km:g} km",
+                   lambda lat, lon: providers.within(lat, lon, args.radius_km, limit=100), points, args.budget_ms) and ok
+        ok = timed(f"nearest k={args.k} psychiatrist",
+                   lambda lat, lon: providers.nearest(lat, lon, args.k, specialization="psychiatrist"),
+                   points, args.budget_ms) and ok
+
+        reloading = threading.Thread(target=providers_dir.reload)
+        reloading.start()
+        ok = timed(f"nearest k={args.k} during reload",
+                   lambda lat, lon: providers_dir.current.nearest(lat, lon, args.k), points, args.budget_ms) and ok
+        reloading.join()
+
+    if wrong or not ok:
+        print(f"FAIL {wrong} wrong answer(s) or a p95 over the {args.budget_ms:g} ms budget")
+        return 1
+    print(f"OK every answer exact and every query within the {args.budget_ms:g} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Latency of /admin/search statements against a large activity table.
+
+Seeds a throwaway SQLite database (or --database-url) through the
+application's migrations, so the full-text index and its triggers are the
+real ones, then times the users and activities statements for a mix of
+rare, common and multi-word prefix queries. Fails when the p95 of any
+query is over --budget-ms.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_search --activities 1000000 --users 20000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.seed import seed_activities, seed_users
+
+QUERIES = [
+    "student 12345",   # one user, two terms
+    "stud",            # prefix hitting every row
+    "dashboard",       # common word
+    "profile upd",     # less common two-word prefix
+    "student1234@",    # email prefix
+    "nomatch",         # empty result
+]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int((len(ordered) - 1) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--activities", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    parser.add_argument("--database-url", help="benchmark an existing, empty database instead of SQLite")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        import main as app_main  # imported late so it picks up the throwaway DATABASE_URL
+
+        app_main.run_migrations()
+        search = app_main.full_text_search
+        started = time.perf_counter()
+        user_ids = seed_users(app_main.engine, app_main.UserDB.__table__, args.users, "not-a-real-hash")
+        seed_activities(app_main.engine, app_main.ActivityLogDB.__table__, args.activities, user_ids)
+        print(f"seeded {args.users} users and {args.activities} activities (index maintained by triggers) "
+              f"in {time.perf_counter() - started:.1f} s")
+
+        failed = False
+        with app_main.engine.connect() as connection:
+            for query in QUERIES:
+                terms = app_main.search_terms(query)
+                for kind, build in (("users", search.users), ("activities", search.activities)):
+                    statement = build(terms, args.limit + 1)
+                    connection.execute(statement).all()  # warm the page cache
+                    timings = []
+                    for _ in range(args.repeat):
+                        query_started = time.perf_counter()
+                        hits = len(connection.execute(statement).all())
+                        timings.append((time.perf_counter() - query_started) * 1000)
+                    p95 = percentile(timings, 0.95)
+                    failed = failed or p95 > args.budget_ms
+                    print(f"{query!r:<16} {kind:<10} hits {hits:3d}   p50 {statistics.median(timings):7.2f} ms   "
+                          f"p95 {p95:7.2f} ms{'   OVER BUDGET' if p95 > args.budget_ms else ''}")
+        app_main.engine.dispose()
+
+    if failed:
+        print(f"FAIL p95 over the {args.budget_ms:.0f} ms budget")
+        return 1
+    print(f"OK every query within the {args.budget_ms:.0f} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
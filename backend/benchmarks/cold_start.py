@@ -0,0 +1,137 @@
+"""Cold-start time of the API: module import and process spawn to serving.
+
+Measures, in fresh interpreters against a throwaway SQLite database:
+
+  import    python -c "import main", which must write no files, open no
+            sockets and start no threads or processes
+  first     uvicorn spawn until /readyz answers 200 on an empty database,
+            including migrations and the default admin bootstrap
+  warm      the same on an already prepared database - a normal worker boot
+
+and fails when import has a side effect, or when the median import or warm
+boot exceeds its budget. Nearly all of the import is FastAPI, SQLAlchemy and
+pydantic loading and declaring the routes and models (python -X importtime
+-c "import main" shows the breakdown); the lifespan itself takes a few ms on
+a prepared database. The default budgets sit a third or more above the
+medians measured so far (import 0.5-0.6 s, warm boot 0.7-1.0 s), so they
+catch a real regression rather than noise.
+
+Usage (from backend/):
+
+    python -m benchmarks.cold_start --runs 5 --budget-ms 2000
+"""
+import json
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Runs in the child interpreter: times the import and records what it touched through audit hooks
+IMPORT_PROBE = """
+import json, sys, threading, time
+side_effects = []
+
+def audit(event, args):
+    if event == "open" and isinstance(args[1], str) and any(flag in args[1] for flag in "wax+"):
+        side_effects.append(f"opened {args[0]} for writing")
+    elif event in ("socket.connect", "socket.bind", "subprocess.Popen", "os.fork", "os.mkdir", "sqlite3.connect"):
+        side_effects.append(f"{event} {args[0]!r}")
+
+sys.addaudithook(audit)
+threads = set(threading.enumerate())
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+side_effects.extend(f"started thread {thread.name}" for thread in set(threading.enumerate()) - threads)
+print(json.dumps({"ms": elapsed * 1000, "side_effects": side_effects}))
+"""
+
+
+def time_import(env):
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_boot(env, timeout=60.0):
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("uvicorn did not become ready in time")
+    finally:
+        process.terminate()
+        process.wait(30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("COLD_START_BUDGET_MS", "1500")),
+                        help="median warm boot, spawn to /readyz")
+    parser.add_argument("--import-budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "900")),
+                        help="median import of main")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'cold.db')}",
+            "ACTIVITY_ARCHIVE_DIR": os.path.join(directory, "archive"),
+        }
+        probes = [time_import(env) for _ in range(args.runs)]
+        side_effects = sorted({effect for probe in probes for effect in probe["side_effects"]})
+        if side_effects or os.path.exists(os.path.join(directory, "cold.db")):
+            print("FAIL importing main has side effects:")
+            for effect in side_effects or ["created the database"]:
+                print(f"  {effect}")
+            return 1
+        imports = [probe["ms"] for probe in probes]
+        first = time_boot(env)
+        warm = [time_boot(env) for _ in range(args.runs)]
+
+    print(f"import  median {statistics.median(imports):8.1f} ms   max {max(imports):8.1f} ms")
+    print(f"first   {first:8.1f} ms (migrations + default admin)")
+    print(f"warm    median {statistics.median(warm):8.1f} ms   max {max(warm):8.1f} ms")
+    ok = True
+    for name, samples, budget in (("import", imports, args.import_budget_ms), ("warm boot", warm, args.budget_ms)):
+        median = statistics.median(samples)
+        if median > budget:
+            print(f"FAIL {name} median {median:.0f} ms is over its {budget:.0f} ms budget")
+            ok = False
+        else:
+            print(f"OK {name} median {median:.0f} ms, {1 - median / budget:.0%} under its {budget:.0f} ms budget")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
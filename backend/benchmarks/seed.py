@@ -0,0 +1,94 @@
+"""Bulk-load synthetic users and activity logs for benchmarks.
+
+Every seeded user shares one password hash, so loading a million users costs
+a single bcrypt call. Rows go in with executemany in chunks and the
+dashboard counters are recounted afterwards.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+SEED_PASSWORD = "benchmark-password"
+CHUNK_SIZE = 10000
+ACTIVITY_TYPES = ["login", "login", "dashboard_view", "dashboard_view", "dashboard_view",
+                  "profile_update", "register", "login_failed", "post_create"]
+
+COUNTER_QUERIES = {
+    "users_total": "SELECT COUNT(*) FROM users",
+    "users_active": "SELECT COUNT(*) FROM users WHERE is_active",
+    "admins_total": "SELECT COUNT(*) FROM admins",
+    "activity_logs_total": "SELECT COUNT(*) FROM activity_logs",
+    "dashboard_views_total": "SELECT COUNT(*) FROM activity_logs WHERE type = 'dashboard_view'",
+    "posts_total": "SELECT COUNT(*) FROM activity_logs WHERE type = 'post_create'",
+}
+
+
+def seed_email(index):
+    return f"student{index}@bench.example.edu"
+
+
+def is_active_index(index):
+    return index % 10 != 0
+
+
+def _chunks(count):
+    for start in range(0, count, CHUNK_SIZE):
+        yield range(start, min(start + CHUNK_SIZE, count))
+
+
+def seed_users(engine, table, count, password_hash, now=None):
+    """Insert ``count`` users; returns their ids in insertion order"""
+    now = now or datetime.utcnow()
+    rng = random.Random(1)
+    ids = []
+    with engine.begin() as connection:
+        for chunk in _chunks(count):
+            rows = []
+            for index in chunk:
+                created_at = now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+                rows.append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "name": f"Student {index}",
+                    "email": seed_email(index),
+                    "password_hash": password_hash,
+                    "is_active": is_active_index(index),
+                    "created_at": created_at,
+                    "last_login": created_at + timedelta(hours=rng.randint(0, 72)) if index % 3 else None,
+                })
+            connection.execute(insert(table), rows)
+            ids.extend(row["id"] for row in rows)
+    return ids
+
+
+def seed_activities(engine, table, count, user_ids, now=None, days=7):
+    """Insert ``count`` activity rows spread over the last ``days`` days"""
+    now = now or datetime.utcnow()
+    rng = random.Random(2)
+    with engine.begin() as connection:
+        for chunk in _chunks(count):
+            rows = []
+            for index in chunk:
+                user_index = rng.randrange(len(user_ids)) if user_ids else None
+                activity_type = rng.choice(ACTIVITY_TYPES)
+                rows.append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "user_id": user_ids[user_index] if user_ids else None,
+                    "user_name": f"Student {user_index}",
+                    "type": activity_type,
+                    "description": f"Student {user_index} {activity_type.replace('_', ' ')}",
+                    "details": {"email": seed_email(user_index), "seq": index},
+                    "ip_address": f"10.0.{index % 256}.{rng.randint(1, 254)}",
+                    "user_agent": "benchmark",
+                    "timestamp": now - timedelta(seconds=rng.randint(0, days * 24 * 3600)),
+                })
+            connection.execute(insert(table), rows)
+
+
+def recount_counters(engine):
+    with engine.begin() as connection:
+        for name, query in COUNTER_QUERIES.items():
+            connection.execute(
+                text(f"UPDATE stat_counters SET value = ({query}) WHERE name = :name"), {"name": name}
+            )
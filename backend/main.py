@@ -1,20 +1,57 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Request
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, status, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy import create_engine, Column, String, Boolean, DateTime, Text, Integer
-from sqlalchemy.orm import declarative_base, sessionmaker, Session
-from pydantic import BaseModel, EmailStr
-from passlib.context import CryptContext
+from sqlalchemy import create_engine, event, select, update, delete, func, and_, or_, text, Column, Index, String, Boolean, DateTime, Text, Integer, BigInteger, Float, LargeBinary, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base, sessionmaker
+from pydantic import BaseModel, EmailStr, Field
 from jose import JWTError, jwt
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+from typing import Dict, List, Literal, Optional
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import uuid
 import json
+import hashlib
+import secrets
 import os
+import time
+import base64
+import asyncio
+import csv
+import io
+import math
+import logging
+import orjson
+import tempfile
+
+from services.password_hashing import PasswordHasher, HashQueueFull
+from services.batch_writer import BatchWriter
+from services.principal_cache import Principal, PrincipalCache
+from services.stats_counters import SharedGeneration, StatsCounters
+from services.activity_archive import ActivityArchive
+from services.activity_feed import ActivityFeed
+from services.rate_limiter import RateLimiter, RedisRateLimitStore
+from services.metrics import Metrics, MetricsMiddleware, metric_family
+from services.startup import deployment_lock, schema_is_current, upgrade_schema
+from services.roster_import import RosterImporter, ROSTER_FORMATS
+from services.search import FullTextSearch, SearchUnavailable, search_terms
+from services.scheduler import PriorityScheduler, PriorityMiddleware, current_priority, route_classifier
+from services.assessments import Questionnaire, CohortReport, SEVERITY_BANDS
+from services.booking import AvailabilityIndex, SlotGrid
+from services.providers import ProviderDirectory, ProviderDatasetError
+from services.group_chat import GroupChat, RoomMember, auth_token
+from services.http_cache import CompressionMiddleware, ResponseCache, PRIVATE_REVALIDATE, entity_etag, etag_matches, not_modified
 
 # Load environment variables
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
@@ -24,17 +61,165 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 24 * 60  # 24 hours
 
 # Database Configuration
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./users.db")
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {})
+if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
+    SQLALCHEMY_DATABASE_URL = "postgresql://" + SQLALCHEMY_DATABASE_URL[len("postgres://"):]
+
+def to_async_database_url(url: str) -> str:
+    """Swap the driver of a sync DATABASE_URL for its asyncio counterpart"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    return url
+
+# Connection pools are per worker process: workers x (pool size + overflow) must fit the database's connection limit
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+DB_BACKGROUND_POOL_SIZE = int(os.getenv("DB_BACKGROUND_POOL_SIZE", "3"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+IS_SQLITE = make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() == "sqlite"
+IS_SQLITE_MEMORY = IS_SQLITE and make_url(SQLALCHEMY_DATABASE_URL).database in (None, "", ":memory:")
+
+def pool_options(pool_size: int, max_overflow: int) -> dict:
+    # In-memory SQLite is one connection per thread and takes no pool sizing
+    if IS_SQLITE_MEMORY:
+        return {}
+    return {"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": DB_POOL_TIMEOUT_SECONDS}
+
+# Request handlers use the async engine; the sync engine serves startup tasks and background threads
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **pool_options(DB_BACKGROUND_POOL_SIZE, DB_BACKGROUND_POOL_SIZE)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(
+    to_async_database_url(SQLALCHEMY_DATABASE_URL),
+    # aiosqlite defaults to NullPool, which reopens the file (and reruns the PRAGMAs) for every request
+    **({"poolclass": AsyncAdaptedQueuePool} if IS_SQLITE and not IS_SQLITE_MEMORY else {}),
+    **pool_options(DB_POOL_SIZE, DB_MAX_OVERFLOW)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Crisis-help requests get their own small pool so a saturated request pool never makes them wait
+CRISIS_DB_POOL_SIZE = int(os.getenv("CRISIS_DB_POOL_SIZE", "2"))
+crisis_async_engine = async_engine if IS_SQLITE_MEMORY else create_async_engine(
+    to_async_database_url(SQLALCHEMY_DATABASE_URL),
+    **({"poolclass": AsyncAdaptedQueuePool} if IS_SQLITE else {}),
+    **pool_options(CRISIS_DB_POOL_SIZE, CRISIS_DB_POOL_SIZE)
+)
+CrisisSessionLocal = async_sessionmaker(crisis_async_engine, autoflush=False, expire_on_commit=False)
+
+# Several worker processes share one SQLite file: WAL lets readers run alongside the writer,
+# and busy_timeout makes a blocked writer wait instead of failing with "database is locked"
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+if IS_SQLITE:
+    event.listen(engine, "connect", configure_sqlite_connection)
+    event.listen(async_engine.sync_engine, "connect", configure_sqlite_connection)
+    if crisis_async_engine is not async_engine:
+        event.listen(crisis_async_engine.sync_engine, "connect", configure_sqlite_connection)
 Base = declarative_base()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Prometheus metrics - request latency, SQL statements per route and bcrypt timings
+metrics = Metrics(n_plus_one_threshold=int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", "10")))
+metrics.instrument_engine(async_engine.sync_engine)
+metrics.instrument_engine(engine)
+if crisis_async_engine is not async_engine:
+    metrics.instrument_engine(crisis_async_engine.sync_engine)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Request scheduling - crisis help has reserved slots, bulk work is capped and shed first under load
+request_scheduler = PriorityScheduler(
+    max_concurrency=int(os.getenv("REQUEST_MAX_CONCURRENCY", "64")),
+    reserved=int(os.getenv("CRISIS_RESERVED_SLOTS", "8")),
+    bulk_concurrency=int(os.getenv("BULK_MAX_CONCURRENCY", "4")),
+    bulk_queue=int(os.getenv("BULK_MAX_QUEUE", "16")),
+    interactive_timeout=float(os.getenv("INTERACTIVE_QUEUE_TIMEOUT_SECONDS", "10")),
+    bulk_timeout=float(os.getenv("BULK_QUEUE_TIMEOUT_SECONDS", "5")),
+    observer=metrics.observe_queue_wait
+)
+classify_request = route_classifier([
+    ("crisis", None, "/crisis/*"),
+    # Probes and long-lived streams are never queued
+    (None, None, "/livez"),
+    (None, None, "/readyz"),
+    (None, None, "/health"),
+    (None, None, "/metrics"),
+    (None, None, "/admin/activities/stream"),
+    ("bulk", None, "/admin/activities/export"),
+    ("bulk", ("POST",), "/admin/users/import"),
+    ("bulk", ("GET",), "/admin/users"),
+    ("bulk", ("GET",), "/admin/activities"),
+    ("bulk", ("GET",), "/admin/dashboard"),
+    ("bulk", ("GET",), "/admin/search"),
+    ("bulk", ("GET",), "/admin/assessments/cohorts"),
+])
+
+# Password hashing - bcrypt runs on a bounded process pool so logins use every core
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1)),
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "0")) or None,
+    observer=metrics.observe_password_hash
+)
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+# Login attempts are rate limited per client IP and per target email before any bcrypt work
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+rate_limit_store = RedisRateLimitStore(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else None
+LOGIN_RATE_LIMIT_WINDOW_SECONDS = float(os.getenv("LOGIN_RATE_LIMIT_WINDOW_SECONDS", "60"))
+login_ip_limiter = RateLimiter(
+    limit=int(os.getenv("LOGIN_RATE_LIMIT_PER_IP", "30")),
+    period=LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    max_keys=int(os.getenv("LOGIN_RATE_LIMIT_MAX_KEYS", "100000")),
+    store=rate_limit_store,
+    name="login-ip"
+)
+login_email_limiter = RateLimiter(
+    limit=int(os.getenv("LOGIN_RATE_LIMIT_PER_EMAIL", "5")),
+    period=LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    max_keys=int(os.getenv("LOGIN_RATE_LIMIT_MAX_KEYS", "100000")),
+    store=rate_limit_store,
+    name="login-email"
+)
 security = HTTPBearer()
+# EventSource cannot send headers, so streaming endpoints also accept a single-use ?ticket=
+optional_security = HTTPBearer(auto_error=False)
+
+# Admin user listings are cached as encoded pages; every route that changes a user's listed
+# details invalidates them, and bumps the shared listing generation (below) that is part of
+# every cache key, so other workers stop serving the old pages too. Logins do neither:
+# last_login may lag by up to the TTL rather than every login emptying the cache
+admin_user_listing_cache = ResponseCache(
+    max_entries=int(os.getenv("ADMIN_LISTING_CACHE_ENTRIES", "256")),
+    ttl=float(os.getenv("ADMIN_LISTING_CACHE_SECONDS", "30"))
+)
+
+# Authenticated principals are cached by token subject to skip the per-request user lookup.
+# invalidate() only reaches this process, so writes that change a user also bump the shared
+# principal generation (below); with several workers a change made through one reaches the
+# others within PRINCIPAL_CACHE_GENERATION_POLL_SECONDS instead of the TTL
+principal_cache = PrincipalCache(
+    max_entries=int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+)
 
 # Database Models
 class UserDB(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # id breaks ties for keyset pagination of the admin user listing
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_last_login_id", "last_login", "id"),
+    )
     
     id = Column(String, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -43,6 +228,8 @@ class UserDB(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     last_login = Column(DateTime, nullable=True)
+    department = Column(String, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on every write, feeds the ETags
 
 class AdminDB(Base):
     __tablename__ = "admins"
@@ -53,52 +240,300 @@ class AdminDB(Base):
     password_hash = Column(String)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
 class ActivityLogDB(Base):
     __tablename__ = "activity_logs"
+    __table_args__ = (
+        Index("ix_activity_logs_timestamp", "timestamp"),
+        Index("ix_activity_logs_type_timestamp", "type", "timestamp"),
+        Index("ix_activity_logs_user_id_timestamp", "user_id", "timestamp"),
+    )
     
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, nullable=True)
     user_name = Column(String, nullable=True)
-    type = Column(String, index=True)  # login, logout, register, post_create, etc.
+    type = Column(String)  # login, logout, register, post_create, etc.
     description = Column(String)
-    details = Column(Text, nullable=True)  # JSON string for additional details
+    details = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)  # Additional details
     ip_address = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+class StatCounterDB(Base):
+    __tablename__ = "stat_counters"
+    
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+class AssessmentDB(Base):
+    __tablename__ = "assessments"
+    __table_args__ = (
+        Index("ix_assessments_submitted_at", "submitted_at"),
+        Index("ix_assessments_user_id_submitted_at", "user_id", "submitted_at"),
+    )
+    
+    id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False)
+    department = Column(String, nullable=True)  # the student's department when they submitted
+    questionnaire = Column(String, nullable=False)
+    answers = Column(LargeBinary, nullable=False)  # one byte per question, in questionnaire order
+    score = Column(Float, nullable=False)
+    severity = Column(String, nullable=False)
+    submitted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class CounselorDB(Base):
+    __tablename__ = "counselors"
+    
+    id = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    specialization = Column(String, nullable=True)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class BookingDB(Base):
+    __tablename__ = "bookings"
+    __table_args__ = (
+        # At most one active booking per slot - this is what stops double-booking
+        Index("uq_bookings_counselor_id_slot_start", "counselor_id", "slot_start", unique=True,
+              sqlite_where=text("status = 'booked'"), postgresql_where=text("status = 'booked'")),
+        Index("ix_bookings_slot_start", "slot_start"),
+        Index("ix_bookings_user_id_slot_start", "user_id", "slot_start"),
+    )
+    
+    id = Column(String, primary_key=True)
+    counselor_id = Column(String, nullable=False)
+    user_id = Column(String, nullable=False)
+    slot_start = Column(DateTime, nullable=False)  # wall-clock time in BOOKING_TIMEZONE
+    status = Column(String, nullable=False, default="booked")  # booked, cancelled
+    session_type = Column(String, nullable=False)
+    reason = Column(String, nullable=True)
+    urgency = Column(String, nullable=False, default="normal")
+    notes = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    cancelled_at = Column(DateTime, nullable=True)
+
+class SupportGroupDB(Base):
+    __tablename__ = "support_groups"
+    
+    id = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    category = Column(String, nullable=True)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class GroupMemberDB(Base):
+    __tablename__ = "group_members"
+    __table_args__ = (
+        Index("ix_group_members_user_id", "user_id"),
+    )
+    
+    group_id = Column(String, primary_key=True)
+    user_id = Column(String, primary_key=True)
+    joined_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class GroupMessageDB(Base):
+    __tablename__ = "group_messages"
+    __table_args__ = (
+        Index("ix_group_messages_group_id_sent_at", "group_id", "sent_at"),
+    )
+    
+    id = Column(String, primary_key=True)
+    group_id = Column(String, nullable=False)
+    user_id = Column(String, nullable=False)
+    user_name = Column(String, nullable=True)
+    body = Column(Text, nullable=False)
+    sent_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class ImportJobDB(Base):
+    __tablename__ = "import_jobs"
+    __table_args__ = (
+        Index("ix_import_jobs_created_at", "created_at"),
+    )
+    
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False)  # queued, running, completed, failed, interrupted
+    format = Column(String, nullable=False)
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    total_rows = Column(Integer, nullable=True)
+    processed_rows = Column(Integer, nullable=False, default=0)
+    created_count = Column(Integer, nullable=False, default=0)
+    duplicate_count = Column(Integer, nullable=False, default=0)
+    invalid_count = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)  # first skipped rows and why
+    heartbeat_at = Column(DateTime, nullable=True)  # refreshed by the worker that owns the job until it ends
+    spool_path = Column(String, nullable=True)
+
+class StreamTicketDB(Base):
+    __tablename__ = "stream_tickets"
+    
+    id = Column(String, primary_key=True)  # SHA-256 of the ticket, which is only ever sent to the admin
+    admin_id = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+# Bring the schema up to date - migrations live in migrations/versions and run
+# from the lifespan handler, so importing this module touches no database
+def alembic_config():
+    from alembic.config import Config as AlembicConfig  # deferred: alembic is only needed at startup
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    config = AlembicConfig(os.path.join(backend_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(backend_dir, "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+def run_migrations():
+    """Upgrade to head unless the database is already there; returns True if this process migrated"""
+    versions_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations", "versions")
+    if schema_is_current(engine, versions_dir):
+        return False  # the common case - checked without importing alembic
+    return upgrade_schema(engine, alembic_config())
+
+# Dashboard and health counts are maintained incrementally instead of counted per request
+stats_counters = StatsCounters(
+    SessionLocal, StatCounterDB,
+    refresh_interval=float(os.getenv("STATS_REFRESH_INTERVAL_SECONDS", "5"))
+)
+
+# Tags cached user principals; admins are not changed through the API
+principal_generation = SharedGeneration(
+    StatCounterDB, "principals_generation",
+    poll_interval=float(os.getenv("PRINCIPAL_CACHE_GENERATION_POLL_SECONDS", "1"))
+)
+
+# Part of every admin user listing cache key; read on each listing request
+user_listing_generation = SharedGeneration(StatCounterDB, "user_listing_generation")
+
+def activity_counter_deltas(session, rows):
+    deltas = {"activity_logs_total": len(rows)}
+    for row in rows:
+        if row["type"] == "dashboard_view":
+            deltas["dashboard_views_total"] = deltas.get("dashboard_views_total", 0) + 1
+        elif row["type"] == "post_create":
+            deltas["posts_total"] = deltas.get("posts_total", 0) + 1
+    stats_counters.incr_sync(session, deltas)
+
+# Activity logs are buffered and bulk-inserted by a background writer
+activity_log_writer = BatchWriter(
+    SessionLocal, ActivityLogDB,
+    on_flush=activity_counter_deltas,
+    max_batch=int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", "500")),
+    flush_interval=int(os.getenv("ACTIVITY_LOG_FLUSH_INTERVAL_MS", "200")) / 1000,
+    max_buffer=int(os.getenv("ACTIVITY_LOG_MAX_BUFFER", "10000")),
+    overflow_policy=os.getenv("ACTIVITY_LOG_OVERFLOW_POLICY", "drop")
+)
+
+# Activity logs older than the retention window are moved to compressed per-day archives
+activity_archive = ActivityArchive(
+    os.getenv("ACTIVITY_ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive")),
+    SessionLocal, ActivityLogDB,
+    retention_days=int(os.getenv("ACTIVITY_RETENTION_DAYS", "90")),
+    batch_size=int(os.getenv("ACTIVITY_ARCHIVE_BATCH_SIZE", "5000")),
+    interval=float(os.getenv("ACTIVITY_ARCHIVE_INTERVAL_SECONDS", "3600")),
+    # activity_logs_total counts hot rows; the dashboard's post and view totals keep archived ones
+    on_archive=lambda session, rows: stats_counters.incr_sync(session, {"activity_logs_total": -len(rows)})
+)
+# Archive reads with no lower time bound stop after this many daily segments
+ACTIVITY_ARCHIVE_LOOKBACK_DAYS = int(os.getenv("ACTIVITY_ARCHIVE_LOOKBACK_DAYS", "365"))
+
+# Bulk roster imports run in the background; uploads are spooled to disk first
+ROSTER_IMPORT_HEARTBEAT_SECONDS = float(os.getenv("ROSTER_IMPORT_HEARTBEAT_SECONDS", "30"))
+roster_importer = RosterImporter(
+    SessionLocal, UserDB, ImportJobDB, password_hasher, stats_counters,
+    chunk_size=int(os.getenv("ROSTER_IMPORT_CHUNK_SIZE", "1000")),
+    # A job whose worker has missed four heartbeats is interrupted by the next worker to start
+    heartbeat_interval=ROSTER_IMPORT_HEARTBEAT_SECONDS,
+    stale_after=4 * ROSTER_IMPORT_HEARTBEAT_SECONDS
+)
+# Wellness check - the same eight 1-5 questions as the frontend; stress and anxiety are reverse-keyed
+wellness_questionnaire = Questionnaire(
+    "wellness-v1",
+    ["mood", "energy", "sleep", "stress", "anxiety", "social", "coping", "motivation"],
+    reverse_keyed={"stress", "anxiety"}
+)
+cohort_report = CohortReport(
+    SessionLocal, AssessmentDB, wellness_questionnaire,
+    max_weeks=int(os.getenv("ASSESSMENT_REPORT_WEEKS", "52")),
+    ttl=float(os.getenv("ASSESSMENT_REPORT_CACHE_SECONDS", "5"))
+)
+
+# Counselor bookings - free slots are answered from an in-memory bitset index per counselor per day
+BOOKING_TIMEZONE = ZoneInfo(os.getenv("BOOKING_TIMEZONE", "UTC"))
+booking_index = AvailabilityIndex(
+    SessionLocal, BookingDB, CounselorDB,
+    SlotGrid(
+        slot_minutes=int(os.getenv("BOOKING_SLOT_MINUTES", "60")),
+        hours=os.getenv("BOOKING_HOURS", "09:00-12:00,14:00-18:00")
+    ),
+    horizon_days=int(os.getenv("BOOKING_HORIZON_DAYS", "60")),
+    ttl=float(os.getenv("BOOKING_INDEX_REFRESH_SECONDS", "5"))
+)
+
+# Nearest-provider lookups are served from a locally loaded dataset (CSV or NDJSON with name, latitude, longitude)
+provider_directory = ProviderDirectory(
+    os.getenv("PROVIDERS_DATASET_PATH") or None,
+    cell_degrees=float(os.getenv("PROVIDERS_GRID_DEGREES", "0.25"))
+)
+
+# Peer-support group chat - rooms fan out in memory, messages are written in batches
+group_message_writer = BatchWriter(
+    SessionLocal, GroupMessageDB,
+    max_batch=int(os.getenv("GROUP_MESSAGE_BATCH_SIZE", "200")),
+    flush_interval=int(os.getenv("GROUP_MESSAGE_FLUSH_INTERVAL_MS", "500")) / 1000,
+    max_buffer=int(os.getenv("GROUP_MESSAGE_MAX_BUFFER", "10000"))
+)
+group_chat = GroupChat(
+    history_size=int(os.getenv("GROUP_CHAT_HISTORY_SIZE", "100")),
+    queue_size=int(os.getenv("GROUP_CHAT_QUEUE_SIZE", "64")),
+    on_message=group_message_writer.submit
+)
+GROUP_MESSAGE_MAX_LENGTH = int(os.getenv("GROUP_MESSAGE_MAX_LENGTH", "2000"))
+GROUP_CHAT_AUTH_TIMEOUT_SECONDS = float(os.getenv("GROUP_CHAT_AUTH_TIMEOUT_SECONDS", "10"))
+
+ROSTER_IMPORT_MAX_BYTES = int(os.getenv("ROSTER_IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+ROSTER_IMPORT_DIR = os.getenv("ROSTER_IMPORT_DIR") or None  # system temp directory by default
 
 # Create default admin user if doesn't exist
+def default_admin_exists(admin_email: str) -> bool:
+    with SessionLocal() as db:
+        return db.scalar(select(AdminDB.id).where(AdminDB.email == admin_email)) is not None
+
 def create_default_admin():
-    db = SessionLocal()
-    try:
-        # Get admin credentials from environment variables
-        admin_email = os.getenv("DEFAULT_ADMIN_EMAIL", "admin@example.com")
-        admin_password = os.getenv("DEFAULT_ADMIN_PASSWORD", "#Admin@123")
-        admin_name = os.getenv("DEFAULT_ADMIN_NAME", "System Admin")
-        
-        admin = db.query(AdminDB).filter(AdminDB.email == admin_email).first()
-        if not admin:
-            hashed_password = pwd_context.hash(admin_password)
+    """Create the default admin once; safe to call from every worker at once"""
+    # Get admin credentials from environment variables
+    admin_email = os.getenv("DEFAULT_ADMIN_EMAIL", "admin@example.com")
+    admin_password = os.getenv("DEFAULT_ADMIN_PASSWORD", "#Admin@123")
+    admin_name = os.getenv("DEFAULT_ADMIN_NAME", "System Admin")
+    
+    # Cheap check first so a restart with an existing admin skips the lock and the bcrypt hash
+    if default_admin_exists(admin_email):
+        return False
+    with deployment_lock(engine, "default-admin"):
+        if default_admin_exists(admin_email):
+            return False
+        db = SessionLocal()
+        try:
             admin = AdminDB(
                 id=str(uuid.uuid4()),
                 name=admin_name,
                 email=admin_email,
-                password_hash=hashed_password
+                password_hash=password_hasher.hash(admin_password)
             )
             db.add(admin)
+            stats_counters.incr_sync(db, {"admins_total": 1})
             db.commit()
-            print(f"Default admin created with email: {admin_email}")
-        else:
-            print(f"Admin already exists with email: {admin_email}")
-    except Exception as e:
-        print(f"Error creating default admin: {e}")
-    finally:
-        db.close()
-
-create_default_admin()
+        except IntegrityError:
+            # Created concurrently by a process the lock does not cover
+            db.rollback()
+            return False
+        finally:
+            db.close()
+    logger.info("Default admin created with email: %s", admin_email)
+    return True
 
 # Pydantic Models
 class UserCreate(BaseModel):
@@ -106,6 +541,21 @@ class UserCreate(BaseModel):
     email: EmailStr
     password: str
 
+class CrisisHelpRequest(BaseModel):
+    crisis_type: Literal["suicide", "anxiety", "abuse", "substance", "eating", "general"] = "general"
+    message: Optional[str] = Field(None, max_length=2000)
+
+class AssessmentSubmission(BaseModel):
+    responses: Dict[str, int]
+
+class BookingCreate(BaseModel):
+    counselor_id: str
+    slot_start: datetime  # a naive time is read as BOOKING_TIMEZONE wall-clock time
+    session_type: Literal["phone", "video", "in-person"] = "phone"
+    reason: Optional[str] = Field(None, max_length=100)
+    urgency: Literal["low", "normal", "high"] = "normal"
+    notes: Optional[str] = Field(None, max_length=2000)
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -135,6 +585,13 @@ class Admin(BaseModel):
     class Config:
         from_attributes = True
 
+class UserPage(BaseModel):
+    users: List[User]
+    total: Optional[int] = None
+    total_is_approximate: bool = True
+    next_cursor: Optional[str] = None
+    limit: int
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -160,36 +617,71 @@ class ActivityLog(BaseModel):
         from_attributes = True
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    session_factory = CrisisSessionLocal if current_priority.get() == "crisis" else AsyncSessionLocal
+    async with session_factory() as db:
         yield db
-    finally:
-        db.close()
 
-# Helper function to log activity
-def log_activity(db: Session, user_id: str = None, user_name: str = None, 
+# Live activity feed for the admin dashboard
+activity_feed = ActivityFeed(
+    history_size=int(os.getenv("ACTIVITY_FEED_HISTORY", "1000")),
+    queue_size=int(os.getenv("ACTIVITY_FEED_QUEUE_SIZE", "256"))
+)
+ACTIVITY_STREAM_HEARTBEAT_SECONDS = float(os.getenv("ACTIVITY_STREAM_HEARTBEAT_SECONDS", "15"))
+ACTIVITY_STREAM_TICKET_SECONDS = int(os.getenv("ACTIVITY_STREAM_TICKET_SECONDS", "30"))
+
+# Helper function to log activity - queued for the background writer, not committed inline
+def log_activity(user_id: str = None, user_name: str = None, 
                 activity_type: str = "", description: str = "", 
                 details: dict = None, ip_address: str = None, user_agent: str = None):
-    activity = ActivityLogDB(
-        id=str(uuid.uuid4()),
-        user_id=user_id,
-        user_name=user_name,
-        type=activity_type,
-        description=description,
-        details=json.dumps(details) if details else None,
-        ip_address=ip_address,
-        user_agent=user_agent
-    )
-    db.add(activity)
-    db.commit()
+    activity = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "user_name": user_name,
+        "type": activity_type,
+        "description": description,
+        "details": details or None,
+        "ip_address": ip_address,
+        "user_agent": user_agent,
+        "timestamp": datetime.utcnow()
+    }
+    activity_log_writer.submit(activity)
+    activity_feed.publish({**activity, "timestamp": activity["timestamp"].isoformat()})
 
 # Authentication functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def hashing_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again shortly",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+async def enforce_login_rate_limit(scope: str, request: Request, email: str):
+    """Reject a login attempt with 429 once its IP or target email is over the limit"""
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = max(
+        await login_ip_limiter.hit(f"{scope}:{client_ip}"),
+        await login_email_limiter.hit(f"{scope}:{email.lower()}")
+    )
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+async def verify_password(plain_password, hashed_password):
+    try:
+        return await password_hasher.verify_async(plain_password, hashed_password)
+    except HashQueueFull:
+        raise hashing_busy_exception()
+
+async def get_password_hash(password):
+    try:
+        return await password_hasher.hash_async(password)
+    except HashQueueFull:
+        raise hashing_busy_exception()
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, is_admin: bool = False):
     to_encode = data.copy()
@@ -202,14 +694,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, i
     encoded_jwt = jwt.encode(to_encode, secret, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def authenticate_user_token(token: str, db: AsyncSession) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
@@ -217,19 +708,23 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     except JWTError:
         raise credentials_exception
     
-    user = db.query(UserDB).filter(UserDB.email == email).first()
-    if user is None:
-        raise credentials_exception
-    return user
+    generation = await principal_generation.current(db)
+    principal = principal_cache.get(("user", email), generation)
+    if principal is None:
+        user = await db.scalar(select(UserDB).where(UserDB.email == email))
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_row(user)
+        principal_cache.put(("user", email), principal, generation)
+    return principal
 
-def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def authenticate_admin_token(token: str, db: AsyncSession) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate admin credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, ADMIN_SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         is_admin: bool = payload.get("is_admin", False)
@@ -238,16 +733,106 @@ def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(securi
     except JWTError:
         raise credentials_exception
     
-    admin = db.query(AdminDB).filter(AdminDB.email == email).first()
-    if admin is None:
-        raise credentials_exception
-    return admin
+    principal = principal_cache.get(("admin", email))
+    if principal is None:
+        admin = await db.scalar(select(AdminDB).where(AdminDB.email == email))
+        if admin is None:
+            raise credentials_exception
+        principal = Principal.from_row(admin)
+        principal_cache.put(("admin", email), principal)
+    return principal
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
+    return await authenticate_user_token(credentials.credentials, db)
+
+async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
+    return await authenticate_admin_token(credentials.credentials, db)
+
+def stream_ticket_id(ticket: str) -> str:
+    return hashlib.sha256(ticket.encode()).hexdigest()
+
+async def redeem_stream_ticket(ticket: str, db: AsyncSession) -> Optional[Principal]:
+    """The admin a stream ticket was issued to, or None; a ticket is accepted once, before it expires"""
+    ticket_id = stream_ticket_id(ticket)
+    admin_id = await db.scalar(
+        select(StreamTicketDB.admin_id)
+        .where(StreamTicketDB.id == ticket_id, StreamTicketDB.expires_at > datetime.utcnow())
+    )
+    if admin_id is None:
+        return None
+    # Only the request whose delete removed the row gets in, in whichever worker it lands
+    claimed = (await db.execute(delete(StreamTicketDB).where(StreamTicketDB.id == ticket_id))).rowcount == 1
+    await db.commit()
+    admin = await db.get(AdminDB, admin_id) if claimed else None
+    return Principal.from_row(admin) if admin is not None else None
+
+async def get_current_admin_for_stream(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    ticket: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    if credentials:
+        return await authenticate_admin_token(credentials.credentials, db)
+    principal = await redeem_stream_ticket(ticket, db) if ticket else None
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+# Startup and shutdown - everything with I/O happens here rather than at import
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1000"))
+startup_report = {"startup_ms": None, "budget_ms": STARTUP_BUDGET_MS, "migrated": None, "admin_created": None}
+
+def prepare_database():
+    """Schema upgrade and admin bootstrap; a no-op after the first worker of a deployment"""
+    startup_report["migrated"] = run_migrations()
+    try:
+        startup_report["admin_created"] = create_default_admin()
+    except Exception:
+        logger.exception("Error creating default admin")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await asyncio.to_thread(prepare_database)
+    stats_counters.start()
+    activity_log_writer.start()
+    group_message_writer.start()
+    activity_archive.start()
+    roster_importer.start()
+    provider_directory.load_in_background()
+    startup_report["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("Allowed CORS origins: %s", allowed_origins)
+    # The first worker of a deployment also migrates and hashes the admin password; only warm boots have a budget
+    first_boot = startup_report["migrated"] or startup_report["admin_created"]
+    if startup_report["startup_ms"] > STARTUP_BUDGET_MS and not first_boot:
+        logger.warning("Startup took %.0f ms, over the %.0f ms budget", startup_report["startup_ms"], STARTUP_BUDGET_MS)
+    else:
+        logger.info("Startup finished in %.0f ms", startup_report["startup_ms"])
+    
+    yield
+    
+    roster_importer.stop()
+    activity_archive.stop()
+    group_message_writer.stop()
+    activity_log_writer.stop()
+    stats_counters.stop()
+    password_hasher.shutdown()
+    if rate_limit_store is not None:
+        await rate_limit_store.close()
+    await async_engine.dispose()
+    if crisis_async_engine is not async_engine:
+        await crisis_async_engine.dispose()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="User Management API with Authentication", 
     version="1.0.0",
-    description="Secure User Management API with JWT Authentication and Admin Panel"
+    description="Secure User Management API with JWT Authentication and Admin Panel",
+    lifespan=lifespan
 )
 
 # CORS Configuration - UPDATED
@@ -259,7 +844,15 @@ allowed_origins = os.getenv(
 # Clean up origins (remove trailing slashes and whitespace)
 allowed_origins = [origin.strip().rstrip('/') for origin in allowed_origins if origin.strip()]
 
-print(f"Allowed CORS origins: {allowed_origins}")  # Debug line
+# Innermost, so shed requests still get CORS headers and are timed by the metrics
+app.add_middleware(PriorityMiddleware, scheduler=request_scheduler, classify=classify_request)
+
+# Large JSON bodies and exports are gzipped; the live activity stream must not be buffered
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("GZIP_MIN_BYTES", "1000")),
+    exclude_paths=("/admin/activities/stream",)
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -270,21 +863,24 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# Added last so it is the outermost middleware and times the whole request
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
 # Public Endpoints
 @app.get("/")
 async def root():
     return {"message": "Welcome to User Management API with Authentication"}
 
 @app.post("/register", response_model=Token)
-def register_user(user: UserCreate, request: Request, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = db.query(UserDB).filter(UserDB.email == user.email).first()
+    existing_user = await db.scalar(select(UserDB).where(UserDB.email == user.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     db_user = UserDB(
         id=str(uuid.uuid4()),
         name=user.name,
@@ -293,12 +889,15 @@ def register_user(user: UserCreate, request: Request, db: Session = Depends(get_
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await stats_counters.incr(db, {"users_total": 1, "users_active": 1})
+    await user_listing_generation.bump(db)
+    await db.commit()
+    await db.refresh(db_user)
+    admin_user_listing_cache.invalidate()
     
     # Log activity
     log_activity(
-        db, db_user.id, db_user.name, "register", 
+        db_user.id, db_user.name, "register", 
         f"User {db_user.name} registered", 
         {"email": db_user.email},
         request.client.host if request.client else None,
@@ -318,14 +917,15 @@ def register_user(user: UserCreate, request: Request, db: Session = Depends(get_
     }
 
 @app.post("/login", response_model=Token)
-def login_user(user_credentials: UserLogin, request: Request, db: Session = Depends(get_db)):
+async def login_user(user_credentials: UserLogin, request: Request, db: AsyncSession = Depends(get_db)):
     """Login existing user"""
-    user = db.query(UserDB).filter(UserDB.email == user_credentials.email).first()
+    await enforce_login_rate_limit("user", request, user_credentials.email)
+    user = await db.scalar(select(UserDB).where(UserDB.email == user_credentials.email))
     
-    if not user or not verify_password(user_credentials.password, user.password_hash):
+    if not user or not await verify_password(user_credentials.password, user.password_hash):
         # Log failed login attempt
         log_activity(
-            db, None, user_credentials.email, "login_failed", 
+            None, user_credentials.email, "login_failed", 
             f"Failed login attempt for {user_credentials.email}",
             {"email": user_credentials.email},
             request.client.host if request.client else None,
@@ -342,11 +942,16 @@ def login_user(user_credentials: UserLogin, request: Request, db: Session = Depe
     
     # Update last login
     user.last_login = datetime.utcnow()
-    db.commit()
+    user.version = UserDB.version + 1
+    await db.commit()
+    # Not a shared generation bump, which would empty every worker's cache on every login;
+    # other workers keep the old last_login until their entry expires
+    principal_cache.invalidate(("user", user.email))
+    await login_email_limiter.reset(f"user:{user_credentials.email.lower()}")
     
     # Log successful login
     log_activity(
-        db, user.id, user.name, "login", 
+        user.id, user.name, "login", 
         f"User {user.name} logged in",
         {"email": user.email},
         request.client.host if request.client else None,
@@ -367,16 +972,20 @@ def login_user(user_credentials: UserLogin, request: Request, db: Session = Depe
 
 # Protected User Endpoints
 @app.get("/me", response_model=User)
-def get_current_user_info(current_user: UserDB = Depends(get_current_user)):
+async def get_current_user_info(request: Request, current_user: Principal = Depends(get_current_user)):
     """Get current user information"""
-    return current_user
+    etag = entity_etag("user", current_user.id, current_user.version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return ORJSONResponse(User.model_validate(current_user).model_dump(),
+                          headers={"ETag": etag, "Cache-Control": PRIVATE_REVALIDATE})
 
 @app.get("/dashboard")
-def get_dashboard_data(current_user: UserDB = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_dashboard_data(current_user: Principal = Depends(get_current_user)):
     """Get dashboard data - protected route"""
     # Log dashboard access
     log_activity(
-        db, current_user.id, current_user.name, "dashboard_view", 
+        current_user.id, current_user.name, "dashboard_view", 
         f"User {current_user.name} accessed dashboard"
     )
     
@@ -399,14 +1008,15 @@ def get_dashboard_data(current_user: UserDB = Depends(get_current_user), db: Ses
 
 # Admin Endpoints
 @app.post("/admin/login", response_model=AdminToken)
-def admin_login(admin_credentials: AdminLogin, request: Request, db: Session = Depends(get_db)):
+async def admin_login(admin_credentials: AdminLogin, request: Request, db: AsyncSession = Depends(get_db)):
     """Admin login"""
-    admin = db.query(AdminDB).filter(AdminDB.email == admin_credentials.email).first()
+    await enforce_login_rate_limit("admin", request, admin_credentials.email)
+    admin = await db.scalar(select(AdminDB).where(AdminDB.email == admin_credentials.email))
     
-    if not admin or not verify_password(admin_credentials.password, admin.password_hash):
+    if not admin or not await verify_password(admin_credentials.password, admin.password_hash):
         # Log failed admin login attempt
         log_activity(
-            db, None, admin_credentials.email, "admin_login_failed", 
+            None, admin_credentials.email, "admin_login_failed", 
             f"Failed admin login attempt for {admin_credentials.email}",
             {"email": admin_credentials.email, "admin_attempt": True},
             request.client.host if request.client else None,
@@ -420,10 +1030,11 @@ def admin_login(admin_credentials: AdminLogin, request: Request, db: Session = D
     
     if not admin.is_active:
         raise HTTPException(status_code=400, detail="Inactive admin")
+    await login_email_limiter.reset(f"admin:{admin_credentials.email.lower()}")
     
     # Log successful admin login
     log_activity(
-        db, admin.id, admin.name, "admin_login", 
+        admin.id, admin.name, "admin_login", 
         f"Admin {admin.name} logged in",
         {"email": admin.email, "admin_login": True},
         request.client.host if request.client else None,
@@ -443,40 +1054,22 @@ def admin_login(admin_credentials: AdminLogin, request: Request, db: Session = D
     }
 
 @app.get("/admin/me", response_model=Admin)
-def get_current_admin_info(current_admin: AdminDB = Depends(get_current_admin)):
+async def get_current_admin_info(request: Request, current_admin: Principal = Depends(get_current_admin)):
     """Get current admin information"""
-    return current_admin
+    etag = entity_etag("admin", current_admin.id, current_admin.version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return ORJSONResponse(Admin.model_validate(current_admin).model_dump(),
+                          headers={"ETag": etag, "Cache-Control": PRIVATE_REVALIDATE})
 
-@app.get("/admin/dashboard")
-def get_admin_dashboard_data(current_admin: AdminDB = Depends(get_current_admin), db: Session = Depends(get_db)):
+@app.get("/admin/dashboard", response_class=ORJSONResponse)
+async def get_admin_dashboard_data(current_admin: Principal = Depends(get_current_admin)):
     """Get admin dashboard data"""
-    total_users = db.query(UserDB).count()
-    active_users = db.query(UserDB).filter(UserDB.is_active == True).count()
-    
-    # Get recent activities
-    recent_activities = db.query(ActivityLogDB).order_by(ActivityLogDB.timestamp.desc()).limit(10).all()
-    
-    # Convert activities to dict format
-    activities_data = []
-    for activity in recent_activities:
-        activity_dict = {
-            "id": activity.id,
-            "user_id": activity.user_id,
-            "user_name": activity.user_name,
-            "type": activity.type,
-            "description": activity.description,
-            "details": json.loads(activity.details) if activity.details else None,
-            "ip_address": activity.ip_address,
-            "user_agent": activity.user_agent,
-            "timestamp": activity.timestamp
-        }
-        activities_data.append(activity_dict)
-    
-    return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "total_posts": 45,  # Mock data - replace with actual query
-        "total_views": 2340,  # Mock data - replace with actual query
+    return ORJSONResponse({
+        "total_users": stats_counters.get("users_total"),
+        "active_users": stats_counters.get("users_active"),
+        "total_posts": stats_counters.get("posts_total"),
+        "total_views": stats_counters.get("dashboard_views_total"),
         "recent_system_activity": [
             {
                 "type": "user_signup",
@@ -489,105 +1082,326 @@ def get_admin_dashboard_data(current_admin: AdminDB = Depends(get_current_admin)
                 "time": "3 hours ago"
             }
         ]
-    }
+    })
+
+# Keyset pagination for the admin user listing
+USER_SORT_COLUMNS = {
+    "name": UserDB.name,
+    "email": UserDB.email,
+    "last_login": UserDB.last_login,
+    "created_at": UserDB.created_at,
+}
+
+def encode_cursor(sort_by: str, sort_order: str, value, row_id: str) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort_by, sort_order, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
 
-@app.get("/admin/users")
-def get_all_users_admin(
-    current_admin: AdminDB = Depends(get_current_admin), 
-    db: Session = Depends(get_db),
+def decode_cursor(cursor: str, sort_by: str, sort_order: str):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, cursor_sort_order, value, row_id = json.loads(payload)
+        if value is not None and sort_by in ("last_login", "created_at"):
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort_by != sort_by or cursor_sort_order != sort_order:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+    return value, row_id
+
+def keyset_after(column, tiebreaker, value, row_id, descending: bool):
+    """Rows strictly after (value, row_id) in ORDER BY column NULLS LAST, tiebreaker"""
+    next_id = tiebreaker < row_id if descending else tiebreaker > row_id
+    if value is None:
+        return and_(column.is_(None), next_id)
+    beyond = column < value if descending else column > value
+    return or_(beyond, and_(column == value, next_id), column.is_(None))
+
+def approximate_user_count(is_active: Optional[bool] = None):
+    """User count from the stats snapshot (a few seconds stale at most)"""
+    if is_active is None:
+        return stats_counters.get("users_total")
+    active = stats_counters.get("users_active")
+    return active if is_active else stats_counters.get("users_total") - active
+
+@app.get("/admin/users", response_model=UserPage)
+async def get_all_users_admin(
+    request: Request,
+    current_admin: Principal = Depends(get_current_admin), 
+    db: AsyncSession = Depends(get_db),
     sort_by: str = "created_at",
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    last_login_after: Optional[datetime] = None,
+    last_login_before: Optional[datetime] = None
 ):
-    """Get all users for admin panel"""
-    query = db.query(UserDB)
+    """Get one page of users for admin panel"""
+    if sort_by not in USER_SORT_COLUMNS:  # default to created_at
+        sort_by = "created_at"
+    sort_order = "desc" if sort_order == "desc" else "asc"
+    descending = sort_order == "desc"
+    column = USER_SORT_COLUMNS[sort_by]
     
-    # Apply sorting
-    if sort_by == "name":
-        query = query.order_by(UserDB.name.desc() if sort_order == "desc" else UserDB.name.asc())
-    elif sort_by == "email":
-        query = query.order_by(UserDB.email.desc() if sort_order == "desc" else UserDB.email.asc())
-    elif sort_by == "last_login":
-        query = query.order_by(UserDB.last_login.desc() if sort_order == "desc" else UserDB.last_login.asc())
-    else:  # default to created_at
-        query = query.order_by(UserDB.created_at.desc() if sort_order == "desc" else UserDB.created_at.asc())
+    # Unchanged pages are served from the cache, and a matching If-None-Match skips even that body
+    cache_key = (await user_listing_generation.current(db), sort_by, sort_order, limit, cursor, is_active,
+                 created_after, created_before, last_login_after, last_login_before)
+    cached = admin_user_listing_cache.get(cache_key)
+    if cached is not None:
+        etag, body = cached
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": PRIVATE_REVALIDATE})
+    generation = admin_user_listing_cache.generation
     
-    users = query.all()
+    query = select(*USER_DETAIL_COLUMNS)
     
-    return {
-        "users": users,
-        "total": len(users)
-    }
+    # Apply filters
+    if is_active is not None:
+        query = query.where(UserDB.is_active == is_active)
+    if created_after:
+        query = query.where(UserDB.created_at >= created_after)
+    if created_before:
+        query = query.where(UserDB.created_at < created_before)
+    if last_login_after:
+        query = query.where(UserDB.last_login >= last_login_after)
+    if last_login_before:
+        query = query.where(UserDB.last_login < last_login_before)
+    
+    # Resume after the last row of the previous page
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort_by, sort_order)
+        query = query.where(keyset_after(column, UserDB.id, value, row_id, descending))
+    
+    # Apply sorting - id breaks ties so every row has a unique position
+    if descending:
+        query = query.order_by(column.desc().nulls_last(), UserDB.id.desc())
+    else:
+        query = query.order_by(column.asc().nulls_last(), UserDB.id.asc())
+    
+    # Fetch one extra row to learn whether another page exists
+    users = (await db.execute(query.limit(limit + 1))).all()
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        last = users[-1]
+        next_cursor = encode_cursor(sort_by, sort_order, getattr(last, sort_by), last.id)
+    
+    # Date filters have no cheap estimate, so the total is only reported without them
+    date_filtered = any((created_after, created_before, last_login_after, last_login_before))
+    
+    body = orjson.dumps({
+        "users": [user._asdict() for user in users],
+        "total": None if date_filtered else approximate_user_count(is_active),
+        "total_is_approximate": True,
+        "next_cursor": next_cursor,
+        "limit": limit
+    })
+    etag = admin_user_listing_cache.put(cache_key, body, generation)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": PRIVATE_REVALIDATE})
+
+# Activity filters shared by the listing, export and live feed
+ACTIVITY_TIME_RANGES = {
+    "1h": timedelta(hours=1),
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+ACTIVITY_FILTERS = {
+    "login": ["login", "logout", "login_failed"],
+    "posts": ["post_create", "post_view", "post_like"],
+    "profile": ["profile_update", "password_change"],
+    "security": ["login_failed", "password_change", "admin_login"],
+}
+ACTIVITY_EXPORT_COLUMNS = ["id", "user_id", "user_name", "type", "description", "details", "ip_address", "user_agent", "timestamp"]
+# Read-only listings select plain columns so no ORM objects are built
+ACTIVITY_LIST_COLUMNS = [getattr(ActivityLogDB, column) for column in ACTIVITY_EXPORT_COLUMNS]
+USER_ACTIVITY_COLUMNS = [ActivityLogDB.id, ActivityLogDB.type, ActivityLogDB.description,
+                         ActivityLogDB.details, ActivityLogDB.ip_address, ActivityLogDB.timestamp]
+USER_DETAIL_COLUMNS = [UserDB.id, UserDB.name, UserDB.email, UserDB.is_active, UserDB.created_at, UserDB.last_login]
+ACTIVITY_EXPORT_BATCH_SIZE = int(os.getenv("ACTIVITY_EXPORT_BATCH_SIZE", "1000"))
+
+def apply_activity_filters(query, filter: str = "all", time_range: str = "24h",
+                           since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """Filtered query and the lower time bound it applied, for callers that also read the archive"""
+    # Apply time range filter - an explicit since overrides the named range
+    if since is None and time_range in ACTIVITY_TIME_RANGES:
+        since = datetime.utcnow() - ACTIVITY_TIME_RANGES[time_range]
+    if since is not None:
+        query = query.where(ActivityLogDB.timestamp >= since)
+    if until is not None:
+        query = query.where(ActivityLogDB.timestamp < until)
+    
+    # Apply activity filter
+    if filter in ACTIVITY_FILTERS:
+        query = query.where(ActivityLogDB.type.in_(ACTIVITY_FILTERS[filter]))
+    return query, since
 
-@app.get("/admin/activities")
-def get_activities(
-    current_admin: AdminDB = Depends(get_current_admin),
-    db: Session = Depends(get_db),
+@app.get("/admin/activities", response_class=ORJSONResponse)
+async def get_activities(
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
     filter: str = "all",
     time_range: str = "24h"
 ):
     """Get user activities for admin monitoring"""
-    query = db.query(ActivityLogDB)
-    
-    # Apply time range filter
-    if time_range == "1h":
-        since = datetime.utcnow() - timedelta(hours=1)
-        query = query.filter(ActivityLogDB.timestamp >= since)
-    elif time_range == "24h":
-        since = datetime.utcnow() - timedelta(hours=24)
-        query = query.filter(ActivityLogDB.timestamp >= since)
-    elif time_range == "7d":
-        since = datetime.utcnow() - timedelta(days=7)
-        query = query.filter(ActivityLogDB.timestamp >= since)
-    elif time_range == "30d":
-        since = datetime.utcnow() - timedelta(days=30)
-        query = query.filter(ActivityLogDB.timestamp >= since)
+    query, since = apply_activity_filters(select(*ACTIVITY_LIST_COLUMNS), filter, time_range)
     
-    # Apply activity filter
-    if filter == "login":
-        query = query.filter(ActivityLogDB.type.in_(["login", "logout", "login_failed"]))
-    elif filter == "posts":
-        query = query.filter(ActivityLogDB.type.in_(["post_create", "post_view", "post_like"]))
-    elif filter == "profile":
-        query = query.filter(ActivityLogDB.type.in_(["profile_update", "password_change"]))
-    elif filter == "security":
-        query = query.filter(ActivityLogDB.type.in_(["login_failed", "password_change", "admin_login"]))
-    
-    activities = query.order_by(ActivityLogDB.timestamp.desc()).limit(100).all()
-    
-    # Convert to dict format
-    activities_data = []
-    for activity in activities:
-        activity_dict = {
-            "id": activity.id,
-            "user_id": activity.user_id,
-            "user_name": activity.user_name,
-            "type": activity.type,
-            "description": activity.description,
-            "details": json.loads(activity.details) if activity.details else None,
-            "ip_address": activity.ip_address,
-            "user_agent": activity.user_agent,
-            "timestamp": activity.timestamp
-        }
-        activities_data.append(activity_dict)
+    result = await db.execute(query.order_by(ActivityLogDB.timestamp.desc()).limit(100))
+    activities_data = [row._asdict() for row in result]
     
-    return {
+    # Older rows live in the archive - read it when the range reaches past the hot window
+    hot_window_start = activity_archive.hot_window_start()
+    if len(activities_data) < 100 and hot_window_start and (since is None or since < hot_window_start):
+        activities_data.extend(await asyncio.to_thread(
+            activity_archive.read, since, hot_window_start, ACTIVITY_FILTERS.get(filter),
+            limit=100 - len(activities_data), max_segments=ACTIVITY_ARCHIVE_LOOKBACK_DAYS
+        ))
+    
+    return ORJSONResponse({
         "activities": activities_data,
         "total": len(activities_data)
-    }
+    })
+
+async def stream_activity_export(query, export_format: str):
+    """Yield export chunks one server-side cursor batch at a time"""
+    # The request's session is closed before the body streams, so open our own
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=ACTIVITY_EXPORT_BATCH_SIZE))
+        
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(ACTIVITY_EXPORT_COLUMNS)
+            async for rows in result.partitions():
+                for row in rows:
+                    record = row._asdict()
+                    record["details"] = json.dumps(record["details"]) if record["details"] is not None else None
+                    record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+                    writer.writerow([record[column] for column in ACTIVITY_EXPORT_COLUMNS])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                lines = []
+                for row in rows:
+                    lines.append(orjson.dumps(row._asdict()))
+                yield b"\n".join(lines) + b"\n"
+
+@app.post("/admin/activities/stream/ticket", status_code=201)
+async def create_stream_ticket(current_admin: Principal = Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
+    """Issue a short-lived, single-use ticket for opening the activity stream with EventSource"""
+    ticket = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    await db.execute(delete(StreamTicketDB).where(StreamTicketDB.expires_at <= now))
+    db.add(StreamTicketDB(
+        id=stream_ticket_id(ticket),
+        admin_id=current_admin.id,
+        expires_at=now + timedelta(seconds=ACTIVITY_STREAM_TICKET_SECONDS)
+    ))
+    await db.commit()
+    return {"ticket": ticket, "expires_in": ACTIVITY_STREAM_TICKET_SECONDS}
+
+@app.get("/admin/activities/stream")
+async def stream_activities(
+    current_admin: Principal = Depends(get_current_admin_for_stream),
+    filter: str = "all",
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    after: Optional[str] = None
+):
+    """Push new activities to the admin dashboard as Server-Sent Events"""
+    # Browsers connect with ?ticket= from POST /admin/activities/stream/ticket; a ticket works once,
+    # so after a disconnect they fetch a new one and resume with ?after=<last event id>
+    subscription = activity_feed.subscribe(last_event_id or after, ACTIVITY_FILTERS.get(filter))
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscription.get(), ACTIVITY_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    # Fell too far behind - the browser reconnects and resumes from its last id
+                    yield 'event: disconnect\ndata: {"reason": "slow consumer"}\n\n'
+                    return
+                event_id, event = item
+                yield f"id: {event_id}\nevent: activity\ndata: {json.dumps(event)}\n\n"
+        finally:
+            activity_feed.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/admin/activities/export")
+async def export_activities(
+    current_admin: Principal = Depends(get_current_admin),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    filter: str = "all",
+    time_range: str = "24h",
+    since: Optional[datetime] = Query(None, alias="from"),
+    until: Optional[datetime] = Query(None, alias="to")
+):
+    """Stream activity logs as NDJSON or CSV for compliance exports"""
+    query, _ = apply_activity_filters(
+        select(*(getattr(ActivityLogDB, column) for column in ACTIVITY_EXPORT_COLUMNS)),
+        filter, time_range, since, until
+    )
+    query = query.order_by(ActivityLogDB.timestamp.asc())
+    
+    # Log admin action
+    log_activity(
+        current_admin.id, current_admin.name, "admin_action",
+        f"Admin {current_admin.name} exported activity logs",
+        {"action": "export_activities", "format": format, "filter": filter, "time_range": time_range,
+         "from": since.isoformat() if since else None, "to": until.isoformat() if until else None,
+         "admin_action": True}
+    )
+    
+    filename = f"activities-{datetime.utcnow():%Y%m%dT%H%M%SZ}.{format}"
+    return StreamingResponse(
+        stream_activity_export(query, format),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.post("/admin/users/{user_id}/activate")
-def activate_user(user_id: str, current_admin: AdminDB = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def activate_user(user_id: str, current_admin: Principal = Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
     """Activate a user"""
-    user = db.query(UserDB).filter(UserDB.id == user_id).first()
+    user = await db.get(UserDB, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.is_active = True
-    db.commit()
+    # Conditional update so concurrent requests count the transition only once
+    result = await db.execute(
+        update(UserDB).where(UserDB.id == user_id, UserDB.is_active == False)
+        .values(is_active=True, version=UserDB.version + 1)
+    )
+    if result.rowcount:
+        await stats_counters.incr(db, {"users_active": 1})
+        await principal_generation.bump(db)
+        await user_listing_generation.bump(db)
+    await db.commit()
+    principal_cache.invalidate(("user", user.email))
+    admin_user_listing_cache.invalidate()
     
     # Log admin action
     log_activity(
-        db, current_admin.id, current_admin.name, "admin_action", 
+        current_admin.id, current_admin.name, "admin_action", 
         f"Admin {current_admin.name} activated user {user.name}",
         {"action": "activate_user", "target_user_id": user_id, "admin_action": True}
     )
@@ -595,18 +1409,28 @@ def activate_user(user_id: str, current_admin: AdminDB = Depends(get_current_adm
     return {"message": "User activated successfully"}
 
 @app.post("/admin/users/{user_id}/deactivate")
-def deactivate_user(user_id: str, current_admin: AdminDB = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def deactivate_user(user_id: str, current_admin: Principal = Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
     """Deactivate a user"""
-    user = db.query(UserDB).filter(UserDB.id == user_id).first()
+    user = await db.get(UserDB, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.is_active = False
-    db.commit()
+    # Conditional update so concurrent requests count the transition only once
+    result = await db.execute(
+        update(UserDB).where(UserDB.id == user_id, UserDB.is_active == True)
+        .values(is_active=False, version=UserDB.version + 1)
+    )
+    if result.rowcount:
+        await stats_counters.incr(db, {"users_active": -1})
+        await principal_generation.bump(db)
+        await user_listing_generation.bump(db)
+    await db.commit()
+    principal_cache.invalidate(("user", user.email))
+    admin_user_listing_cache.invalidate()
     
     # Log admin action
     log_activity(
-        db, current_admin.id, current_admin.name, "admin_action", 
+        current_admin.id, current_admin.name, "admin_action", 
         f"Admin {current_admin.name} deactivated user {user.name}",
         {"action": "deactivate_user", "target_user_id": user_id, "admin_action": True}
     )
@@ -614,89 +1438,890 @@ def deactivate_user(user_id: str, current_admin: AdminDB = Depends(get_current_a
     return {"message": "User deactivated successfully"}
 
 @app.delete("/admin/users/{user_id}")
-def delete_user(user_id: str, current_admin: AdminDB = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def delete_user(user_id: str, current_admin: Principal = Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
     """Delete a user"""
-    user = db.query(UserDB).filter(UserDB.id == user_id).first()
+    user = await db.get(UserDB, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user_name = user.name
-    db.delete(user)
-    db.commit()
+    user_email = user.email
+    await db.delete(user)
+    await stats_counters.incr(db, {"users_total": -1, "users_active": -1 if user.is_active else 0})
+    await principal_generation.bump(db)
+    await user_listing_generation.bump(db)
+    await db.commit()
+    principal_cache.invalidate(("user", user_email))
+    admin_user_listing_cache.invalidate()
     
     # Log admin action
     log_activity(
-        db, current_admin.id, current_admin.name, "admin_action", 
+        current_admin.id, current_admin.name, "admin_action", 
         f"Admin {current_admin.name} deleted user {user_name}",
         {"action": "delete_user", "target_user_id": user_id, "admin_action": True}
     )
     
     return {"message": "User deleted successfully"}
 
-@app.get("/admin/users/{user_id}")
-def get_user_details(user_id: str, current_admin: AdminDB = Depends(get_current_admin), db: Session = Depends(get_db)):
+@app.get("/admin/users/{user_id}", response_class=ORJSONResponse)
+async def get_user_details(user_id: str, request: Request, current_admin: Principal = Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
     """Get detailed user information"""
-    user = db.query(UserDB).filter(UserDB.id == user_id).first()
+    user = (await db.execute(select(*USER_DETAIL_COLUMNS, UserDB.version).where(UserDB.id == user_id))).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get user's activity history
-    user_activities = db.query(ActivityLogDB).filter(ActivityLogDB.user_id == user_id).order_by(ActivityLogDB.timestamp.desc()).limit(20).all()
-    
-    activities_data = []
-    for activity in user_activities:
-        activity_dict = {
-            "id": activity.id,
-            "type": activity.type,
-            "description": activity.description,
-            "details": json.loads(activity.details) if activity.details else None,
-            "ip_address": activity.ip_address,
-            "timestamp": activity.timestamp
-        }
-        activities_data.append(activity_dict)
+    result = await db.execute(
+        select(*USER_ACTIVITY_COLUMNS).where(ActivityLogDB.user_id == user_id).order_by(ActivityLogDB.timestamp.desc()).limit(20)
+    )
+    activities_data = [row._asdict() for row in result]
     
-    return {
-        "user": user,
+    # The user's version and their newest activities identify the response before the archive is read
+    etag = entity_etag("user-detail", user.id, user.version, len(activities_data),
+                       activities_data[0]["id"] if activities_data else None)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    user_data = user._asdict()
+    del user_data["version"]
+    
+    # Fall back to the archive for users with little recent activity
+    hot_window_start = activity_archive.hot_window_start()
+    if len(activities_data) < 20 and hot_window_start:
+        archived = await asyncio.to_thread(
+            activity_archive.read, None, hot_window_start, user_id=user_id,
+            limit=20 - len(activities_data), max_segments=ACTIVITY_ARCHIVE_LOOKBACK_DAYS
+        )
+        activities_data.extend(
+            {key: record.get(key) for key in ("id", "type", "description", "details", "ip_address", "timestamp")}
+            for record in archived
+        )
+    
+    return ORJSONResponse({
+        "user": user_data,
         "recent_activities": activities_data
+    }, headers={"ETag": etag, "Cache-Control": PRIVATE_REVALIDATE})
+
+def roster_format(request: Request, format: Optional[str]) -> str:
+    """Explicit ?format= wins, then the Content-Type, then CSV"""
+    if format is not None:
+        if format not in ROSTER_FORMATS:
+            raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+        return format
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json"):
+        return "ndjson"
+    return "csv"
+
+async def spool_upload(request: Request, suffix: str) -> str:
+    """Stream the request body to a temporary file without holding it in memory"""
+    fd, path = tempfile.mkstemp(prefix="roster-", suffix=suffix, dir=ROSTER_IMPORT_DIR)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as upload:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > ROSTER_IMPORT_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Roster is larger than {ROSTER_IMPORT_MAX_BYTES} bytes")
+                upload.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    if size == 0:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail="Roster is empty")
+    return path
+
+@app.post("/admin/users/import", status_code=202)
+async def import_users(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson; defaults from the Content-Type"),
+    current_admin: Principal = Depends(get_current_admin)
+):
+    """Start a background import of a student roster with name, email, password and optional department columns"""
+    roster = roster_format(request, format)
+    path = await spool_upload(request, f".{roster}")
+    
+    def log_import(job):
+        log_activity(
+            current_admin.id, current_admin.name, "admin_action",
+            f"Admin {current_admin.name} imported {job['created_count']} users from a roster",
+            {"action": "import_users", "job_id": job["id"], "status": job["status"],
+             "processed_rows": job["processed_rows"], "created": job["created_count"],
+             "duplicates": job["duplicate_count"], "invalid": job["invalid_count"], "admin_action": True}
+        )
+        if job["created_count"]:
+            with SessionLocal.begin() as session:
+                user_listing_generation.bump_sync(session)
+        admin_user_listing_cache.invalidate()
+    
+    try:
+        job_id = await asyncio.to_thread(roster_importer.submit, path, roster, current_admin.id, log_import)
+    except Exception:
+        os.remove(path)
+        raise
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "status_url": f"/admin/users/import/{job_id}"},
+        headers={"Location": f"/admin/users/import/{job_id}"}
+    )
+
+@app.get("/admin/users/import/{job_id}", response_class=ORJSONResponse)
+async def get_import_job(job_id: str, current_admin: Principal = Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
+    """Progress and outcome of a roster import"""
+    # spool_path is a server-side file path; heartbeat_at shows whether a running job is still alive
+    columns = [column for column in ImportJobDB.__table__.c if column.name != "spool_path"]
+    job = (await db.execute(select(*columns).where(ImportJobDB.id == job_id))).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    job = job._asdict()
+    job["percent_complete"] = (
+        round(job["processed_rows"] * 100 / job["total_rows"], 1) if job["total_rows"] else None
+    )
+    return ORJSONResponse(job)
+
+# Full-text search - the index is created by migration 0006
+try:
+    full_text_search = FullTextSearch(
+        engine.dialect.name,
+        candidates=int(os.getenv("SEARCH_CANDIDATES", "1000"))
+    )
+except SearchUnavailable:
+    full_text_search = None
+
+def search_unavailable_exception():
+    return HTTPException(status_code=503, detail="Full-text search is not available on this database")
+
+async def run_search(db: AsyncSession, statement, limit: int, offset: int) -> dict:
+    # One extra row tells whether there is a next page without counting every match
+    rows = [row._asdict() for row in (await db.execute(statement)).all()]
+    ranked_recent_only = False
+    for row in rows:
+        ranked_recent_only = row.pop("ranked_recent_only")
+    return {
+        "results": rows[:limit],
+        "offset": offset,
+        "limit": limit,
+        "has_more": len(rows) > limit,
+        # Only the newest SEARCH_CANDIDATES matches were ranked; older ones were left out
+        "ranked_recent_only": bool(ranked_recent_only)
+    }
+
+@app.get("/admin/search", response_class=ORJSONResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    scope: str = Query("all", pattern="^(all|users|activities)$"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Ranked prefix search over user names and emails and activity descriptions"""
+    if full_text_search is None:
+        raise search_unavailable_exception()
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no searchable words")
+    
+    response = {"query": q, "terms": terms}
+    try:
+        if scope in ("all", "users"):
+            response["users"] = await run_search(db, full_text_search.users(terms, limit + 1, offset), limit, offset)
+        if scope in ("all", "activities"):
+            response["activities"] = await run_search(
+                db, full_text_search.activities(terms, limit + 1, offset), limit, offset
+            )
+    except (OperationalError, ProgrammingError):
+        # No index: SQLite without FTS5, or migration 0006 has not run
+        logger.exception("Full-text search failed")
+        raise search_unavailable_exception()
+    return ORJSONResponse(response)
+
+@app.get("/admin/system/stats")
+async def get_system_stats(current_admin: Principal = Depends(get_current_admin)):
+    """Get runtime statistics for background workers"""
+    return {
+        "password_hashing": password_hasher.stats(),
+        "activity_log_writer": activity_log_writer.stats(),
+        "principal_cache": principal_cache.stats(),
+        "stats_counters": stats_counters.stats(),
+        "activity_archive": activity_archive.stats(),
+        "activity_feed": activity_feed.stats(),
+        "roster_import": roster_importer.stats(),
+        "request_scheduler": request_scheduler.stats(),
+        "cohort_report": cohort_report.stats(),
+        "booking_index": booking_index.stats(),
+        "admin_user_listing_cache": admin_user_listing_cache.stats(),
+        "provider_directory": provider_directory.stats(),
+        "group_chat": group_chat.stats(),
+        "group_message_writer": group_message_writer.stats(),
+        "startup": startup_report,
+        "login_rate_limits": {
+            "per_ip": login_ip_limiter.stats(),
+            "per_email": login_email_limiter.stats()
+        }
     }
 
 # User Protected Endpoints
 @app.put("/profile", response_model=User)
-def update_profile(name: str, current_user: UserDB = Depends(get_current_user), db: Session = Depends(get_db)):
+async def update_profile(name: str, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Update user profile"""
-    old_name = current_user.name
-    current_user.name = name
-    db.commit()
-    db.refresh(current_user)
+    user = await db.get(UserDB, current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    old_name = user.name
+    user.name = name
+    user.version = UserDB.version + 1
+    await principal_generation.bump(db)
+    await user_listing_generation.bump(db)
+    await db.commit()
+    await db.refresh(user)
+    principal_cache.invalidate(("user", user.email))
+    admin_user_listing_cache.invalidate()
     
     # Log profile update
     log_activity(
-        db, current_user.id, current_user.name, "profile_update", 
+        user.id, user.name, "profile_update", 
         f"User updated profile name from {old_name} to {name}",
         {"old_name": old_name, "new_name": name}
     )
     
-    return current_user
+    return user
 
-# Health check
-@app.get("/health")
-def health_check(db: Session = Depends(get_db)):
-    """Health check endpoint"""
+# Wellness assessments
+def assessment_response(row) -> dict:
+    return {
+        "id": row.id,
+        "questionnaire": row.questionnaire,
+        "responses": wellness_questionnaire.responses(row.answers),
+        "score": round(row.score, 2),
+        "severity": row.severity,
+        "submitted_at": row.submitted_at
+    }
+
+@app.get("/assessments/questionnaire")
+async def get_questionnaire():
+    """Question ids in answer order, the answer scale and the severity bands"""
+    return {
+        "name": wellness_questionnaire.name,
+        "questions": list(wellness_questionnaire.items),
+        "reverse_keyed": [item for item, reverse in zip(wellness_questionnaire.items, wellness_questionnaire.reverse_mask) if reverse],
+        "scale": {"min": 1, "max": wellness_questionnaire.scale_max},
+        "severity_bands": list(SEVERITY_BANDS)
+    }
+
+@app.post("/assessments", status_code=201, response_class=ORJSONResponse)
+async def submit_assessment(submission: AssessmentSubmission, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Store a completed wellness check and return its score"""
     try:
-        user_count = db.query(UserDB).count()
-        admin_count = db.query(AdminDB).count()
-        activity_count = db.query(ActivityLogDB).count()
-        return {
-            "status": "healthy", 
-            "users_count": user_count,
-            "admins_count": admin_count,
-            "activities_count": activity_count
-        }
-    except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
+        answers = wellness_questionnaire.pack(submission.responses)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    scores, bands = wellness_questionnaire.score(wellness_questionnaire.unpack([answers]))
+    
+    assessment = AssessmentDB(
+        id=str(uuid.uuid4()),
+        user_id=current_user.id,
+        department=await db.scalar(select(UserDB.department).where(UserDB.id == current_user.id)),
+        questionnaire=wellness_questionnaire.name,
+        answers=answers,
+        score=float(scores[0]),
+        severity=SEVERITY_BANDS[bands[0]],
+        submitted_at=datetime.utcnow()
+    )
+    db.add(assessment)
+    await db.commit()
+    cohort_report.invalidate()
+    
+    log_activity(
+        current_user.id, current_user.name, "assessment_submit",
+        f"User {current_user.name} completed a wellness check",
+        {"assessment_id": assessment.id, "questionnaire": assessment.questionnaire}
+    )
+    return ORJSONResponse(status_code=201, content=assessment_response(assessment))
 
-if __name__ == "__main__":
-    import uvicorn
+@app.get("/assessments/me", response_class=ORJSONResponse)
+async def get_my_assessments(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """The current user's wellness checks, newest first"""
+    result = await db.execute(
+        select(AssessmentDB.id, AssessmentDB.questionnaire, AssessmentDB.answers, AssessmentDB.score,
+               AssessmentDB.severity, AssessmentDB.submitted_at)
+        .where(AssessmentDB.user_id == current_user.id)
+        .order_by(AssessmentDB.submitted_at.desc())
+        .limit(limit)
+    )
+    return ORJSONResponse({"assessments": [assessment_response(row) for row in result]})
+
+@app.get("/admin/assessments/cohorts", response_class=ORJSONResponse)
+async def get_assessment_cohorts(
+    weeks: int = Query(12, ge=1, le=52),
+    department: Optional[str] = None,
+    current_admin: Principal = Depends(get_current_admin)
+):
+    """Severity band distribution per department per week"""
+    report = await asyncio.to_thread(cohort_report.build)
+    since = (datetime.utcnow() - timedelta(weeks=weeks)).date()
+    cohorts = [
+        row for row in report
+        if row["week_start"] > since and (department is None or row["department"] == department)
+    ]
+    return ORJSONResponse({"weeks": weeks, "severity_bands": list(SEVERITY_BANDS), "cohorts": cohorts})
+
+# Counselor bookings
+def booking_now() -> datetime:
+    return datetime.now(BOOKING_TIMEZONE).replace(tzinfo=None)
+
+def to_booking_time(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(BOOKING_TIMEZONE).replace(tzinfo=None)
+    return moment
+
+async def ensure_booking_index():
+    if booking_index.is_stale():
+        await asyncio.to_thread(booking_index.refresh, booking_now().date())
+
+def booking_response(row) -> dict:
+    return {
+        "id": row.id,
+        "counselor_id": row.counselor_id,
+        "slot_start": row.slot_start,
+        "slot_minutes": booking_index.grid.slot_minutes,
+        "status": row.status,
+        "session_type": row.session_type,
+        "reason": row.reason,
+        "urgency": row.urgency,
+        "notes": row.notes,
+        "created_at": row.created_at,
+        "cancelled_at": row.cancelled_at
+    }
+
+@app.get("/counselors", response_class=ORJSONResponse)
+async def get_counselors(db: AsyncSession = Depends(get_db)):
+    """Active counselors with their next free slot"""
+    await ensure_booking_index()
+    result = await db.execute(
+        select(CounselorDB.id, CounselorDB.name, CounselorDB.specialization)
+        .where(CounselorDB.is_active.is_(True))
+        .order_by(CounselorDB.name)
+    )
+    now = booking_now()
+    counselors = []
+    for row in result:
+        next_slots = booking_index.next_free(row.id, now, limit=1)
+        counselors.append({**row._asdict(), "next_free_slot": next_slots[0] if next_slots else None})
+    return ORJSONResponse({"counselors": counselors, "slot_minutes": booking_index.grid.slot_minutes})
+
+@app.get("/counselors/{counselor_id}/availability", response_class=ORJSONResponse)
+async def get_counselor_availability(
+    counselor_id: str,
+    start: Optional[date] = None,
+    days: int = Query(7, ge=1, le=31)
+):
+    """Free slots per day, from start (today by default) for the given number of days"""
+    await ensure_booking_index()
+    if not booking_index.has_counselor(counselor_id):
+        raise HTTPException(status_code=404, detail="Counselor not found")
+    now = booking_now()
+    after = max(now, datetime.combine(start, datetime.min.time())) if start else now
+    first_day = start or now.date()
+    free = booking_index.next_free(counselor_id, after, limit=len(booking_index.grid.open_slots()) * days,
+                                   days=(first_day - after.date()).days + days)
+    by_day = {first_day + timedelta(days=offset): [] for offset in range(days)}
+    for slot_start in free:
+        by_day[slot_start.date()].append(slot_start)
+    return ORJSONResponse({
+        "counselor_id": counselor_id,
+        "slot_minutes": booking_index.grid.slot_minutes,
+        "days": [{"date": day, "free_slots": slots} for day, slots in by_day.items()]
+    })
+
+@app.get("/counselors/{counselor_id}/next-free", response_class=ORJSONResponse)
+async def get_next_free_slots(counselor_id: str, limit: int = Query(5, ge=1, le=50)):
+    """The counselor's earliest free slots from now"""
+    await ensure_booking_index()
+    if not booking_index.has_counselor(counselor_id):
+        raise HTTPException(status_code=404, detail="Counselor not found")
+    return ORJSONResponse({
+        "counselor_id": counselor_id,
+        "slot_minutes": booking_index.grid.slot_minutes,
+        "slots": booking_index.next_free(counselor_id, booking_now(), limit=limit)
+    })
+
+@app.post("/bookings", status_code=201, response_class=ORJSONResponse)
+async def create_booking(booking: BookingCreate, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Reserve a counselor's slot; 409 if it is already taken"""
+    await ensure_booking_index()
+    if not booking_index.has_counselor(booking.counselor_id):
+        raise HTTPException(status_code=404, detail="Counselor not found")
+    slot_start = to_booking_time(booking.slot_start)
+    try:
+        is_free = booking_index.is_free(booking.counselor_id, slot_start)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=f"Not a bookable slot: {exc}")
+    if slot_start <= booking_now():
+        raise HTTPException(status_code=422, detail="This slot has already started")
+    if not booking_index.in_horizon(slot_start):
+        raise HTTPException(status_code=422, detail=f"Slots can be booked up to {booking_index.horizon_days} days ahead")
+    if not is_free:
+        raise HTTPException(status_code=409, detail="This slot is already booked")
+    
+    # The insert is the compare-and-set: the unique index on active bookings rejects a second one
+    row = BookingDB(
+        id=str(uuid.uuid4()),
+        counselor_id=booking.counselor_id,
+        user_id=current_user.id,
+        slot_start=slot_start,
+        status="booked",
+        session_type=booking.session_type,
+        reason=booking.reason,
+        urgency=booking.urgency,
+        notes=booking.notes,
+        created_at=datetime.utcnow()
+    )
+    db.add(row)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        booking_index.mark(booking.counselor_id, slot_start, True)
+        raise HTTPException(status_code=409, detail="This slot is already booked")
+    booking_index.mark(booking.counselor_id, slot_start, True)
+    
+    log_activity(
+        current_user.id, current_user.name, "booking_create",
+        f"User {current_user.name} booked a {booking.session_type} session",
+        {"booking_id": row.id, "counselor_id": row.counselor_id, "slot_start": slot_start.isoformat()}
+    )
+    return ORJSONResponse(status_code=201, content=booking_response(row))
+
+@app.get("/bookings/me", response_class=ORJSONResponse)
+async def get_my_bookings(
+    include_past: bool = False,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """The current user's bookings, soonest first"""
+    query = select(
+        BookingDB.id, BookingDB.counselor_id, BookingDB.slot_start, BookingDB.status, BookingDB.session_type,
+        BookingDB.reason, BookingDB.urgency, BookingDB.notes, BookingDB.created_at, BookingDB.cancelled_at
+    ).where(BookingDB.user_id == current_user.id)
+    if not include_past:
+        query = query.where(BookingDB.slot_start >= booking_now())
+    result = await db.execute(query.order_by(BookingDB.slot_start).limit(limit))
+    return ORJSONResponse({"bookings": [booking_response(row) for row in result]})
+
+@app.delete("/bookings/{booking_id}", response_class=ORJSONResponse)
+async def cancel_booking(booking_id: str, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Cancel one of the current user's bookings and free its slot"""
+    result = await db.execute(
+        update(BookingDB)
+        .where(BookingDB.id == booking_id, BookingDB.user_id == current_user.id, BookingDB.status == "booked")
+        .values(status="cancelled", cancelled_at=datetime.utcnow())
+        .returning(BookingDB.counselor_id, BookingDB.slot_start)
+    )
+    cancelled = result.first()
+    await db.commit()
+    if cancelled is None:
+        exists = await db.scalar(
+            select(BookingDB.id).where(BookingDB.id == booking_id, BookingDB.user_id == current_user.id)
+        )
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        raise HTTPException(status_code=409, detail="Booking is already cancelled")
+    booking_index.mark(cancelled.counselor_id, cancelled.slot_start, False)
+    
+    log_activity(
+        current_user.id, current_user.name, "booking_cancel",
+        f"User {current_user.name} cancelled a booking",
+        {"booking_id": booking_id, "counselor_id": cancelled.counselor_id, "slot_start": cancelled.slot_start.isoformat()}
+    )
+    return ORJSONResponse({"id": booking_id, "status": "cancelled"})
+
+# Nearest providers
+@app.get("/providers/nearest", response_class=ORJSONResponse)
+async def get_nearest_providers(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=100),
+    radius_km: Optional[float] = Query(None, gt=0, le=20000),
+    specialization: Optional[str] = None
+):
+    """The k nearest providers, or with radius_km every provider within it (nearest k first)"""
+    providers = provider_directory.current
+    if providers is None:
+        raise HTTPException(status_code=503, detail="The provider directory is not available yet")
+    if radius_km is None:
+        found = providers.nearest(lat, lon, k, specialization=specialization)
+    else:
+        found = providers.within(lat, lon, radius_km, limit=k, specialization=specialization)
+    return ORJSONResponse({
+        "providers": [providers.record(index, distance) for index, distance in found],
+        "count": len(found)
+    })
+
+@app.post("/admin/providers/reload")
+async def reload_providers(current_admin: Principal = Depends(get_current_admin)):
+    """Reload the provider dataset; lookups keep using the old one until the new one is ready"""
+    try:
+        await asyncio.to_thread(provider_directory.reload)
+    except (ProviderDatasetError, OSError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=f"Could not reload providers: {exc}")
+    
+    log_activity(
+        current_admin.id, current_admin.name, "admin_action",
+        f"Admin {current_admin.name} reloaded the provider directory",
+        {"action": "reload_providers", "providers": len(provider_directory.current), "admin_action": True}
+    )
+    return provider_directory.stats()
+
+# Peer-support groups
+GROUP_MESSAGE_COLUMNS = (GroupMessageDB.id, GroupMessageDB.user_id, GroupMessageDB.user_name,
+                         GroupMessageDB.body, GroupMessageDB.sent_at)
+
+async def group_membership(db: AsyncSession, group_id: str, user_id: str) -> Optional[bool]:
+    """Whether the group is active if the user is a member of it, None if they are not"""
+    return await db.scalar(
+        select(SupportGroupDB.is_active)
+        .join(GroupMemberDB, and_(GroupMemberDB.group_id == SupportGroupDB.id, GroupMemberDB.user_id == user_id))
+        .where(SupportGroupDB.id == group_id)
+    )
+
+@app.get("/groups", response_class=ORJSONResponse)
+async def get_support_groups(db: AsyncSession = Depends(get_db)):
+    """Support groups with their member counts"""
+    members = (
+        select(GroupMemberDB.group_id, func.count().label("members"))
+        .group_by(GroupMemberDB.group_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(SupportGroupDB.id, SupportGroupDB.name, SupportGroupDB.description, SupportGroupDB.category,
+               SupportGroupDB.is_active, func.coalesce(members.c.members, 0).label("members"))
+        .outerjoin(members, members.c.group_id == SupportGroupDB.id)
+        .order_by(SupportGroupDB.name)
+    )
+    return ORJSONResponse({"groups": [row._asdict() for row in result]})
+
+@app.post("/groups/{group_id}/join")
+async def join_support_group(group_id: str, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Become a member of a group; joining twice is not an error"""
+    group = await db.get(SupportGroupDB, group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    if not group.is_active:
+        raise HTTPException(status_code=409, detail="This group is not currently active")
+    
+    db.add(GroupMemberDB(group_id=group_id, user_id=current_user.id, joined_at=datetime.utcnow()))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return {"group_id": group_id, "joined": False, "message": "Already a member"}
+    
+    log_activity(
+        current_user.id, current_user.name, "group_join",
+        f"User {current_user.name} joined {group.name}",
+        {"group_id": group_id}
+    )
+    return {"group_id": group_id, "joined": True, "message": f"Joined {group.name}"}
+
+@app.post("/groups/{group_id}/leave")
+async def leave_support_group(group_id: str, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Stop being a member of a group"""
+    result = await db.execute(
+        GroupMemberDB.__table__.delete().where(GroupMemberDB.group_id == group_id, GroupMemberDB.user_id == current_user.id)
+    )
+    await db.commit()
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Not a member of this group")
+    return {"group_id": group_id, "left": True}
+
+@app.get("/groups/{group_id}/messages", response_class=ORJSONResponse)
+async def get_group_messages(
+    group_id: str,
+    before: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Earlier messages of a group the user belongs to, newest first"""
+    if await group_membership(db, group_id, current_user.id) is None:
+        raise HTTPException(status_code=403, detail="Join this group to read its messages")
+    query = select(*GROUP_MESSAGE_COLUMNS).where(GroupMessageDB.group_id == group_id)
+    if before is not None:
+        query = query.where(GroupMessageDB.sent_at < before)
+    result = await db.execute(query.order_by(GroupMessageDB.sent_at.desc()).limit(limit))
+    return ORJSONResponse({"messages": [row._asdict() for row in result]})
+
+@app.websocket("/ws/groups/{group_id}")
+async def group_chat_socket(websocket: WebSocket, group_id: str):
+    """Live chat for members of a group; the first message must be {"type": "auth", "token": ...}"""
+    # The token travels in a message rather than the URL, which access logs and proxies record
+    await websocket.accept()
+    try:
+        first = await asyncio.wait_for(websocket.receive(), GROUP_CHAT_AUTH_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        first = {}
+    if first.get("type") == "websocket.disconnect":
+        return
+    token = auth_token(first.get("text"))
+    if token is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Could not validate credentials")
+        return
+    
+    # A short-lived session for the handshake only - the connection may stay open for hours
+    async with AsyncSessionLocal() as db:
+        try:
+            user = await authenticate_user_token(token, db)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Could not validate credentials")
+            return
+        if not await group_membership(db, group_id, user.id):
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Not a member of an active group")
+            return
+        if not group_chat.is_open(group_id):
+            result = await db.execute(
+                select(*GROUP_MESSAGE_COLUMNS)
+                .where(GroupMessageDB.group_id == group_id)
+                .order_by(GroupMessageDB.sent_at.desc())
+                .limit(group_chat.history_size)
+            )
+            group_chat.open_room(group_id, reversed([row._asdict() for row in result]))
+    
+    member = RoomMember(user.id, user.name, group_chat.queue_size)
+    await websocket.send_text(group_chat.join(group_id, member))
+    
+    async def send_frames():
+        while True:
+            frame = await member.get()
+            if frame is None:
+                # Fell too far behind the room - the client reconnects and gets the history again.
+                # Its socket is probably not draining, so do not wait long for the close frame to go out.
+                try:
+                    await asyncio.wait_for(
+                        websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too slow to keep up"), 1.0
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                return
+            await websocket.send_text(frame)
+    
+    async def receive_messages():
+        while True:
+            data = await websocket.receive_text()
+            try:
+                body = orjson.loads(data).get("body")
+            except (orjson.JSONDecodeError, AttributeError):
+                body = None
+            if not isinstance(body, str) or not body.strip() or len(body) > GROUP_MESSAGE_MAX_LENGTH:
+                member.offer(orjson.dumps({
+                    "type": "error",
+                    "detail": f"Messages are JSON objects with a body of 1 to {GROUP_MESSAGE_MAX_LENGTH} characters"
+                }).decode())
+                continue
+            group_chat.publish(group_id, {
+                "id": str(uuid.uuid4()),
+                "user_id": user.id,
+                "user_name": user.name,
+                "body": body.strip(),
+                "sent_at": datetime.utcnow()
+            })
+    
+    # The connection ends when the client disconnects or is dropped for being too slow
+    tasks = (asyncio.create_task(receive_messages()), asyncio.create_task(send_frames()))
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        group_chat.leave(group_id, member)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# Crisis help - scheduled in the crisis class, with reserved slots and its own DB pool
+@app.post("/crisis/help", status_code=201)
+async def request_crisis_help(
+    help_request: CrisisHelpRequest,
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_db)
+):
+    """Record a request for crisis help; signed-in and anonymous students are both accepted"""
+    user = None
+    if credentials:
+        try:
+            user = await authenticate_user_token(credentials.credentials, db)
+        except HTTPException:
+            pass  # never turn someone away over a stale token
+    
+    # Written inline rather than through the batch writer so the request is durable before we answer
+    activity = {
+        "id": str(uuid.uuid4()),
+        "user_id": user.id if user else None,
+        "user_name": user.name if user else None,
+        "type": "crisis_help",
+        "description": f"{user.name if user else 'An anonymous student'} asked for {help_request.crisis_type} crisis help",
+        "details": {"crisis_type": help_request.crisis_type, "message": help_request.message},
+        "ip_address": request.client.host if request.client else None,
+        "user_agent": request.headers.get("user-agent"),
+        "timestamp": datetime.utcnow()
+    }
+    db.add(ActivityLogDB(**activity))
+    await stats_counters.incr(db, {"activity_logs_total": 1})
+    await db.commit()
+    activity_feed.publish({**activity, "timestamp": activity["timestamp"].isoformat()})
+    
+    return {"id": activity["id"], "status": "received", "received_at": activity["timestamp"]}
+
+# Health checks
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "2"))
+READINESS_DB_TIMEOUT_SECONDS = float(os.getenv("READINESS_DB_TIMEOUT_SECONDS", "1"))
+HEALTH_MIN_INTERVAL_SECONDS = float(os.getenv("HEALTH_MIN_INTERVAL_SECONDS", "10"))
+_readiness = {"checked_at": None, "ready": False, "reason": "not checked yet"}
+_readiness_lock = asyncio.Lock()
+_health_report = {"checked_at": None, "report": None}
+_health_lock = asyncio.Lock()
+
+def pool_status(pool):
+    """Checked-out/overflow figures for a QueuePool-style connection pool"""
+    status_info = {"pool_class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status_info[name] = method()
+    max_overflow = getattr(pool, "_max_overflow", None)
+    if "size" in status_info and max_overflow is not None and max_overflow >= 0:
+        status_info["available"] = status_info["size"] + max_overflow - status_info["checkedout"]
+    return status_info
+
+async def ping_database():
+    """Round-trip a SELECT 1 and return its latency in milliseconds"""
+    started = time.perf_counter()
+    
+    async def ping():
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    
+    await asyncio.wait_for(ping(), READINESS_DB_TIMEOUT_SECONDS)
+    return round((time.perf_counter() - started) * 1000, 2)
+
+@app.get("/livez")
+async def liveness_check():
+    """Liveness probe - the process is up and serving; no I/O"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """Readiness probe - cached database ping plus pool headroom"""
+    async with _readiness_lock:
+        now = time.monotonic()
+        checked_at = _readiness["checked_at"]
+        if checked_at is None or now - checked_at >= READINESS_CACHE_SECONDS:
+            pool = pool_status(async_engine.pool)
+            if pool.get("available", 1) <= 0:
+                # Pinging would only queue behind the requests holding the pool
+                _readiness.update(ready=False, reason="database connection pool exhausted")
+            else:
+                try:
+                    await ping_database()
+                    _readiness.update(ready=True, reason=None)
+                except Exception as e:
+                    _readiness.update(ready=False, reason=f"database unreachable: {e!r}")
+            _readiness["checked_at"] = now
+        ready, reason = _readiness["ready"], _readiness["reason"]
+        age = round(now - _readiness["checked_at"], 3)
+    
+    if not ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "not_ready", "reason": reason, "checked_seconds_ago": age}
+        )
+    return {"status": "ready", "checked_seconds_ago": age}
+
+@app.get("/health")
+async def health_check():
+    """Detailed health report - recomputed at most every HEALTH_MIN_INTERVAL_SECONDS"""
+    async with _health_lock:
+        now = time.monotonic()
+        checked_at = _health_report["checked_at"]
+        if checked_at is None or now - checked_at >= HEALTH_MIN_INTERVAL_SECONDS:
+            database = {"pool": pool_status(async_engine.pool)}
+            try:
+                database["latency_ms"] = await ping_database()
+                database["status"] = "ok"
+            except Exception as e:
+                database["status"] = "error"
+                database["error"] = repr(e)
+            
+            workers = {
+                "password_hashing": password_hasher.stats(),
+                "activity_log_writer": activity_log_writer.stats(),
+                "stats_counters": stats_counters.stats(),
+                "activity_archive": activity_archive.stats()
+            }
+            workers_running = workers["activity_log_writer"]["running"] and workers["stats_counters"]["running"]
+            if database["status"] != "ok":
+                overall = "unhealthy"
+            elif not workers_running:
+                overall = "degraded"
+            else:
+                overall = "healthy"
+            
+            _health_report["report"] = {
+                "status": overall,
+                "checked_at": datetime.utcnow(),
+                "database": database,
+                "background_workers": workers
+            }
+            _health_report["checked_at"] = now
+        return _health_report["report"]
 
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+# Metrics
+def collect_runtime_metrics():
+    """Pool and background worker gauges, read when /metrics is scraped"""
+    pools = []
+    for engine_name, pool in (("request", async_engine.pool), ("crisis", crisis_async_engine.pool),
+                              ("background", engine.pool)):
+        for state, value in pool_status(pool).items():
+            if state != "pool_class":
+                pools.append(({"engine": engine_name, "state": state}, value))
+    hashing = password_hasher.stats()
+    writer = activity_log_writer.stats()
+    scheduler = request_scheduler.stats()
+    return (
+        metric_family("gauge", "db_pool_connections", "Connection pool size and usage by engine.", pools)
+        + metric_family("gauge", "password_hash_queue_depth", "bcrypt jobs queued or running.",
+                       [({}, hashing["queue_depth"])])
+        + metric_family("counter", "password_hash_rejected_total", "bcrypt jobs rejected because the queue was full.",
+                       [({}, hashing["rejected"])])
+        + metric_family("gauge", "activity_log_buffered", "Activity log rows waiting for the background writer.",
+                       [({}, writer["buffered"])])
+        + metric_family("counter", "activity_log_dropped_total", "Activity log rows dropped because the buffer was full.",
+                       [({}, writer["dropped"])])
+        + metric_family("gauge", "activity_feed_subscribers", "Open live activity feed connections.",
+                       [({}, activity_feed.stats()["subscribers"])])
+        + metric_family("gauge", "requests_scheduled", "Requests running or queued, by priority class and state.",
+                       [({"priority": name, "state": state}, stats[state])
+                        for name, stats in scheduler["classes"].items() for state in ("in_flight", "queued")])
+        + metric_family("counter", "requests_shed_total", "Requests rejected with 503 by the scheduler, by priority class.",
+                       [({"priority": name}, stats["shed"]) for name, stats in scheduler["classes"].items()])
+    )
+
+metrics.add_collector(collect_runtime_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus scrape endpoint - requires METRICS_TOKEN as a bearer token when it is set"""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+if __name__ == "__main__":
+    # serve.py is the real entry point; this keeps `python main.py` working
+    import serve
 
+    serve.main()
@@ -0,0 +1,64 @@
+from logging.config import fileConfig
+import os
+
+from alembic import context
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, pool
+
+config = context.config
+
+# The app runs migrations in-process and keeps its own logging setup
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+# Migrations are written by hand; the app models are not imported here
+# because importing main has startup side effects.
+target_metadata = None
+
+
+def get_url():
+    load_dotenv()
+    url = os.getenv("DATABASE_URL", "sqlite:///./users.db")
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+        transaction_per_migration=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # The app passes its own connection in; the CLI opens one from DATABASE_URL.
+    # Either way each migration runs in its own transaction, which migrations with
+    # an autocommit block (PostgreSQL CREATE INDEX CONCURRENTLY) require.
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata,
+                          render_as_batch=True, transaction_per_migration=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    connectable = create_engine(get_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata,
+                          render_as_batch=True, transaction_per_migration=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
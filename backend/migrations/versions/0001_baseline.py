@@ -0,0 +1,79 @@
+"""Baseline schema: users, admins, activity_logs
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+Databases created before migrations existed already have these tables
+(they were made by Base.metadata.create_all), so each table is only
+created when it is missing.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=True),
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column("password_hash", sa.String(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("last_login", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_name", "users", ["name"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "admins" not in existing:
+        op.create_table(
+            "admins",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=True),
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column("password_hash", sa.String(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_admins_id", "admins", ["id"])
+        op.create_index("ix_admins_name", "admins", ["name"])
+        op.create_index("ix_admins_email", "admins", ["email"], unique=True)
+
+    if "activity_logs" not in existing:
+        op.create_table(
+            "activity_logs",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("user_id", sa.String(), nullable=True),
+            sa.Column("user_name", sa.String(), nullable=True),
+            sa.Column("type", sa.String(), nullable=True),
+            sa.Column("description", sa.String(), nullable=True),
+            sa.Column("details", sa.Text(), nullable=True),
+            sa.Column("ip_address", sa.String(), nullable=True),
+            sa.Column("user_agent", sa.String(), nullable=True),
+            sa.Column("timestamp", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_activity_logs_id", "activity_logs", ["id"])
+        op.create_index("ix_activity_logs_type", "activity_logs", ["type"])
+
+
+def downgrade() -> None:
+    op.drop_table("activity_logs")
+    op.drop_table("admins")
+    op.drop_table("users")
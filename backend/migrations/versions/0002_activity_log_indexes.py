@@ -0,0 +1,49 @@
+"""Indexes for activity log queries and sorted admin user listings
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:01
+
+On PostgreSQL the indexes are built with CREATE INDEX CONCURRENTLY outside
+a transaction, so writers are not blocked while they build. SQLite has no
+online index build; there each index holds the write lock only for its own
+build, which is one pass over the table.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_activity_logs_timestamp", "activity_logs", ["timestamp"]),
+    ("ix_activity_logs_type_timestamp", "activity_logs", ["type", "timestamp"]),
+    ("ix_activity_logs_user_id_timestamp", "activity_logs", ["user_id", "timestamp"]),
+    # id is the keyset pagination tiebreaker for /admin/users
+    ("ix_users_created_at_id", "users", ["created_at", "id"]),
+    ("ix_users_last_login_id", "users", ["last_login", "id"]),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+            # (type, timestamp) covers every lookup the single-column index served
+            op.drop_index("ix_activity_logs_type", table_name="activity_logs", postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+        op.drop_index("ix_activity_logs_type", table_name="activity_logs", if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index("ix_activity_logs_type", "activity_logs", ["type"], if_not_exists=True)
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
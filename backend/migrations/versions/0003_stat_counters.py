@@ -0,0 +1,47 @@
+"""Incrementally maintained counters for the admin dashboard and health check
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:02
+
+Counters are seeded from a one-off COUNT(*) of the existing rows; after
+that the application keeps them current as rows are written.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEED_QUERIES = {
+    "users_total": "SELECT COUNT(*) FROM users",
+    "users_active": "SELECT COUNT(*) FROM users WHERE is_active",
+    "admins_total": "SELECT COUNT(*) FROM admins",
+    "activity_logs_total": "SELECT COUNT(*) FROM activity_logs",
+    "dashboard_views_total": "SELECT COUNT(*) FROM activity_logs WHERE type = 'dashboard_view'",
+    "posts_total": "SELECT COUNT(*) FROM activity_logs WHERE type = 'post_create'",
+}
+
+
+def upgrade() -> None:
+    counters = op.create_table(
+        "stat_counters",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("value", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    bind = op.get_bind()
+    op.bulk_insert(counters, [
+        {"name": name, "value": bind.execute(sa.text(query)).scalar() or 0}
+        for name, query in SEED_QUERIES.items()
+    ])
+
+
+def downgrade() -> None:
+    op.drop_table("stat_counters")
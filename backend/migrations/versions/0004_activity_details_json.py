@@ -0,0 +1,35 @@
+"""Store activity_logs.details as native JSON
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:03
+
+PostgreSQL converts the column to JSONB in place. SQLite keeps JSON as
+TEXT, and existing values were written with json.dumps, so the data is
+already in the right form. Rebuilding the table just to change the
+declared type would lock it for a full copy, so SQLite only has any
+malformed values cleared (JSON1 json_valid).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("ALTER TABLE activity_logs ALTER COLUMN details TYPE JSONB USING details::jsonb")
+    elif dialect == "sqlite":
+        op.execute("UPDATE activity_logs SET details = NULL WHERE details IS NOT NULL AND json_valid(details) = 0")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("ALTER TABLE activity_logs ALTER COLUMN details TYPE TEXT USING details::text")
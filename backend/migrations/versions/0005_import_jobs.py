@@ -0,0 +1,47 @@
+"""Progress records for background roster imports
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:04
+
+Import jobs run in whichever worker received the upload, so their progress
+lives in the database where every worker can read it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "import_jobs",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("format", sa.String(), nullable=False),
+        sa.Column("created_by", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("total_rows", sa.Integer(), nullable=True),
+        sa.Column("processed_rows", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("duplicate_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("invalid_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("errors", sa.JSON().with_variant(postgresql.JSONB(), "postgresql"), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_import_jobs_created_at", "import_jobs", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_import_jobs_created_at", table_name="import_jobs")
+    op.drop_table("import_jobs")
@@ -0,0 +1,110 @@
+"""Full-text search index over users and activity logs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:05
+
+SQLite gets FTS5 tables that index the base tables' columns without a copy
+of the text (external content), kept in sync by triggers and keyed by
+rowid. VACUUM may renumber the rowids of these tables, so run
+``INSERT INTO users_fts(users_fts) VALUES('rebuild')`` (and the same for
+activity_logs_fts) after one. If this SQLite build lacks FTS5 the index
+is skipped and /admin/search reports that search is unavailable.
+
+PostgreSQL gets a GIN expression index over to_tsvector('simple', ...) on
+each table, built with CREATE INDEX CONCURRENTLY outside the migration
+transaction so writes continue while it builds; a stored generated column
+would rewrite the whole table under an exclusive lock. services/search.py
+repeats the indexed expressions verbatim so the planner can use them. The
+'simple' configuration is used because names and emails should not be
+stemmed.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> (fts table, indexed columns). Prefix indexes make short
+# search-as-you-type prefixes as cheap as whole words. Token positions are
+# not stored (detail=column) - searches never use phrases, and smaller
+# doclists are what keep common words fast at a million rows.
+SQLITE_INDEXES = {
+    "users": ("users_fts", ("name", "email")),
+    "activity_logs": ("activity_logs_fts", ("description", "user_name")),
+}
+
+# Must match POSTGRES_DOCUMENTS in services/search.py character for character
+POSTGRES_DOCUMENTS = {
+    # Emails are split into words, as FTS5 does, so "ana uni" matches ana@uni.edu
+    "users": "coalesce(name, '') || ' ' || translate(coalesce(email, ''), '@.+_-', '     ')",
+    "activity_logs": "coalesce(description, '') || ' ' || coalesce(user_name, '')",
+}
+
+
+def sqlite_has_fts5(bind):
+    try:
+        bind.execute(sa.text("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)"))
+    except sa.exc.OperationalError:
+        return False
+    bind.execute(sa.text("DROP TABLE temp.fts5_probe"))
+    return True
+
+
+def upgrade_sqlite(bind) -> None:
+    if not sqlite_has_fts5(bind):
+        return
+    for table, (fts, columns) in SQLITE_INDEXES.items():
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({column_list}, content='{table}', "
+            f"content_rowid='rowid', prefix='2 3 4', detail=column)"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.rowid, {new_values}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {column_list} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.rowid, {new_values}); END"
+        )
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        upgrade_sqlite(bind)
+    elif bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for table, document in POSTGRES_DOCUMENTS.items():
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search "
+                    f"ON {table} USING gin ((to_tsvector('simple', {document})))"
+                )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for table, (fts, _) in SQLITE_INDEXES.items():
+            for suffix in ("ai", "ad", "au"):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
+    elif bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for table in POSTGRES_DOCUMENTS:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search")
@@ -0,0 +1,47 @@
+"""Wellness assessments and student departments
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:06
+
+Answers are stored packed, one byte per question in questionnaire order.
+Each assessment keeps the student's department at submission time, so
+cohort reports do not change when a student moves department.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("department", sa.String(), nullable=True))
+    op.create_table(
+        "assessments",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("department", sa.String(), nullable=True),
+        sa.Column("questionnaire", sa.String(), nullable=False),
+        sa.Column("answers", sa.LargeBinary(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("severity", sa.String(), nullable=False),
+        sa.Column("submitted_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_assessments_submitted_at", "assessments", ["submitted_at"])
+    op.create_index("ix_assessments_user_id_submitted_at", "assessments", ["user_id", "submitted_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_assessments_user_id_submitted_at", table_name="assessments")
+    op.drop_index("ix_assessments_submitted_at", table_name="assessments")
+    op.drop_table("assessments")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("department")
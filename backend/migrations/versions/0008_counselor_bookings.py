@@ -0,0 +1,71 @@
+"""Counselors and session bookings
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:07
+
+A slot can only hold one active booking: the unique index covers
+(counselor_id, slot_start) for rows still in the "booked" status, so a
+cancelled slot can be booked again. The counselors shown by the booking
+page are seeded with the ids it already uses.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    counselors = op.create_table(
+        "counselors",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("specialization", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "bookings",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("counselor_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("slot_start", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("session_type", sa.String(), nullable=False),
+        sa.Column("reason", sa.String(), nullable=True),
+        sa.Column("urgency", sa.String(), nullable=False),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("cancelled_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "uq_bookings_counselor_id_slot_start", "bookings", ["counselor_id", "slot_start"], unique=True,
+        sqlite_where=sa.text("status = 'booked'"), postgresql_where=sa.text("status = 'booked'")
+    )
+    op.create_index("ix_bookings_slot_start", "bookings", ["slot_start"])
+    op.create_index("ix_bookings_user_id_slot_start", "bookings", ["user_id", "slot_start"])
+
+    now = datetime.utcnow()
+    op.bulk_insert(counselors, [
+        {"id": "1", "name": "Dr. Sarah Wilson", "specialization": "Anxiety & Depression", "is_active": True, "created_at": now},
+        {"id": "2", "name": "Dr. Michael Chen", "specialization": "Trauma & PTSD", "is_active": True, "created_at": now},
+        {"id": "3", "name": "Dr. Emily Rodriguez", "specialization": "Relationship & Family", "is_active": True, "created_at": now},
+    ])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bookings_user_id_slot_start", table_name="bookings")
+    op.drop_index("ix_bookings_slot_start", table_name="bookings")
+    op.drop_index("uq_bookings_counselor_id_slot_start", table_name="bookings")
+    op.drop_table("bookings")
+    op.drop_table("counselors")
@@ -0,0 +1,73 @@
+"""Peer-support groups, memberships and group chat messages
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:08
+
+The groups shown on the peer-support page are seeded with the ids it
+already uses. Chat messages are written in batches by a background writer.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    support_groups = op.create_table(
+        "support_groups",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("category", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "group_members",
+        sa.Column("group_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("joined_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("group_id", "user_id"),
+    )
+    op.create_index("ix_group_members_user_id", "group_members", ["user_id"])
+    op.create_table(
+        "group_messages",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("group_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("user_name", sa.String(), nullable=True),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_group_messages_group_id_sent_at", "group_messages", ["group_id", "sent_at"])
+
+    now = datetime.utcnow()
+    op.bulk_insert(support_groups, [
+        {"id": "1", "name": "Anxiety Support Circle", "category": "Anxiety", "is_active": True, "created_at": now,
+         "description": "A safe space to share experiences and coping strategies for anxiety."},
+        {"id": "2", "name": "Depression Recovery Group", "category": "Depression", "is_active": True, "created_at": now,
+         "description": "Connect with others on the journey to overcoming depression."},
+        {"id": "3", "name": "Young Adults Mental Health", "category": "General", "is_active": True, "created_at": now,
+         "description": "Support group for young adults navigating mental health challenges."},
+        {"id": "4", "name": "Workplace Stress Management", "category": "Stress", "is_active": False, "created_at": now,
+         "description": "Strategies for managing stress and maintaining wellbeing at work."},
+    ])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_group_messages_group_id_sent_at", table_name="group_messages")
+    op.drop_table("group_messages")
+    op.drop_index("ix_group_members_user_id", table_name="group_members")
+    op.drop_table("group_members")
+    op.drop_table("support_groups")
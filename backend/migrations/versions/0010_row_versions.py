@@ -0,0 +1,32 @@
+"""Row versions for users and admins
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 00:00:09
+
+Every write to a user or admin row increments its version, and the
+ETags of /me, /admin/me and /admin/users/{user_id} are derived from it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column("admins", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("admins") as batch_op:
+        batch_op.drop_column("version")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("version")
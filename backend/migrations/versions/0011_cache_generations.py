@@ -0,0 +1,34 @@
+"""Shared cache generations
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 00:00:10
+
+Counter rows that writers bump when cached data changes, so every worker
+can tell that its in-process copy is stale.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+GENERATIONS = ("principals_generation", "user_listing_generation")
+
+
+def upgrade() -> None:
+    counters = sa.table("stat_counters", sa.column("name", sa.String()), sa.column("value", sa.BigInteger()))
+    op.bulk_insert(counters, [{"name": name, "value": 0} for name in GENERATIONS])
+
+
+def downgrade() -> None:
+    op.execute(
+        sa.text("DELETE FROM stat_counters WHERE name IN :names")
+        .bindparams(sa.bindparam("names", GENERATIONS, expanding=True))
+    )
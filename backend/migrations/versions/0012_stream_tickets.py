@@ -0,0 +1,35 @@
+"""Single-use tickets for the activity stream
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 00:00:11
+
+EventSource cannot send an Authorization header, so the admin dashboard
+exchanges its token for a short-lived ticket that opens the stream once.
+Tickets live in the database so any worker can redeem them.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stream_tickets",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("admin_id", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("stream_tickets")
@@ -0,0 +1,33 @@
+"""Heartbeats for roster import jobs
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17 00:00:12
+
+The worker running an import refreshes heartbeat_at until the job ends.
+A queued or running job whose heartbeat has gone stale belongs to a worker
+that exited without stopping; the next worker to start marks it
+interrupted and deletes the upload at spool_path.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("import_jobs", sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+    op.add_column("import_jobs", sa.Column("spool_path", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("import_jobs") as batch_op:
+        batch_op.drop_column("spool_path")
+        batch_op.drop_column("heartbeat_at")
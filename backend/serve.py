@@ -0,0 +1,117 @@
+"""Production entry point for the API.
+
+    python serve.py                      # one worker per CPU on $PORT (default 8000)
+    python serve.py --workers 4 --max-requests 5000 --max-requests-jitter 500
+    python serve.py --reload             # single auto-reloading process for development
+
+Every option also reads an environment variable so a platform can configure
+it without changing the start command: HOST, PORT, WEB_CONCURRENCY,
+MAX_REQUESTS, MAX_REQUESTS_JITTER, GRACEFUL_TIMEOUT_SECONDS,
+FORWARDED_ALLOW_IPS, LOG_LEVEL and RELOAD=1.
+
+On SIGTERM each worker stops accepting connections, waits up to the graceful
+timeout for in-flight requests, then runs the app's lifespan shutdown, which
+flushes buffered activity logs. Workers that have served --max-requests
+requests exit the same way and are replaced, which bounds memory growth.
+Each worker adds a random 0..--max-requests-jitter to its limit when it
+starts (as gunicorn's max_requests_jitter does), so workers that started
+together do not all recycle at once and stall the whole service.
+Each worker has its own connection pools (DB_POOL_SIZE + DB_MAX_OVERFLOW for
+requests, DB_BACKGROUND_POOL_SIZE for background threads), so size them so
+that workers x pools fits the database's connection limit.
+"""
+import argparse
+import copy
+import importlib.util
+import os
+import random
+import sys
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+from uvicorn.main import STARTUP_FAILURE
+from uvicorn.supervisors import Multiprocess
+
+
+def _installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+class JitteredServer(uvicorn.Server):
+    """uvicorn server that draws its own request limit when the worker process starts"""
+
+    def __init__(self, config, max_requests_jitter=0):
+        super().__init__(config)
+        self.max_requests_jitter = max_requests_jitter
+
+    def run(self, sockets=None):
+        # Runs in the worker (a spawned process with its own copy of config), so
+        # every worker, including each replacement, gets a different limit
+        if self.config.limit_max_requests and self.max_requests_jitter > 0:
+            self.config.limit_max_requests += random.randint(0, self.max_requests_jitter)
+        return super().run(sockets)
+
+
+def log_config(level):
+    """uvicorn's logging setup, extended to the app's own loggers"""
+    config = copy.deepcopy(LOGGING_CONFIG)
+    config["loggers"][""] = {"handlers": ["default"], "level": level.upper()}
+    return config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the API with uvicorn")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("MAX_REQUESTS", "10000")),
+                        help="recycle a worker after this many requests (0 disables)")
+    parser.add_argument("--max-requests-jitter", type=int, default=None,
+                        help="add up to this many requests to each worker's limit "
+                             "(default: MAX_REQUESTS_JITTER, or a tenth of --max-requests)")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30")),
+                        help="seconds to let in-flight requests finish on shutdown")
+    parser.add_argument("--forwarded-allow-ips", default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+                        help="proxies trusted to set X-Forwarded-For (used for login rate limits)")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    parser.add_argument("--reload", action="store_true", default=os.getenv("RELOAD") == "1")
+    args = parser.parse_args(argv)
+    if args.max_requests_jitter is None:
+        args.max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", args.max_requests // 10))
+
+    options = {
+        "host": args.host,
+        "port": args.port,
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "proxy_headers": True,
+        "forwarded_allow_ips": args.forwarded_allow_ips,
+        "log_level": args.log_level,
+        "log_config": log_config(args.log_level),
+        "timeout_graceful_shutdown": args.graceful_timeout,
+    }
+    # serve.py is run from this directory or from the repo root; workers inherit sys.path
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if args.reload:
+        uvicorn.run("main:app", reload=True, **options)
+        return
+    config = uvicorn.Config(
+        "main:app",
+        workers=max(args.workers, 1),
+        limit_max_requests=args.max_requests or None,
+        **options
+    )
+    server = JitteredServer(config, args.max_requests_jitter)
+    if config.workers == 1 and config.limit_max_requests is None:
+        server.run()
+        if not server.started:
+            sys.exit(STARTUP_FAILURE)
+        return
+    # What uvicorn.run does for several workers, with our server class. A single worker
+    # with a request limit also runs under the supervisor, so it is replaced rather than
+    # taking the whole service down when it recycles.
+    Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+
+
+if __name__ == "__main__":
+    main()
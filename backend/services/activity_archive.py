@@ -0,0 +1,221 @@
+import gzip
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, select
+
+try:
+    import fcntl
+except ImportError:  # Windows - archiving is then only safe with a single worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _to_record(row):
+    record = dict(row._mapping)
+    details = record.get("details")
+    if isinstance(details, str):
+        try:
+            record["details"] = json.loads(details)
+        except ValueError:
+            pass
+    record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+    return record
+
+
+class ActivityArchive:
+    """Moves activity logs older than the retention window into per-day archives.
+
+    Each day is a gzip-compressed NDJSON segment named
+    ``activity_logs-YYYY-MM-DD.ndjson.gz``. Rows are appended to their segment
+    and fsynced before they are deleted from the hot table, in batches of
+    ``batch_size``. A crash between the two steps can leave a row in both
+    places; ``read`` skips ids it has already returned. One process at a time
+    archives, guarded by a lock file in the archive directory.
+    """
+
+    def __init__(self, directory, session_factory, model, retention_days=90,
+                 batch_size=5000, interval=3600.0, on_archive=None):
+        self.directory = directory
+        self.session_factory = session_factory
+        self.model = model
+        # Called as on_archive(session, rows) inside the delete transaction
+        self.on_archive = on_archive
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._runs = 0
+        self._archived = 0
+        self._errors = 0
+        self._last_run_at = None
+
+    @property
+    def enabled(self):
+        return self.retention_days > 0
+
+    def hot_window_start(self):
+        """Oldest timestamp guaranteed to still be in the hot table"""
+        if not self.enabled:
+            return None
+        return datetime.utcnow() - timedelta(days=self.retention_days)
+
+    def segment_path(self, day):
+        return os.path.join(self.directory, f"activity_logs-{day.isoformat()}.ndjson.gz")
+
+    def segment_days(self):
+        """Days that have an archive segment, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        days = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith("activity_logs-") and filename.endswith(".ndjson.gz"):
+                try:
+                    days.append(date.fromisoformat(filename[len("activity_logs-"):-len(".ndjson.gz")]))
+                except ValueError:
+                    continue
+        return sorted(days, reverse=True)
+
+    @contextmanager
+    def _archive_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".archive.lock"), "w") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+            try:
+                yield True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def archive_expired(self):
+        """Archive and delete every hot row older than the retention window"""
+        if not self.enabled:
+            return 0
+        cutoff = self.hot_window_start()
+        table = self.model.__table__
+        archived = 0
+        with self._archive_lock() as acquired:
+            if not acquired:
+                return 0  # another worker is archiving
+            while not self._stop.is_set():
+                session = self.session_factory()
+                try:
+                    rows = session.execute(
+                        select(table).where(table.c.timestamp < cutoff)
+                        .order_by(table.c.timestamp).limit(self.batch_size)
+                    ).all()
+                    if not rows:
+                        break
+
+                    by_day = {}
+                    for row in rows:
+                        by_day.setdefault(row.timestamp.date(), []).append(_to_record(row))
+                    for day, records in by_day.items():
+                        with open(self.segment_path(day), "ab") as raw:
+                            # Appending a new gzip member keeps earlier members readable
+                            with gzip.GzipFile(fileobj=raw, mode="ab") as segment:
+                                for record in records:
+                                    segment.write(json.dumps(record).encode() + b"\n")
+                            raw.flush()
+                            os.fsync(raw.fileno())
+
+                    session.execute(delete(table).where(table.c.id.in_([row.id for row in rows])))
+                    if self.on_archive is not None:
+                        self.on_archive(session, rows)
+                    session.commit()
+                    archived += len(rows)
+                except Exception:
+                    session.rollback()
+                    raise
+                finally:
+                    session.close()
+        self._archived += archived
+        return archived
+
+    def read(self, since=None, until=None, types=None, user_id=None, limit=100, max_segments=None):
+        """Archived records matching the filters, newest first"""
+        results = []
+        seen = set()
+        scanned = 0
+        for day in self.segment_days():
+            if until is not None and day > until.date():
+                continue
+            if since is not None and day < since.date():
+                break
+            if max_segments is not None and scanned >= max_segments:
+                break
+            scanned += 1
+
+            matches = []
+            with gzip.open(self.segment_path(day), "rt") as segment:
+                for line in segment:
+                    record = json.loads(line)
+                    if record["id"] in seen:
+                        continue
+                    if types is not None and record["type"] not in types:
+                        continue
+                    if user_id is not None and record["user_id"] != user_id:
+                        continue
+                    timestamp = datetime.fromisoformat(record["timestamp"])
+                    if since is not None and timestamp < since:
+                        continue
+                    if until is not None and timestamp >= until:
+                        continue
+                    record["timestamp"] = timestamp
+                    seen.add(record["id"])
+                    matches.append(record)
+            matches.sort(key=lambda record: record["timestamp"], reverse=True)
+            results.extend(matches[:limit - len(results)])
+            if len(results) >= limit:
+                break
+        return results
+
+    def start(self):
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="activity-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(30)
+
+    def _run(self):
+        while True:
+            try:
+                archived = self.archive_expired()
+                if archived:
+                    logger.info("Archived %d activity log rows", archived)
+            except Exception:
+                self._errors += 1
+                logger.exception("Archiving activity logs failed")
+            self._runs += 1
+            self._last_run_at = datetime.utcnow()
+            if self._stop.wait(self.interval):
+                return
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "retention_days": self.retention_days,
+            "directory": self.directory,
+            "segments": len(self.segment_days()),
+            "runs": self._runs,
+            "archived_rows": self._archived,
+            "errors": self._errors,
+            "last_run_at": self._last_run_at,
+        }
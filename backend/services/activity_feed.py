@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import uuid
+from collections import deque
+
+
+class Subscription:
+    """One live-feed consumer with its own bounded queue.
+
+    ``offer`` never blocks the publisher: if the queue is full the consumer
+    is too slow, so the queue is cleared and replaced with a ``None`` marker
+    telling the consumer it has been disconnected.
+    """
+
+    def __init__(self, types=None, queue_size=256):
+        self.types = set(types) if types is not None else None
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def wants(self, event):
+        return self.types is None or event.get("type") in self.types
+
+    def offer(self, event_id, event):
+        if self.closed or not self.wants(event):
+            return True
+        try:
+            self.queue.put_nowait((event_id, event))
+            return True
+        except asyncio.QueueFull:
+            self.close()
+            return False
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class ActivityFeed:
+    """In-process pub/sub for activity events with a replay ring buffer.
+
+    Event ids are ``<boot id>-<sequence>``. A subscriber that reconnects with
+    the id of the last event it saw gets every newer event still in the ring
+    buffer; an id from a previous process gets the whole buffer. Events are
+    only seen by subscribers of the worker process that logged them.
+    """
+
+    def __init__(self, history_size=1000, queue_size=256):
+        self.queue_size = queue_size
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._history = deque(maxlen=history_size)
+        self._sequence = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._published = 0
+        self._disconnected = 0
+
+    def _event_id(self, sequence):
+        return f"{self.boot_id}-{sequence}"
+
+    def _parse_event_id(self, event_id):
+        boot_id, _, sequence = (event_id or "").partition("-")
+        if boot_id != self.boot_id or not sequence.isdigit():
+            return 0
+        return int(sequence)
+
+    def publish(self, event):
+        """Fan an event out to subscribers; safe to call from any thread"""
+        with self._lock:
+            self._sequence += 1
+            entry = (self._sequence, event)
+            self._history.append(entry)
+            self._published += 1
+            loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(*entry)
+        else:
+            loop.call_soon_threadsafe(self._fan_out, *entry)
+
+    def _fan_out(self, sequence, event):
+        event_id = self._event_id(sequence)
+        for subscription in list(self._subscribers):
+            if not subscription.offer(event_id, event):
+                self._subscribers.discard(subscription)
+                self._disconnected += 1
+
+    def subscribe(self, last_event_id=None, types=None):
+        """Register a subscriber, replaying buffered events newer than last_event_id"""
+        subscription = Subscription(types, self.queue_size)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            if last_event_id is not None:
+                after = self._parse_event_id(last_event_id)
+                replay = [(sequence, event) for sequence, event in self._history
+                          if sequence > after and subscription.wants(event)]
+                # Only the newest events fit in the queue
+                for sequence, event in replay[-self.queue_size:]:
+                    subscription.queue.put_nowait((self._event_id(sequence), event))
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscribers.discard(subscription)
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self._published,
+            "history": len(self._history),
+            "history_size": self._history.maxlen,
+            "queue_size": self.queue_size,
+            "slow_consumers_disconnected": self._disconnected,
+        }
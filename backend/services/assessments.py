@@ -0,0 +1,184 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+SEVERITY_BANDS = ("severe", "moderate", "mild", "minimal")
+# Lower edges of moderate, mild and minimal on the 1-5 wellness scale
+SEVERITY_THRESHOLDS = (2.0, 3.0, 4.0)
+UNASSIGNED = "unassigned"
+_EPOCH = date(1970, 1, 1)
+
+
+class Questionnaire:
+    """A fixed list of 1..scale_max items stored as one byte per answer.
+
+    Answers are packed in item order into ``len(items)`` bytes. Scoring
+    flips reverse-keyed items (stress, anxiety: higher is worse), averages
+    the items into a 1-5 wellness score and maps it to a severity band, for
+    a whole batch of submissions at once.
+    """
+
+    def __init__(self, name, items, reverse_keyed=(), scale_max=5):
+        self.name = name
+        self.items = tuple(items)
+        self.scale_max = scale_max
+        self.reverse_mask = np.array([item in reverse_keyed for item in self.items])
+
+    @property
+    def width(self):
+        return len(self.items)
+
+    def pack(self, responses):
+        """Bytes for a ``{item: answer}`` dict; raises ValueError on a missing or out-of-range answer"""
+        missing = [item for item in self.items if item not in responses]
+        if missing:
+            raise ValueError(f"missing answers: {', '.join(missing)}")
+        answers = [responses[item] for item in self.items]
+        if any(not isinstance(answer, int) or not 1 <= answer <= self.scale_max for answer in answers):
+            raise ValueError(f"answers must be whole numbers from 1 to {self.scale_max}")
+        return np.array(answers, dtype=np.uint8).tobytes()
+
+    def unpack(self, blobs):
+        """(n, width) uint8 matrix from a sequence of packed answer blobs"""
+        return np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(-1, self.width)
+
+    def score(self, answers):
+        """Wellness scores (float32, 1-5) and severity band indexes for an (n, width) answer matrix"""
+        adjusted = np.where(self.reverse_mask, self.scale_max + 1 - answers, answers).astype(np.float32)
+        scores = adjusted.mean(axis=1)
+        return scores, np.digitize(scores, SEVERITY_THRESHOLDS).astype(np.int8)
+
+    def responses(self, blob):
+        return dict(zip(self.items, (int(answer) for answer in np.frombuffer(blob, dtype=np.uint8))))
+
+
+def week_start(day_number):
+    """Monday of the week containing the given day (days since 1970-01-01, a Thursday)"""
+    return _EPOCH + timedelta(days=int(day_number - (day_number + 3) % 7))
+
+
+class CohortReport:
+    """Severity-band counts per department per week, kept up to date incrementally.
+
+    Submissions older than ``settle_seconds`` are folded once into
+    per-(department, week) aggregates; each read only queries what was
+    submitted since the last fold, so the cost does not grow with history.
+    The newest ``settle_seconds`` of submissions are always re-read, which
+    covers transactions that commit after rows with later timestamps and
+    submissions made through other worker processes. Built reports are
+    reused for ``ttl`` seconds. Aggregates cover the last ``max_weeks`` weeks.
+    """
+
+    def __init__(self, session_factory, model, questionnaire, max_weeks=52,
+                 settle_seconds=60.0, ttl=5.0, batch_size=10000):
+        self.session_factory = session_factory
+        self.model = model
+        self.questionnaire = questionnaire
+        self.max_weeks = max_weeks
+        self.settle_seconds = settle_seconds
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._settled = {}  # (department, week start) -> [band counts..., score sum]
+        self._settled_until = None
+        self._cached = None
+        self._cached_at = 0.0
+        self._rows_scored = 0
+        self._builds = 0
+
+    def _window_start(self, now):
+        return datetime.combine(week_start((now.date() - _EPOCH).days), datetime.min.time()) \
+            - timedelta(weeks=self.max_weeks - 1)
+
+    def _aggregate(self, since, until):
+        """Per-(department, week) band counts and score sums for submissions in [since, until)"""
+        table = self.model.__table__
+        query = (
+            select(table.c.department, table.c.submitted_at, table.c.answers)
+            .where(table.c.submitted_at >= since, table.c.submitted_at < until)
+            .execution_options(yield_per=self.batch_size)
+        )
+        groups = {}
+        with self.session_factory() as session:
+            for partition in session.execute(query).partitions():
+                departments, timestamps, blobs = zip(*partition)
+                scores, bands = self.questionnaire.score(self.questionnaire.unpack(blobs))
+                days = np.array(timestamps, dtype="datetime64[D]").astype(np.int64)
+                weeks = days - (days + 3) % 7
+                names, department_index = np.unique(
+                    np.array([department or UNASSIGNED for department in departments], dtype=object),
+                    return_inverse=True
+                )
+                # One bincount over (department, week, band) instead of a Python loop per row
+                week_values, week_index = np.unique(weeks, return_inverse=True)
+                cells = (department_index * len(week_values) + week_index) * len(SEVERITY_BANDS) + bands
+                size = len(names) * len(week_values) * len(SEVERITY_BANDS)
+                counts = np.bincount(cells, minlength=size).reshape(len(names), len(week_values), -1)
+                score_sums = np.bincount(cells // len(SEVERITY_BANDS), weights=scores,
+                                         minlength=size // len(SEVERITY_BANDS)).reshape(len(names), -1)
+                for d, w in zip(*np.nonzero(counts.sum(axis=2))):
+                    key = (names[d], week_start(week_values[w]))
+                    cell = groups.setdefault(key, [0] * len(SEVERITY_BANDS) + [0.0])
+                    for band in range(len(SEVERITY_BANDS)):
+                        cell[band] += int(counts[d, w, band])
+                    cell[-1] += float(score_sums[d, w])
+                self._rows_scored += len(partition)
+        return groups
+
+    @staticmethod
+    def _merge(target, groups):
+        for key, cell in groups.items():
+            existing = target.setdefault(key, [0] * len(SEVERITY_BANDS) + [0.0])
+            for index, value in enumerate(cell):
+                existing[index] += value
+
+    def build(self, now=None):
+        """All (department, week) cells in the window, newest week first"""
+        with self._lock:
+            if self._cached is not None and time.monotonic() - self._cached_at < self.ttl:
+                return self._cached
+            now = now or datetime.utcnow()
+            window_start = self._window_start(now)
+            settle_until = now - timedelta(seconds=self.settle_seconds)
+            if self._settled_until is None or self._settled_until < window_start:
+                self._settled, self._settled_until = {}, window_start
+            if settle_until > self._settled_until:
+                self._merge(self._settled, self._aggregate(self._settled_until, settle_until))
+                self._settled_until = settle_until
+            # Drop weeks that have left the window
+            for key in [key for key in self._settled if key[1] < window_start.date()]:
+                del self._settled[key]
+
+            cells = {key: list(cell) for key, cell in self._settled.items()}
+            self._merge(cells, self._aggregate(self._settled_until, now + timedelta(seconds=1)))
+            report = []
+            for (department, week), cell in cells.items():
+                total = sum(cell[:len(SEVERITY_BANDS)])
+                report.append({
+                    "department": department,
+                    "week_start": week,
+                    "submissions": total,
+                    "mean_score": round(cell[-1] / total, 2) if total else None,
+                    "bands": dict(zip(SEVERITY_BANDS, cell[:len(SEVERITY_BANDS)])),
+                })
+            report.sort(key=lambda row: (-row["week_start"].toordinal(), row["department"]))
+            self._cached, self._cached_at = report, time.monotonic()
+            self._builds += 1
+            return report
+
+    def invalidate(self):
+        """Forget the built report so the next read includes a submission just made"""
+        with self._lock:
+            self._cached = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cells": len(self._settled),
+                "settled_until": self._settled_until.isoformat() if self._settled_until else None,
+                "rows_scored": self._rows_scored,
+                "builds": self._builds,
+            }
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import threading
+import time
+
+from sqlalchemy import insert
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop", "block")
+
+
+def _on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class BatchWriter:
+    """Buffers rows in memory and bulk-inserts them from a background thread.
+
+    A batch is written once ``max_batch`` rows are buffered or ``flush_interval``
+    seconds after the oldest buffered row arrived, whichever comes first. The
+    buffer holds at most ``max_buffer`` rows; when it is full ``submit`` either
+    drops the row or blocks for up to ``block_timeout`` seconds, depending on
+    ``overflow_policy``. Blocking would stall every request, so ``submit``
+    never blocks on an event loop thread: there a full buffer drops the row
+    whatever the policy. ``stop`` drains whatever is still buffered.
+    """
+
+    def __init__(self, session_factory, model, max_batch=500, flush_interval=0.2,
+                 max_buffer=10000, overflow_policy="drop", block_timeout=1.0,
+                 on_flush=None, name=None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}")
+        self.session_factory = session_factory
+        self.model = model
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max(max_buffer, max_batch)
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        # Called as on_flush(session, rows) inside the insert transaction
+        self.on_flush = on_flush
+        self.name = name or f"{model.__tablename__}-writer"
+
+        self._buffer = []
+        self._first_buffered_at = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._writing = 0
+        self._submitted = 0
+        self._flushed = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Flush everything still buffered and stop the writer thread"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        if self._buffer:
+            # Thread never ran or timed out - write the remainder inline
+            self._write(self._take_batch(len(self._buffer)))
+
+    def submit(self, row):
+        """Queue one row for insertion; returns False if it was dropped"""
+        if self._thread is None and not self._stopping:
+            self.start()
+        with self._cond:
+            if len(self._buffer) >= self.max_buffer:
+                if self.overflow_policy == "block" and not _on_event_loop():
+                    self._cond.wait_for(lambda: len(self._buffer) < self.max_buffer, self.block_timeout)
+                if len(self._buffer) >= self.max_buffer:
+                    self._dropped += 1
+                    return False
+            if not self._buffer:
+                self._first_buffered_at = time.monotonic()
+                # The writer sleeps without a timeout while the buffer is empty
+                self._cond.notify_all()
+            self._buffer.append(row)
+            self._submitted += 1
+            if len(self._buffer) >= self.max_batch:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout=5.0):
+        """Block until every row submitted so far has been written"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._first_buffered_at = float("-inf") if self._buffer else None
+            self._cond.notify_all()
+            while self._buffer or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None or not self._thread.is_alive():
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _take_batch(self, size):
+        with self._cond:
+            batch, self._buffer = self._buffer[:size], self._buffer[size:]
+            self._first_buffered_at = time.monotonic() if self._buffer else None
+            self._writing += 1
+            self._cond.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopping or len(self._buffer) >= self.max_batch:
+                        break
+                    if self._buffer:
+                        wait = self._first_buffered_at + self.flush_interval - time.monotonic()
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._cond.wait(wait)
+                if self._stopping and not self._buffer:
+                    return
+            self._write(self._take_batch(self.max_batch))
+
+    def _write(self, batch):
+        try:
+            if not batch:
+                return
+            session = self.session_factory()
+            try:
+                session.execute(insert(self.model), batch)
+                if self.on_flush is not None:
+                    self.on_flush(session, batch)
+                session.commit()
+            except Exception:
+                session.rollback()
+                logger.exception("%s failed to write %d rows", self.name, len(batch))
+                with self._cond:
+                    self._failed += len(batch)
+                return
+            finally:
+                session.close()
+            with self._cond:
+                self._flushed += len(batch)
+                self._batches += 1
+        finally:
+            with self._cond:
+                self._writing -= 1
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "buffered": len(self._buffer),
+                "max_buffer": self.max_buffer,
+                "overflow_policy": self.overflow_policy,
+                "submitted": self._submitted,
+                "flushed": self._flushed,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "batches": self._batches,
+            }
@@ -0,0 +1,216 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _minutes(clock):
+    hours, _, minutes = clock.strip().partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+
+class SlotGrid:
+    """Bookable slots as bit positions within a day.
+
+    The day is cut into ``slot_minutes`` slots; slot ``i`` starts
+    ``i * slot_minutes`` minutes after midnight. ``hours`` lists the open
+    ranges, e.g. ``"09:00-12:00,14:00-18:00"``, and becomes a bit mask of
+    the slots that can be booked.
+    """
+
+    def __init__(self, slot_minutes=60, hours="09:00-12:00,14:00-18:00"):
+        if slot_minutes <= 0 or MINUTES_PER_DAY % slot_minutes:
+            raise ValueError("slot_minutes must divide a day evenly")
+        self.slot_minutes = slot_minutes
+        self.open_mask = 0
+        for span in hours.split(","):
+            if not span.strip():
+                continue
+            start, _, end = span.partition("-")
+            first, last = _minutes(start), _minutes(end)
+            if not 0 <= first < last <= MINUTES_PER_DAY:
+                raise ValueError(f"Invalid opening hours {span!r}")
+            for index in range(-(-first // slot_minutes), last // slot_minutes):
+                self.open_mask |= 1 << index
+
+    def slot_of(self, moment):
+        """``(day ordinal, slot index)`` of an open slot start; raises ValueError otherwise"""
+        minutes = moment.hour * 60 + moment.minute
+        index, offset = divmod(minutes, self.slot_minutes)
+        if offset or moment.second or moment.microsecond:
+            raise ValueError(f"slots start every {self.slot_minutes} minutes")
+        if not self.open_mask >> index & 1:
+            raise ValueError("outside opening hours")
+        return moment.toordinal(), index
+
+    def start_of(self, ordinal, index):
+        return datetime.fromordinal(ordinal) + timedelta(minutes=index * self.slot_minutes)
+
+    def open_slots(self):
+        return [index for index in range(MINUTES_PER_DAY // self.slot_minutes) if self.open_mask >> index & 1]
+
+
+class _CounselorSlots:
+    __slots__ = ("lock", "booked", "recent")
+
+    def __init__(self, booked):
+        self.lock = threading.Lock()
+        self.booked = booked  # day ordinal -> bit mask of booked slot indexes
+        self.recent = []  # (monotonic time, day ordinal, slot index, booked) marked since the last refresh began
+
+    def apply(self, ordinal, index, booked):
+        mask = self.booked.get(ordinal, 0)
+        self.booked[ordinal] = mask | 1 << index if booked else mask & ~(1 << index)
+
+
+class AvailabilityIndex:
+    """Booked slots per counselor per day, as integer bitsets.
+
+    Free slots on a day are ``grid.open_mask & ~booked``, so a conflict check
+    is one bit test and "next free slots" walks days with a few integer
+    operations each, without touching the database. The index covers
+    ``horizon_days`` from today and is rebuilt from ``model`` rows by
+    ``refresh`` once it is older than ``ttl`` seconds, which picks up
+    bookings made through other worker processes; bookings and
+    cancellations made here are applied immediately with ``mark``. Each
+    counselor has its own lock, so nothing serializes across counselors.
+
+    The index only answers availability questions. The unique index on
+    active bookings is what guarantees a slot is never sold twice.
+    """
+
+    def __init__(self, session_factory, model, counselor_model, grid, horizon_days=60, ttl=5.0):
+        self.session_factory = session_factory
+        self.model = model
+        self.counselor_model = counselor_model
+        self.grid = grid
+        self.horizon_days = horizon_days
+        self.ttl = ttl
+        self._counselors = {}
+        self._loaded_at = None
+        self._first_day = None  # ordinal of the first day the index covers
+        self._refresh_lock = threading.Lock()
+        self._refreshes = 0
+        self._lookups = 0
+
+    def is_stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def refresh(self, today):
+        """Rebuild for the horizon starting at ``today``; a no-op if another thread just did"""
+        if not self._refresh_lock.acquire(blocking=self._loaded_at is None):
+            return  # someone else is refreshing and the current index is still usable
+        try:
+            if not self.is_stale():
+                return
+            started = time.monotonic()
+            first_day = datetime.combine(today, datetime.min.time())
+            table, counselors = self.model.__table__, self.counselor_model.__table__
+            with self.session_factory() as session:
+                counselor_ids = session.scalars(
+                    select(counselors.c.id).where(counselors.c.is_active.is_(True))
+                ).all()
+                rows = session.execute(
+                    select(table.c.counselor_id, table.c.slot_start).where(
+                        table.c.status == "booked",
+                        table.c.slot_start >= first_day,
+                        table.c.slot_start < first_day + timedelta(days=self.horizon_days),
+                    )
+                ).all()
+
+            booked = {counselor_id: {} for counselor_id in counselor_ids}
+            for counselor_id, slot_start in rows:
+                if counselor_id not in booked:
+                    continue
+                ordinal = slot_start.toordinal()
+                index = (slot_start.hour * 60 + slot_start.minute) // self.grid.slot_minutes
+                days = booked[counselor_id]
+                days[ordinal] = days.get(ordinal, 0) | 1 << index
+
+            for counselor_id, days in booked.items():
+                state = self._counselors.get(counselor_id)
+                if state is None:
+                    self._counselors[counselor_id] = _CounselorSlots(days)
+                    continue
+                with state.lock:
+                    # Local changes made while the query ran may be missing from its snapshot
+                    state.recent = [change for change in state.recent if change[0] >= started]
+                    state.booked = days
+                    for _, ordinal, index, is_booked in state.recent:
+                        state.apply(ordinal, index, is_booked)
+            for counselor_id in set(self._counselors) - set(booked):
+                del self._counselors[counselor_id]
+            self._loaded_at = started
+            self._first_day = today.toordinal()
+            self._refreshes += 1
+        finally:
+            self._refresh_lock.release()
+
+    def has_counselor(self, counselor_id):
+        return counselor_id in self._counselors
+
+    def in_horizon(self, moment):
+        return self._first_day is not None and 0 <= moment.toordinal() - self._first_day < self.horizon_days
+
+    def mark(self, counselor_id, slot_start, booked):
+        """Record a booking (or cancellation) made by this process"""
+        try:
+            ordinal, index = self.grid.slot_of(slot_start)
+        except ValueError:
+            return  # booked under different opening hours; not a slot the index offers
+        state = self._counselors.get(counselor_id)
+        if state is None:
+            return
+        with state.lock:
+            state.recent.append((time.monotonic(), ordinal, index, booked))
+            state.apply(ordinal, index, booked)
+
+    def is_free(self, counselor_id, slot_start):
+        """True if the index has no booking for this open slot; raises ValueError for a non-slot"""
+        ordinal, index = self.grid.slot_of(slot_start)
+        state = self._counselors.get(counselor_id)
+        self._lookups += 1
+        if state is None:
+            return False
+        with state.lock:
+            return not state.booked.get(ordinal, 0) >> index & 1
+
+    def next_free(self, counselor_id, after, limit=5, days=None):
+        """Start times of the first ``limit`` free slots starting at or after ``after``"""
+        state = self._counselors.get(counselor_id)
+        self._lookups += 1
+        if state is None:
+            return []
+        first_ordinal = max(after.toordinal(), self._first_day)
+        last_ordinal = self._first_day + self.horizon_days
+        if days is not None:
+            last_ordinal = min(last_ordinal, first_ordinal + days)
+        # Slots of the first day that start before ``after`` are not offered
+        minutes = after.hour * 60 + after.minute + (1 if after.second or after.microsecond else 0)
+        first_index = -(-minutes // self.grid.slot_minutes) if first_ordinal == after.toordinal() else 0
+        found = []
+        with state.lock:
+            for ordinal in range(first_ordinal, last_ordinal):
+                free = self.grid.open_mask & ~state.booked.get(ordinal, 0)
+                if ordinal == first_ordinal:
+                    free &= ~((1 << first_index) - 1)
+                while free:
+                    lowest = free & -free
+                    found.append(self.grid.start_of(ordinal, lowest.bit_length() - 1))
+                    if len(found) >= limit:
+                        return found
+                    free ^= lowest
+        return found
+
+    def stats(self):
+        return {
+            "counselors": len(self._counselors),
+            "slot_minutes": self.grid.slot_minutes,
+            "horizon_days": self.horizon_days,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+            "refreshes": self._refreshes,
+            "lookups": self._lookups,
+        }
@@ -0,0 +1,137 @@
+import asyncio
+from collections import deque
+
+import orjson
+
+
+def auth_token(data):
+    """The access token from a ``{"type": "auth", "token": ...}`` frame, or None.
+
+    Clients send it as their first message instead of in the URL, where it
+    would end up in access logs, proxy logs and browser history.
+    """
+    try:
+        message = orjson.loads(data)
+    except (orjson.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(message, dict) or message.get("type") != "auth":
+        return None
+    token = message.get("token")
+    return token if isinstance(token, str) and token else None
+
+
+class RoomMember:
+    """One connected member of a room with its own bounded send queue.
+
+    ``offer`` never waits: if the queue is full the member is reading too
+    slowly, so the queue is cleared and replaced with a ``None`` marker
+    telling the connection to close.
+    """
+
+    def __init__(self, user_id, user_name, queue_size=64):
+        self.user_id = user_id
+        self.user_name = user_name
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def offer(self, frame):
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.close()
+            return False
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Room:
+    __slots__ = ("members", "history")
+
+    def __init__(self, history, history_size):
+        self.members = set()
+        self.history = deque(history, maxlen=history_size)  # encoded message frames, oldest first
+
+
+class GroupChat:
+    """Group chat rooms with fan-out to per-member queues and a history ring buffer.
+
+    Every message is encoded once, kept in its room's ring buffer of the
+    last ``history_size`` messages and offered to each member's queue;
+    a member whose queue is full is disconnected rather than slowing the
+    room down. Joiners get the ring buffer, so a join costs no database
+    query once the room is open. ``on_message(row)`` is called for each
+    message so it can be persisted (in batches, by a ``BatchWriter``).
+
+    Rooms live in one worker process: members connected to different
+    workers do not see each other's messages. Not thread-safe: use it from
+    the event loop only.
+    """
+
+    def __init__(self, history_size=100, queue_size=64, on_message=None):
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self.on_message = on_message
+        self._rooms = {}
+        self._published = 0
+        self._disconnected = 0
+
+    def is_open(self, group_id):
+        return group_id in self._rooms
+
+    def open_room(self, group_id, history=()):
+        """Create the room, seeded with earlier messages (dicts, oldest first); a no-op if it exists"""
+        if group_id not in self._rooms:
+            self._rooms[group_id] = Room(
+                (self._encode(message) for message in history), self.history_size
+            )
+        return self._rooms[group_id]
+
+    @staticmethod
+    def _encode(message):
+        return orjson.dumps({"type": "message", **message}).decode()
+
+    def join(self, group_id, member):
+        """Add member to an open room; returns the history frame to send first"""
+        room = self._rooms[group_id]
+        room.members.add(member)
+        return '{"type":"history","messages":[' + ",".join(room.history) + "]}"
+
+    def leave(self, group_id, member):
+        room = self._rooms.get(group_id)
+        if room is not None:
+            room.members.discard(member)
+
+    def publish(self, group_id, message):
+        """Record a message dict and fan it out to the room's members"""
+        room = self._rooms[group_id]
+        frame = self._encode(message)
+        room.history.append(frame)
+        self._published += 1
+        for member in list(room.members):
+            if not member.offer(frame):
+                room.members.discard(member)
+                self._disconnected += 1
+        if self.on_message is not None:
+            self.on_message({"group_id": group_id, **message})
+
+    def stats(self):
+        return {
+            "rooms": len(self._rooms),
+            "members": sum(len(room.members) for room in self._rooms.values()),
+            "published": self._published,
+            "history_size": self.history_size,
+            "queue_size": self.queue_size,
+            "slow_members_disconnected": self._disconnected,
+        }
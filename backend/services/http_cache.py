@@ -0,0 +1,139 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import Response
+
+# Responses are per user, so shared caches must not store them and browsers must revalidate
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def entity_etag(*parts):
+    """Weak ETag derived from an entity's identity and version, e.g. ``("user", id, version)``"""
+    digest = hashlib.blake2b("\x1f".join(str(part) for part in parts).encode(), digest_size=12)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def body_etag(body):
+    """Weak ETag of an encoded response body"""
+    # Weak because CompressionMiddleware sends the same tag with the gzip and the identity
+    # body, which are equivalent but not byte-for-byte identical
+    return f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches etag (weak comparison, as RFC 9110 asks for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def not_modified(etag, cache_control=PRIVATE_REVALIDATE):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of encoded response bodies and their ETags.
+
+    Entries expire after ``ttl`` seconds, which bounds how stale a response
+    can be after a change made through another worker process. Writers in
+    this process call ``invalidate`` to drop everything at once. A reader
+    takes ``generation`` before querying and passes it to ``put``, so a
+    body built from data read before an invalidation is never stored.
+    """
+
+    def __init__(self, max_entries=256, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        """``(etag, body)`` for key, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key, body, generation):
+        """Store body under key unless the cache was invalidated since generation; returns its ETag"""
+        etag = body_etag(body)
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return etag
+        with self._lock:
+            if generation != self._generation:
+                return etag
+            self._entries[key] = (etag, body, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+                "invalidations": self._invalidations,
+            }
+
+
+class CompressionMiddleware:
+    """GZip for responses of at least ``minimum_size`` bytes, except under ``exclude_paths``.
+
+    Server-Sent Events must be excluded: gzip holds back small chunks until
+    it has enough to compress, which would stall the stream. Responses with
+    an ETag, 304s included, get ``Vary: Accept-Encoding`` whether or not
+    they were compressed, so caches keep the two encodings apart.
+    """
+
+    def __init__(self, app, minimum_size=1000, compresslevel=6, exclude_paths=()):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_vary(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if "etag" in headers and "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+            await send(message)
+
+        await self.gzip(scope, receive, send_with_vary)
@@ -0,0 +1,284 @@
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+HASH_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def metric_family(kind, name, documentation, samples):
+    """Exposition lines for a metric read at scrape time from (labels dict, value) pairs"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+    return lines
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket (not cumulative) counts, then sum and count
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = [(labels, (list(series[0]), series[1], series[2])) for labels, series in self._values.items()]
+        lines = self.header()
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class _RequestQueries:
+    __slots__ = ("count", "seconds", "statements", "suspects")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {}
+        self.suspects = None
+
+
+# Statement tally of the request being served; set by the middleware
+_current_request = contextvars.ContextVar("metrics_current_request", default=None)
+
+
+class Metrics:
+    """Prometheus metrics for HTTP requests, SQL statements and password hashing.
+
+    ``MetricsMiddleware`` records per-route latency, status codes and requests
+    in flight. ``instrument_engine`` hooks a SQLAlchemy engine's cursor
+    events; statements issued while serving a request are attributed to its
+    route, everything else to ``route="background"``. A request that runs the
+    same statement ``n_plus_one_threshold`` times or more is counted (and
+    logged once per route and statement) as a likely N+1 query.
+    ``add_collector`` registers callables that return extra exposition lines
+    at scrape time, for values such as pool sizes that are cheaper to read
+    than to track.
+    """
+
+    def __init__(self, n_plus_one_threshold=10):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.requests_total = Counter(
+            "http_requests_total", "HTTP requests by method, route and status code.", ("method", "route", "status"))
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "HTTP request latency by method and route.", ("method", "route"))
+        self.requests_in_flight = Gauge(
+            "http_requests_in_flight", "HTTP requests currently being served.", ("method",))
+        self.db_queries = Counter(
+            "db_queries_total", "SQL statements executed, by route.", ("route",))
+        self.db_query_time = Counter(
+            "db_query_duration_seconds_total", "Time spent executing SQL statements, by route.", ("route",))
+        self.db_query_duration = Histogram(
+            "db_query_duration_seconds", "Latency of individual SQL statements.", buckets=QUERY_BUCKETS)
+        self.db_queries_per_request = Histogram(
+            "db_queries_per_request", "SQL statements issued per HTTP request.", ("route",),
+            buckets=QUERY_COUNT_BUCKETS)
+        self.db_n_plus_one = Counter(
+            "db_n_plus_one_suspected_total", "Requests that repeated one SQL statement past the N+1 threshold.",
+            ("route",))
+        self.password_hash_duration = Histogram(
+            "password_hash_duration_seconds", "bcrypt CPU time per operation.", ("operation",),
+            buckets=HASH_BUCKETS)
+        self.password_hash_latency = Histogram(
+            "password_hash_latency_seconds", "bcrypt latency per operation including time queued for a worker.",
+            ("operation",), buckets=HASH_BUCKETS)
+        self.request_queue_wait = Histogram(
+            "request_queue_wait_seconds", "Time requests waited for a concurrency slot, by priority class.",
+            ("priority",), buckets=QUERY_BUCKETS + (2.5, 5.0, 10.0))
+        self._metrics = [
+            self.requests_total, self.request_duration, self.requests_in_flight,
+            self.db_queries, self.db_query_time, self.db_query_duration, self.db_queries_per_request,
+            self.db_n_plus_one, self.password_hash_duration, self.password_hash_latency,
+            self.request_queue_wait,
+        ]
+        self._collectors = []
+        self._reported_suspects = set()
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception:
+                logger.exception("Metrics collector %r failed", collector)
+        return "\n".join(lines) + "\n"
+
+    def observe_password_hash(self, operation, hash_seconds, latency_seconds):
+        self.password_hash_duration.observe(hash_seconds, operation)
+        self.password_hash_latency.observe(latency_seconds, operation)
+
+    def observe_queue_wait(self, priority, wait_seconds):
+        self.request_queue_wait.observe(wait_seconds, priority)
+
+    # SQL statement hooks
+    def instrument_engine(self, engine):
+        from sqlalchemy import event
+
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_query_started"].pop()
+        elapsed = time.perf_counter() - started
+        self.db_query_duration.observe(elapsed)
+        queries = _current_request.get()
+        if queries is None:
+            self.db_queries.inc("background")
+            self.db_query_time.inc("background", amount=elapsed)
+            return
+        queries.count += 1
+        queries.seconds += elapsed
+        repeats = queries.statements.get(statement, 0) + 1
+        queries.statements[statement] = repeats
+        if repeats == self.n_plus_one_threshold:
+            queries.suspects = (queries.suspects or []) + [statement]
+
+    def _handle_error(self, context):
+        # after_cursor_execute never fires for a failed statement
+        if context.connection is not None and context.connection.info.get("metrics_query_started"):
+            context.connection.info["metrics_query_started"].pop()
+
+    def record_queries(self, route, queries):
+        self.db_queries_per_request.observe(queries.count, route)
+        if not queries.count:
+            return
+        self.db_queries.inc(route, amount=queries.count)
+        self.db_query_time.inc(route, amount=queries.seconds)
+        if queries.suspects:
+            self.db_n_plus_one.inc(route)
+            for statement in queries.suspects:
+                if (route, statement) not in self._reported_suspects and len(self._reported_suspects) < 1000:
+                    self._reported_suspects.add((route, statement))
+                    logger.warning("Possible N+1 query on %s: executed %d times in one request: %s",
+                                   route, queries.statements[statement], statement[:200])
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware feeding a ``Metrics`` instance; add it with
+    ``app.add_middleware(MetricsMiddleware, metrics=metrics)``"""
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        method = scope["method"]
+        status_code = 500
+        queries = _RequestQueries()
+        token = _current_request.set(queries)
+        metrics.requests_in_flight.inc(method)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(token)
+            metrics.requests_in_flight.dec(method)
+            # The router stores the matched route in the scope; use its template to keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            metrics.requests_total.inc(method, route, str(status_code))
+            metrics.request_duration.observe(elapsed, method, route)
+            metrics.record_queries(route, queries)
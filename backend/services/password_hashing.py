@@ -0,0 +1,211 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+
+# Built on first use in the process that hashes, so the API process does not
+# import passlib at all when hashing runs on the process pool
+@lru_cache(maxsize=None)
+def _pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# Worker functions live at module level so they can be pickled into the pool.
+# They return the time spent hashing so queue wait and CPU time can be told apart.
+def _hash_password(password):
+    started = time.perf_counter()
+    hashed = _pwd_context().hash(password)
+    return hashed, time.perf_counter() - started
+
+
+def _verify_password(plain_password, hashed_password):
+    started = time.perf_counter()
+    valid = _pwd_context().verify(plain_password, hashed_password)
+    return valid, time.perf_counter() - started
+
+
+# Pool workers are started by a fork server (or spawned where there is none),
+# never forked from the API process: by the first hash it is running threads,
+# and a forked child could inherit a lock one of them held at that moment
+def _pool_context():
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        name: round(ordered[min(last, int(last * q))] * 1000, 2)
+        for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+    }
+
+
+class HashQueueFull(Exception):
+    """Raised when the pool already holds max_pending hash jobs"""
+
+
+class PasswordHasher:
+    """Bounded bcrypt worker pool with sync and async entry points.
+
+    Jobs run on a process pool so several cores hash in parallel instead of
+    queueing behind the GIL. At most ``max_pending`` jobs may be queued or
+    running; further submissions raise ``HashQueueFull`` so callers can shed load.
+    ``workers=0`` hashes on a single in-process thread, which is handy in development.
+    ``observer``, if given, is called as ``observer(operation, hash_seconds,
+    latency_seconds)`` after every successful hash or verify.
+    """
+
+    def __init__(self, workers=None, max_pending=None, latency_window=2048, observer=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(self.workers, 1) * 8
+        self.observer = observer
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._failed = 0
+        self._hash_times = deque(maxlen=latency_window)
+        self._latencies = deque(maxlen=latency_window)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.workers > 0:
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HashQueueFull()
+            self._pending += 1
+
+        started = time.perf_counter()
+        submitted = False
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool and retry once
+                self._reset_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(fn, *args)
+            submitted = True
+        finally:
+            if not submitted:
+                with self._lock:
+                    self._pending -= 1
+
+        operation = "hash" if fn is _hash_password else "verify"
+        future.add_done_callback(lambda f: self._record(f, started, operation, executor))
+        return future
+
+    def _record(self, future, started, operation, executor):
+        elapsed = time.perf_counter() - started
+        failed = future.cancelled() or future.exception() is not None
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+                self._latencies.append(elapsed)
+                self._hash_times.append(future.result()[1])
+        if failed:
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self._reset_executor(executor)
+            return
+        if self.observer is not None:
+            self.observer(operation, future.result()[1], elapsed)
+
+    def _reset_executor(self, broken):
+        """Drop broken so the next caller starts a fresh pool, unless another caller already replaced it"""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    # Blocking API - safe to call from threadpool (sync) routes
+    def hash(self, password):
+        return self._submit(_hash_password, password).result()[0]
+
+    def verify(self, plain_password, hashed_password):
+        return self._submit(_verify_password, plain_password, hashed_password).result()[0]
+
+    def hash_many(self, passwords, max_in_flight=None):
+        """Hash a batch across the pool, returning hashes in input order.
+
+        At most ``max_in_flight`` jobs (default: one per worker) are queued
+        at a time, so a bulk job keeps every core busy without taking the
+        whole ``max_pending`` budget from interactive logins. When the queue
+        is full the batch waits for room instead of failing.
+        """
+        limit = max_in_flight or max(self.workers, 1)
+        hashes = [None] * len(passwords)
+        in_flight = deque()
+        for index, password in enumerate(passwords):
+            if len(in_flight) >= limit:
+                done_index, future = in_flight.popleft()
+                hashes[done_index] = future.result()[0]
+            while True:
+                try:
+                    in_flight.append((index, self._submit(_hash_password, password)))
+                    break
+                except HashQueueFull:
+                    if in_flight:
+                        done_index, future = in_flight.popleft()
+                        hashes[done_index] = future.result()[0]
+                    else:
+                        time.sleep(0.05)
+        for done_index, future in in_flight:
+            hashes[done_index] = future.result()[0]
+        return hashes
+
+    # Async API - awaits the pool without holding an event loop thread
+    async def hash_async(self, password):
+        result = await asyncio.wrap_future(self._submit(_hash_password, password))
+        return result[0]
+
+    async def verify_async(self, plain_password, hashed_password):
+        result = await asyncio.wrap_future(self._submit(_verify_password, plain_password, hashed_password))
+        return result[0]
+
+    def stats(self):
+        with self._lock:
+            hash_times = list(self._hash_times)
+            latencies = list(self._latencies)
+            stats = {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "failed": self._failed,
+            }
+        stats["hash_ms"] = _percentiles(hash_times)
+        stats["latency_ms"] = _percentiles(latencies)
+        return stats
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
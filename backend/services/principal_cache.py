@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Detached, read-only snapshot of an authenticated user or admin row"""
+    id: str
+    name: str
+    email: str
+    is_active: bool
+    created_at: datetime
+    last_login: Optional[datetime] = None
+    version: int = 1
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            id=row.id,
+            name=row.name,
+            email=row.email,
+            is_active=row.is_active,
+            created_at=row.created_at,
+            last_login=getattr(row, "last_login", None),
+            version=getattr(row, "version", None) or 1,
+        )
+
+
+class PrincipalCache:
+    """Thread-safe LRU cache with a per-entry TTL.
+
+    Entries expire ``ttl`` seconds after they were stored, and the least
+    recently used entry is evicted once ``max_entries`` is reached. Writers
+    that change a cached row must call ``invalidate`` with its key. That only
+    reaches this process, so callers that share the data with other workers
+    also pass a ``generation`` (see ``SharedGeneration``): an entry stored
+    under another generation is dropped on lookup.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+        self._stale = 0
+
+    def get(self, key, generation=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            principal, expires_at, stored_generation = entry
+            if expires_at <= now or stored_generation != generation:
+                del self._entries[key]
+                if expires_at <= now:
+                    self._expirations += 1
+                else:
+                    self._stale += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return principal
+
+    def put(self, key, principal, generation=None):
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (principal, time.monotonic() + self.ttl, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+                "stale": self._stale,
+            }
@@ -0,0 +1,261 @@
+import csv
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+REQUIRED_FIELDS = ("name", "latitude", "longitude")
+
+
+class ProviderDatasetError(ValueError):
+    """The provider dataset cannot be loaded at all (missing file, bad header)"""
+
+
+def _read_rows(path):
+    if path.lower().endswith((".ndjson", ".jsonl")):
+        with open(path, encoding="utf-8-sig") as dataset:
+            for line in dataset:
+                if line.strip():
+                    record = json.loads(line)
+                    if isinstance(record, dict):
+                        yield {str(key).strip().lower(): value for key, value in record.items()}
+        return
+    with open(path, newline="", encoding="utf-8-sig") as dataset:
+        reader = csv.reader(dataset)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [column.strip().lower() for column in header]
+        missing = [field for field in REQUIRED_FIELDS if field not in columns]
+        if missing:
+            raise ProviderDatasetError(f"CSV header is missing column(s): {', '.join(missing)}")
+        for values in reader:
+            yield dict(zip(columns, values))
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distances in km from one point to arrays of points, all in radians"""
+    half_dlat = (lats - lat) * 0.5
+    half_dlon = (lons - lon) * 0.5
+    a = np.sin(half_dlat) ** 2 + math.cos(lat) * np.cos(lats) * np.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class ProviderSet:
+    """An immutable provider dataset with a latitude/longitude grid index.
+
+    Providers are sorted by grid cell (``cell_degrees`` square, row-major
+    from the south-west corner), so every latitude row of a query's
+    bounding box is one contiguous slice found with ``searchsorted``.
+    Distances to the candidates in those slices are computed in one
+    vectorized haversine batch.
+    """
+
+    def __init__(self, records, latitudes, longitudes, cell_degrees=0.25, source=None, skipped=0):
+        self.cell_degrees = cell_degrees
+        self.lat_cells = int(math.ceil(180 / cell_degrees))
+        self.lon_cells = int(math.ceil(360 / cell_degrees))
+        self.source = source
+        self.skipped = skipped
+        self.loaded_at = time.time()
+
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        keys = self._lat_cell(latitudes) * self.lon_cells + self._lon_cell(longitudes)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.latitudes = np.radians(latitudes[order])
+        self.longitudes = np.radians(longitudes[order])
+        self.records = [records[position] for position in order]
+        specializations = np.array(
+            [str(record.get("specialization") or "").strip().lower() for record in self.records], dtype=object
+        )
+        self.specialization_names, codes = np.unique(specializations, return_inverse=True) \
+            if len(self.records) else (np.array([], dtype=object), np.array([], dtype=np.int64))
+        self.specialization_codes = codes.astype(np.int32)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _lat_cell(self, latitudes):
+        return np.clip(((np.asarray(latitudes) + 90) // self.cell_degrees).astype(np.int64), 0, self.lat_cells - 1)
+
+    def _lon_cell(self, longitudes):
+        return ((np.asarray(longitudes) + 180) // self.cell_degrees).astype(np.int64) % self.lon_cells
+
+    def _candidates(self, lat, lon, radius_km):
+        """Indexes of every provider that could be within radius_km of (lat, lon) degrees"""
+        radius_degrees = math.degrees(radius_km / EARTH_RADIUS_KM)
+        south, north = lat - radius_degrees, lat + radius_degrees
+        if south <= -90 or north >= 90 or radius_km >= MAX_DISTANCE_KM / 2:
+            span = 360.0  # touches a pole: every longitude is in reach
+        else:
+            widest = max(abs(south), abs(north))
+            span = 2 * math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM)
+                                                       / math.cos(math.radians(widest)))))
+        first_row = int(self._lat_cell(max(south, -90.0)))
+        last_row = int(self._lat_cell(min(north, 90.0)))
+        if span >= 360 - 2 * self.cell_degrees:
+            column_ranges = [(0, self.lon_cells - 1)]
+        else:
+            west = int(self._lon_cell(lon - span / 2))
+            east = int(self._lon_cell(lon + span / 2))
+            column_ranges = [(west, east)] if west <= east else [(west, self.lon_cells - 1), (0, east)]
+
+        starts, ends = [], []
+        for row in range(first_row, last_row + 1):
+            for west, east in column_ranges:
+                starts.append(row * self.lon_cells + west)
+                ends.append(row * self.lon_cells + east + 1)
+        lows = np.searchsorted(self.keys, starts)
+        highs = np.searchsorted(self.keys, ends)
+        slices = [np.arange(low, high) for low, high in zip(lows, highs) if high > low]
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def _specialization_code(self, specialization):
+        if specialization is None:
+            return None
+        wanted = specialization.strip().lower()
+        position = int(np.searchsorted(self.specialization_names, wanted))
+        if position < len(self.specialization_names) and self.specialization_names[position] == wanted:
+            return position
+        return -1
+
+    def within(self, lat, lon, radius_km, limit=None, specialization=None):
+        """``(index, distance km)`` pairs within radius_km, nearest first"""
+        code = self._specialization_code(specialization)
+        if code == -1 or not len(self.records):
+            return []
+        candidates = self._candidates(lat, lon, radius_km)
+        if code is not None:
+            candidates = candidates[self.specialization_codes[candidates] == code]
+        distances = haversine_km(math.radians(lat), math.radians(lon),
+                                 self.latitudes[candidates], self.longitudes[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        if limit is not None and len(distances) > limit:
+            nearest = np.argpartition(distances, limit - 1)[:limit]
+            candidates, distances = candidates[nearest], distances[nearest]
+        order = np.argsort(distances, kind="stable")
+        return list(zip(candidates[order].tolist(), distances[order].tolist()))
+
+    def nearest(self, lat, lon, k, max_km=None, specialization=None):
+        """The k nearest providers, searching outwards one doubled radius at a time"""
+        limit_km = min(max_km if max_km is not None else MAX_DISTANCE_KM, MAX_DISTANCE_KM)
+        radius_km = min(self.cell_degrees * 111.0, limit_km)
+        while True:
+            found = self.within(lat, lon, radius_km, limit=k, specialization=specialization)
+            # Everything within radius_km was examined, so k hits inside it are the true k nearest
+            if len(found) >= k or radius_km >= limit_km:
+                return found
+            radius_km = min(radius_km * 4 if not found else radius_km * 2, limit_km)
+
+    def record(self, index, distance_km):
+        return {
+            **self.records[index],
+            "latitude": round(math.degrees(self.latitudes[index]), 6),
+            "longitude": round(math.degrees(self.longitudes[index]), 6),
+            "distance_km": round(distance_km, 3),
+        }
+
+
+def load_providers(path, cell_degrees=0.25):
+    """Read a CSV or NDJSON provider file into a ProviderSet; rows without a name or valid coordinates are skipped"""
+    if not os.path.exists(path):
+        raise ProviderDatasetError(f"Provider dataset {path} does not exist")
+    records, latitudes, longitudes = [], [], []
+    skipped = 0
+    for number, row in enumerate(_read_rows(path), 1):
+        try:
+            latitude, longitude = float(row.get("latitude")), float(row.get("longitude"))
+        except (TypeError, ValueError):
+            skipped += 1
+            continue
+        name = str(row.get("name") or "").strip()
+        if not name or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            skipped += 1
+            continue
+        record = {key: value for key, value in row.items()
+                  if key not in ("latitude", "longitude") and value not in (None, "")}
+        record.setdefault("id", str(number))
+        records.append(record)
+        latitudes.append(latitude)
+        longitudes.append(longitude)
+    return ProviderSet(records, latitudes, longitudes, cell_degrees=cell_degrees, source=path, skipped=skipped)
+
+
+class ProviderDirectory:
+    """Holds the current ProviderSet and swaps in a new one on reload.
+
+    A reload builds the new set completely before replacing the reference,
+    so queries running during a reload keep using the old set and never
+    see a half-built index. Only one reload runs at a time.
+    """
+
+    def __init__(self, path, cell_degrees=0.25):
+        self.path = path
+        self.cell_degrees = cell_degrees
+        self._current = None
+        self._reload_lock = threading.Lock()
+        self._reloads = 0
+        self._last_error = None
+        self._last_reload_ms = None
+
+    @property
+    def current(self):
+        return self._current
+
+    def reload(self, path=None):
+        """Load path (the configured dataset by default) and swap it in; returns the new set"""
+        path = path or self.path
+        if not path:
+            raise ProviderDatasetError("No provider dataset configured")
+        with self._reload_lock:
+            started = time.perf_counter()
+            try:
+                providers = load_providers(path, self.cell_degrees)
+            except Exception as exc:
+                self._last_error = str(exc)
+                raise
+            self._current = providers
+            self.path = path
+            self._reloads += 1
+            self._last_error = None
+            self._last_reload_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info("Loaded %d providers from %s in %.0f ms (%d rows skipped)",
+                    len(providers), path, self._last_reload_ms, providers.skipped)
+        return providers
+
+    def load_in_background(self):
+        """Start the first load on a daemon thread so startup does not wait for it"""
+        if not self.path:
+            return
+
+        def load():
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("Could not load the provider dataset from %s", self.path)
+
+        threading.Thread(target=load, name="provider-directory", daemon=True).start()
+
+    def stats(self):
+        providers = self._current
+        return {
+            "path": self.path,
+            "providers": len(providers) if providers is not None else None,
+            "skipped_rows": providers.skipped if providers is not None else None,
+            "cell_degrees": self.cell_degrees,
+            "loaded_at": providers.loaded_at if providers is not None else None,
+            "reloads": self._reloads,
+            "last_reload_ms": self._last_reload_ms,
+            "last_error": self._last_error,
+        }
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# GCRA in one round trip: the key holds the bucket's theoretical arrival time.
+# Redis' own clock is used so every worker and host agrees on "now".
+_REDIS_HIT_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+if new_tat - now > period then
+  return tostring(new_tat - now - period)
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return '0'
+"""
+
+
+class RedisRateLimitStore:
+    """Shares rate limit state between workers through Redis.
+
+    The ``redis`` package is only imported when a store is created, so it
+    is an optional dependency.
+    """
+
+    def __init__(self, url, prefix="ratelimit:"):
+        import redis.asyncio as redis
+
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._hit = self._client.register_script(_REDIS_HIT_SCRIPT)
+
+    async def hit(self, key, interval, period):
+        return float(await self._hit(keys=[self.prefix + key], args=[interval, period]))
+
+    async def reset(self, key):
+        await self._client.delete(self.prefix + key)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class RateLimiter:
+    """Token bucket allowing ``limit`` hits per ``period`` seconds per key.
+
+    Implemented as GCRA: each key stores a single float, the time at which
+    its bucket will be full again. A key whose bucket has refilled carries no
+    information and is dropped, and at most ``max_keys`` keys are kept (least
+    recently used first out), so memory stays bounded under key floods.
+
+    With a ``store`` the state lives there instead and limits hold across
+    workers; if the store fails the in-process buckets are used.
+    """
+
+    def __init__(self, limit, period, max_keys=100000, store=None, name="rate-limit"):
+        self.limit = limit
+        self.period = float(period)
+        self.interval = self.period / limit if limit > 0 else 0.0
+        self.max_keys = max_keys
+        self.store = store
+        self.name = name
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._allowed = 0
+        self._limited = 0
+        self._evictions = 0
+        self._store_errors = 0
+
+    @property
+    def enabled(self):
+        return self.limit > 0 and self.period > 0
+
+    def _hit_local(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tat = max(self._buckets.pop(key, now), now)
+            new_tat = tat + self.interval
+            if new_tat - now > self.period:
+                self._buckets[key] = tat
+                return new_tat - now - self.period
+            self._buckets[key] = new_tat
+            self._sweep(now)
+            return 0.0
+
+    def _sweep(self, now):
+        # Oldest-touched buckets first; stop at the first one still draining
+        while self._buckets:
+            key, tat = next(iter(self._buckets.items()))
+            if tat > now and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+            if tat > now:
+                self._evictions += 1
+
+    async def hit(self, key):
+        """Take one token for key; returns 0 if allowed, else seconds until retry"""
+        if not self.enabled:
+            return 0.0
+        retry_after = None
+        if self.store is not None:
+            try:
+                retry_after = await self.store.hit(f"{self.name}:{key}", self.interval, self.period)
+            except Exception:
+                self._store_errors += 1
+                logger.warning("%s store unavailable, using in-process limits", self.name, exc_info=True)
+        if retry_after is None:
+            retry_after = self._hit_local(key)
+        if retry_after > 0:
+            self._limited += 1
+        else:
+            self._allowed += 1
+        return retry_after
+
+    async def reset(self, key):
+        """Forget key's history, e.g. after a successful login"""
+        with self._lock:
+            self._buckets.pop(key, None)
+        if self.store is not None:
+            try:
+                await self.store.reset(f"{self.name}:{key}")
+            except Exception:
+                self._store_errors += 1
+
+    def stats(self):
+        with self._lock:
+            tracked = len(self._buckets)
+        return {
+            "limit": self.limit,
+            "period_seconds": self.period,
+            "shared_store": self.store is not None,
+            "tracked_keys": tracked,
+            "max_keys": self.max_keys,
+            "allowed": self._allowed,
+            "limited": self._limited,
+            "evictions": self._evictions,
+            "store_errors": self._store_errors,
+        }
@@ -0,0 +1,379 @@
+import csv
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from email_validator import EmailNotValidError, validate_email
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+ROSTER_FORMATS = ("csv", "ndjson")
+REQUIRED_COLUMNS = ("name", "email", "password")
+
+
+class RosterError(ValueError):
+    """The roster file as a whole cannot be imported (bad header, bad encoding)"""
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as roster:
+        reader = csv.reader(roster)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [column.strip().lower() for column in header]
+        missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise RosterError(f"CSV header is missing column(s): {', '.join(missing)}")
+        for number, values in enumerate(reader, 1):
+            if not any(value.strip() for value in values):
+                continue
+            yield number, dict(zip(columns, values)), None
+
+
+def _read_ndjson(path):
+    with open(path, encoding="utf-8-sig") as roster:
+        for number, line in enumerate(roster, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield number, None, "not valid JSON"
+                continue
+            if not isinstance(record, dict):
+                yield number, None, "expected a JSON object"
+                continue
+            yield number, record, None
+
+
+def read_roster(path, file_format):
+    """Yield ``(row number, record, error)`` for every non-blank roster row"""
+    reader = _read_csv if file_format == "csv" else _read_ndjson
+    return reader(path)
+
+
+def clean_record(record):
+    """Validated ``(name, email, password, department)`` of a roster record, or raise ValueError"""
+    name = str(record.get("name") or "").strip()
+    password = record.get("password")
+    if not name:
+        raise ValueError("name is required")
+    if not isinstance(password, str) or not password:
+        raise ValueError("password is required")
+    try:
+        # Normalized the same way as EmailStr on /register, so duplicates line up with existing rows
+        email = validate_email(str(record.get("email") or "").strip(), check_deliverability=False).normalized
+    except EmailNotValidError as exc:
+        raise ValueError(f"invalid email: {exc}")
+    department = str(record.get("department") or "").strip() or None
+    return name, email, password, department
+
+
+class RosterImporter:
+    """Creates student accounts from an uploaded CSV or NDJSON roster.
+
+    Jobs run on a background thread, one at a time per process, and record
+    their progress in ``job_model`` rows so any worker can report on them.
+    Rows are handled in chunks of ``chunk_size``: duplicates (within the file
+    and against existing users, found with one ``IN`` query per chunk) and
+    invalid rows are skipped, initial passwords are hashed across the
+    password hashing pool, and the new users, the dashboard counters and the
+    job's progress are written in one transaction per chunk. The first
+    ``max_errors`` skipped rows are kept on the job with a reason.
+
+    While started, the importer stamps ``heartbeat_at`` on its unfinished
+    jobs every ``heartbeat_interval`` seconds. ``start`` marks jobs whose
+    heartbeat is older than ``stale_after`` seconds as interrupted: their
+    worker exited without stopping, and nothing else will finish them.
+    """
+
+    def __init__(self, session_factory, user_model, job_model, hasher, counters,
+                 chunk_size=1000, max_errors=100, heartbeat_interval=30.0, stale_after=120.0):
+        self.session_factory = session_factory
+        self.user_model = user_model
+        self.job_model = job_model
+        self.hasher = hasher
+        self.counters = counters
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="roster-import")
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pending = {}  # job id -> spool path, for jobs submitted here and not finished
+        self._queued = 0
+        self._completed = 0
+        self._failed = 0
+        self._interrupted = 0
+        self._users_created = 0
+
+    def submit(self, path, file_format, created_by=None, on_finish=None):
+        """Record a queued job for the roster at path and start it; returns the job id.
+
+        The importer owns path from here on and deletes it when the job ends.
+        ``on_finish(job)`` is called with the final job row as a dict.
+        """
+        if file_format not in ROSTER_FORMATS:
+            raise ValueError(f"Unsupported roster format {file_format!r}")
+        job_id = str(uuid.uuid4())
+        with self.session_factory() as session:
+            now = datetime.utcnow()
+            session.execute(insert(self.job_model.__table__).values(
+                id=job_id, status="queued", format=file_format, created_by=created_by,
+                created_at=now, heartbeat_at=now, spool_path=path, processed_rows=0,
+                created_count=0, duplicate_count=0, invalid_count=0
+            ))
+            session.commit()
+        with self._lock:
+            self._queued += 1
+            self._pending[job_id] = path
+        self._executor.submit(self._run, job_id, path, file_format, on_finish)
+        return job_id
+
+    def get(self, job_id):
+        table = self.job_model.__table__
+        with self.session_factory() as session:
+            row = session.execute(select(table).where(table.c.id == job_id)).first()
+        return row._asdict() if row is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "chunk_size": self.chunk_size,
+                "queued": self._queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "interrupted": self._interrupted,
+                "users_created": self._users_created,
+            }
+
+    def start(self):
+        """Interrupt jobs abandoned by workers that are gone, then keep this worker's jobs alive"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self._stop.is_set():  # restarted after stop
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="roster-import")
+        try:
+            self.reconcile()
+        except Exception:
+            logger.exception("Could not interrupt abandoned roster imports")
+        self._thread = threading.Thread(target=self._heartbeat, name="roster-import-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop after the chunk in progress; unfinished jobs are marked interrupted"""
+        self._stop.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._thread is not None:
+            self._thread.join(self.heartbeat_interval + 1)
+        # Jobs still pending were queued behind the running one and cancelled before they started
+        with self._lock:
+            cancelled, self._pending = self._pending, {}
+        if cancelled:
+            self._interrupt(cancelled, "the server stopped before the import started",
+                            self.job_model.__table__.c.status == "queued")
+
+    def reconcile(self):
+        """Mark queued and running jobs with a stale heartbeat interrupted; returns how many"""
+        table = self.job_model.__table__
+        stale = and_(
+            table.c.status.in_(("queued", "running")),
+            or_(table.c.heartbeat_at.is_(None),
+                table.c.heartbeat_at < datetime.utcnow() - timedelta(seconds=self.stale_after)),
+        )
+        with self.session_factory() as session:
+            abandoned = dict(session.execute(select(table.c.id, table.c.spool_path).where(stale)).all())
+        if abandoned:
+            logger.warning("Interrupting %d roster imports abandoned by a stopped worker", len(abandoned))
+            self._interrupt(abandoned, "the server stopped during the import", stale)
+        return len(abandoned)
+
+    def _interrupt(self, jobs, reason, condition):
+        """Mark jobs (id -> spool path) interrupted where condition still holds, and delete their uploads"""
+        table = self.job_model.__table__
+        with self.session_factory() as session:
+            session.execute(
+                update(table).where(table.c.id.in_(list(jobs)), condition)
+                .values(status="interrupted", finished_at=datetime.utcnow(), errors=[{"row": None, "error": reason}])
+            )
+            session.commit()
+        for path in jobs.values():
+            try:
+                if path:
+                    os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._interrupted += len(jobs)
+
+    def _heartbeat(self):
+        table = self.job_model.__table__
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                job_ids = list(self._pending)
+            if not job_ids:
+                continue
+            try:
+                with self.session_factory() as session:
+                    session.execute(update(table).where(table.c.id.in_(job_ids)).values(heartbeat_at=datetime.utcnow()))
+                    session.commit()
+            except Exception:
+                logger.exception("Roster import heartbeat failed")
+
+    def _update_job(self, session, job_id, **values):
+        table = self.job_model.__table__
+        session.execute(update(table).where(table.c.id == job_id).values(**values))
+
+    def _run(self, job_id, path, file_format, on_finish):
+        with self._lock:
+            self._queued -= 1
+        progress = {"processed_rows": 0, "created_count": 0, "duplicate_count": 0, "invalid_count": 0}
+        errors = []
+        status = "completed"
+        try:
+            total = sum(1 for _ in read_roster(path, file_format))
+            with self.session_factory() as session:
+                self._update_job(session, job_id, status="running", started_at=datetime.utcnow(), total_rows=total)
+                session.commit()
+
+            seen = set()
+            chunk = []
+            for entry in read_roster(path, file_format):
+                chunk.append(entry)
+                if len(chunk) >= self.chunk_size:
+                    if self._stop.is_set():
+                        status = "interrupted"
+                        break
+                    self._import_chunk(job_id, chunk, seen, progress, errors)
+                    chunk = []
+            else:
+                if chunk:
+                    self._import_chunk(job_id, chunk, seen, progress, errors)
+        except Exception as exc:
+            status = "failed"
+            if not isinstance(exc, (RosterError, UnicodeDecodeError)):
+                logger.exception("Roster import %s failed", job_id)
+            errors.append({"row": None, "error": str(exc)})
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        job = None
+        try:
+            with self.session_factory() as session:
+                self._update_job(session, job_id, status=status, finished_at=datetime.utcnow(),
+                                 errors=errors[:self.max_errors] or None)
+                session.commit()
+            job = self.get(job_id)
+        except Exception:
+            logger.exception("Could not record the outcome of roster import %s", job_id)
+        with self._lock:
+            self._pending.pop(job_id, None)
+            if status == "completed":
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._users_created += progress["created_count"]
+        logger.info("Roster import %s %s: %d rows, %d users created", job_id, status,
+                    progress["processed_rows"], progress["created_count"])
+        if on_finish is not None and job is not None:
+            try:
+                on_finish(job)
+            except Exception:
+                logger.exception("Roster import %s on_finish callback failed", job_id)
+
+    def _skip(self, errors, row, reason):
+        if len(errors) < self.max_errors:
+            errors.append({"row": row, "error": reason})
+
+    def _import_chunk(self, job_id, chunk, seen, progress, errors):
+        candidates = []
+        invalid = duplicates = 0
+        for row, record, error in chunk:
+            if error is None:
+                try:
+                    name, email, password, department = clean_record(record)
+                except ValueError as exc:
+                    error = str(exc)
+            if error is not None:
+                invalid += 1
+                self._skip(errors, row, error)
+                continue
+            if email in seen:
+                duplicates += 1
+                self._skip(errors, row, "duplicate email in roster")
+                continue
+            seen.add(email)
+            candidates.append((row, name, email, password, department))
+
+        # Hash outside any transaction - a chunk of bcrypt work takes seconds
+        existing = self._existing_emails([candidate[2] for candidate in candidates])
+        new_users = []
+        for candidate in candidates:
+            if candidate[2] in existing:
+                duplicates += 1
+                self._skip(errors, candidate[0], "email already registered")
+            else:
+                new_users.append(candidate)
+        hashes = self.hasher.hash_many([password for _, _, _, password, _ in new_users])
+        now = datetime.utcnow()
+        rows = [
+            {"id": str(uuid.uuid4()), "name": name, "email": email, "password_hash": password_hash,
+             "department": department, "is_active": True, "created_at": now}
+            for (_, name, email, _, department), password_hash in zip(new_users, hashes)
+        ]
+
+        try:
+            created = self._insert_chunk(job_id, rows, progress, len(chunk), invalid, duplicates)
+        except IntegrityError:
+            # Someone registered one of these emails since the check; drop those rows and retry once
+            taken = self._existing_emails([row["email"] for row in rows])
+            for (row_number, _, email, _, _) in new_users:
+                if email in taken:
+                    duplicates += 1
+                    self._skip(errors, row_number, "email already registered")
+            rows = [row for row in rows if row["email"] not in taken]
+            created = self._insert_chunk(job_id, rows, progress, len(chunk), invalid, duplicates)
+
+        progress["processed_rows"] += len(chunk)
+        progress["created_count"] += created
+        progress["duplicate_count"] += duplicates
+        progress["invalid_count"] += invalid
+
+    def _existing_emails(self, emails):
+        if not emails:
+            return set()
+        email_column = self.user_model.__table__.c.email
+        with self.session_factory() as session:
+            return set(session.scalars(select(email_column).where(email_column.in_(emails))))
+
+    def _insert_chunk(self, job_id, rows, progress, processed, invalid, duplicates):
+        with self.session_factory() as session:
+            try:
+                if rows:
+                    session.execute(insert(self.user_model.__table__), rows)
+                    self.counters.incr_sync(session, {"users_total": len(rows), "users_active": len(rows)})
+                self._update_job(
+                    session, job_id,
+                    processed_rows=progress["processed_rows"] + processed,
+                    created_count=progress["created_count"] + len(rows),
+                    duplicate_count=progress["duplicate_count"] + duplicates,
+                    invalid_count=progress["invalid_count"] + invalid,
+                )
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+        return len(rows)
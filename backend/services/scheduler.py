@@ -0,0 +1,211 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+
+import orjson
+
+# Highest priority first
+PRIORITIES = ("crisis", "interactive", "bulk")
+
+# Priority class of the request being served; set by PriorityMiddleware
+current_priority = contextvars.ContextVar("request_priority", default=None)
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        name: round(ordered[min(last, int(last * q))] * 1000, 2)
+        for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+    }
+
+
+class SchedulerBusy(Exception):
+    """Raised when a request is shed instead of queued"""
+
+    def __init__(self, priority):
+        super().__init__(f"no capacity for {priority} requests")
+        self.priority = priority
+
+
+class PriorityScheduler:
+    """Admission control for concurrent requests in three priority classes.
+
+    At most ``max_concurrency`` requests run at once in this process, and
+    ``reserved`` of those slots can only be taken by ``crisis`` requests,
+    so no amount of other traffic leaves crisis help waiting. ``bulk``
+    requests (exports, admin listings, imports) are further capped at
+    ``bulk_concurrency``. A request that cannot start waits in its class's
+    FIFO queue; freed slots go to the highest class that can use them.
+    Requests are shed with ``SchedulerBusy`` when their class's queue is
+    full (``bulk_queue`` for bulk, ``max_queue`` for interactive) or they
+    have waited longer than the class timeout. Crisis requests are never
+    shed. ``observer(priority, wait_seconds)`` is called on every admission.
+
+    Not thread-safe: use it from the event loop only.
+    """
+
+    def __init__(self, max_concurrency=64, reserved=8, bulk_concurrency=4, bulk_queue=16,
+                 max_queue=1000, interactive_timeout=10.0, bulk_timeout=5.0,
+                 latency_window=2048, observer=None):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.reserved = min(max(reserved, 0), self.max_concurrency - 1)
+        self.bulk_concurrency = max(bulk_concurrency, 1)
+        self.observer = observer
+        self._queue_limits = {"crisis": None, "interactive": max_queue, "bulk": bulk_queue}
+        self._timeouts = {"crisis": None, "interactive": interactive_timeout, "bulk": bulk_timeout}
+        self._waiters = {priority: deque() for priority in PRIORITIES}
+        self._in_flight = dict.fromkeys(PRIORITIES, 0)
+        self._admitted = dict.fromkeys(PRIORITIES, 0)
+        self._shed = dict.fromkeys(PRIORITIES, 0)
+        self._waits = {priority: deque(maxlen=latency_window) for priority in PRIORITIES}
+
+    def _admissible(self, priority):
+        total = sum(self._in_flight.values())
+        if total >= self.max_concurrency:
+            return False
+        if priority == "crisis":
+            return True
+        if total - self._in_flight["crisis"] >= self.max_concurrency - self.reserved:
+            return False
+        return priority != "bulk" or self._in_flight["bulk"] < self.bulk_concurrency
+
+    def _admit(self, priority, waited):
+        self._in_flight[priority] += 1
+        self._admitted[priority] += 1
+        self._waits[priority].append(waited)
+        if self.observer is not None:
+            self.observer(priority, waited)
+
+    def _shed_request(self, priority):
+        self._shed[priority] += 1
+        raise SchedulerBusy(priority)
+
+    def _wake(self):
+        for priority in PRIORITIES:
+            queue = self._waiters[priority]
+            while queue and self._admissible(priority):
+                future, enqueued_at = queue.popleft()
+                if not future.done():
+                    self._admit(priority, time.perf_counter() - enqueued_at)
+                    future.set_result(None)
+
+    async def acquire(self, priority):
+        """Wait for a slot for a request of this class; raises SchedulerBusy if shed"""
+        higher_or_equal = PRIORITIES[:PRIORITIES.index(priority) + 1]
+        if not any(self._waiters[waiting] for waiting in higher_or_equal) and self._admissible(priority):
+            self._admit(priority, 0.0)
+            return
+
+        queue = self._waiters[priority]
+        limit = self._queue_limits[priority]
+        if limit is not None and len(queue) >= limit:
+            self._shed_request(priority)
+        future = asyncio.get_running_loop().create_future()
+        entry = (future, time.perf_counter())
+        queue.append(entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self._timeouts[priority])
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled():
+                # Granted a slot just as the wait ended - pass it on
+                self.release(priority)
+            else:
+                future.cancel()
+                try:
+                    queue.remove(entry)
+                except ValueError:
+                    pass
+            if isinstance(exc, asyncio.TimeoutError):
+                self._shed_request(priority)
+            raise
+
+    def release(self, priority):
+        self._in_flight[priority] -= 1
+        self._wake()
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "reserved_for_crisis": self.reserved,
+            "bulk_concurrency": self.bulk_concurrency,
+            "classes": {
+                priority: {
+                    "in_flight": self._in_flight[priority],
+                    "queued": len(self._waiters[priority]),
+                    "admitted": self._admitted[priority],
+                    "shed": self._shed[priority],
+                    "wait_ms": _percentiles(list(self._waits[priority])),
+                }
+                for priority in PRIORITIES
+            },
+        }
+
+
+def route_classifier(rules, default="interactive"):
+    """Build ``classify(method, path)`` from ``(priority, methods, path)`` rules.
+
+    The first matching rule wins. ``methods`` is a tuple or ``None`` for any
+    method, a path ending in ``*`` matches as a prefix, and a priority of
+    ``None`` leaves the request unscheduled (health checks, long-lived streams).
+    """
+    compiled = [
+        (priority, methods, path[:-1] if path.endswith("*") else path, path.endswith("*"))
+        for priority, methods, path in rules
+    ]
+
+    def classify(method, path):
+        for priority, methods, rule_path, is_prefix in compiled:
+            if methods is not None and method not in methods:
+                continue
+            if path.startswith(rule_path) if is_prefix else path == rule_path:
+                return priority
+        return default
+
+    return classify
+
+
+class PriorityMiddleware:
+    """Pure ASGI middleware that runs each HTTP request under a
+    ``PriorityScheduler`` slot; shed requests get a 503 with Retry-After"""
+
+    def __init__(self, app, scheduler, classify, retry_after=1):
+        self.app = app
+        self.scheduler = scheduler
+        self.classify = classify
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        priority = self.classify(scope["method"], scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.scheduler.acquire(priority)
+        except SchedulerBusy:
+            body = orjson.dumps({"detail": "Server is busy, please try again shortly"})
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        token = current_priority.set(priority)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_priority.reset(token)
+            self.scheduler.release(priority)
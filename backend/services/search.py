@@ -0,0 +1,148 @@
+import re
+
+from sqlalchemy import Boolean, DateTime, Float, text
+
+_TERM = re.compile(r"[^\W_]+")
+
+USER_FIELDS = "u.id, u.name, u.email, u.is_active, u.created_at, u.last_login"
+ACTIVITY_FIELDS = "a.id, a.user_id, a.user_name, a.type, a.description, a.ip_address, a.timestamp"
+
+# Only the newest :max_candidates matches are ranked: FTS5 walks rowids in
+# order, so the cost stays flat however many rows a common term hits.
+# One spare match is fetched, and dropped again before ranking, so that
+# ranked_recent_only can say whether older matches were left out.
+SQLITE_USERS = f"""
+SELECT {USER_FIELDS}, -candidates.rank AS score, candidates.ranked_recent_only
+FROM (
+    SELECT rowid, rank, row_number() OVER (ORDER BY rowid DESC) AS recency,
+           count(*) OVER () > :max_candidates AS ranked_recent_only
+    FROM (
+        SELECT rowid, bm25(users_fts, 2.0, 1.0) AS rank FROM users_fts
+        WHERE users_fts MATCH :query
+        ORDER BY rowid DESC LIMIT :max_candidates + 1
+    ) AS matches
+) AS candidates
+JOIN users u ON u.rowid = candidates.rowid
+WHERE candidates.recency <= :max_candidates
+ORDER BY candidates.rank, u.id
+LIMIT :limit OFFSET :offset
+"""
+
+SQLITE_ACTIVITIES = f"""
+SELECT {ACTIVITY_FIELDS}, -candidates.rank AS score, candidates.ranked_recent_only
+FROM (
+    SELECT rowid, rank, row_number() OVER (ORDER BY rowid DESC) AS recency,
+           count(*) OVER () > :max_candidates AS ranked_recent_only
+    FROM (
+        SELECT rowid, bm25(activity_logs_fts) AS rank FROM activity_logs_fts
+        WHERE activity_logs_fts MATCH :query
+        ORDER BY rowid DESC LIMIT :max_candidates + 1
+    ) AS matches
+) AS candidates
+JOIN activity_logs a ON a.rowid = candidates.rowid
+WHERE candidates.recency <= :max_candidates
+ORDER BY candidates.rank, a.timestamp DESC
+LIMIT :limit OFFSET :offset
+"""
+
+# The documents indexed by migration 0006. Must match its
+# POSTGRES_DOCUMENTS character for character, or the planner will not use
+# the expression indexes.
+POSTGRES_DOCUMENTS = {
+    "users": "coalesce(name, '') || ' ' || translate(coalesce(email, ''), '@.+_-', '     ')",
+    "activity_logs": "coalesce(description, '') || ' ' || coalesce(user_name, '')",
+}
+
+POSTGRES_USERS = f"""
+SELECT {USER_FIELDS}, ts_rank(to_tsvector('simple', {POSTGRES_DOCUMENTS["users"]}), q.query) AS score,
+       u.ranked_recent_only
+FROM (
+    SELECT matches.*, row_number() OVER (ORDER BY matches.created_at DESC) AS recency,
+           count(*) OVER () > :max_candidates AS ranked_recent_only
+    FROM (
+        SELECT candidate.* FROM users candidate, to_tsquery('simple', :query) AS q(query)
+        WHERE to_tsvector('simple', {POSTGRES_DOCUMENTS["users"]}) @@ q.query
+        ORDER BY candidate.created_at DESC LIMIT :max_candidates + 1
+    ) AS matches
+) AS u, to_tsquery('simple', :query) AS q(query)
+WHERE u.recency <= :max_candidates
+ORDER BY score DESC, u.id
+LIMIT :limit OFFSET :offset
+"""
+
+POSTGRES_ACTIVITIES = f"""
+SELECT {ACTIVITY_FIELDS}, ts_rank(to_tsvector('simple', {POSTGRES_DOCUMENTS["activity_logs"]}), q.query) AS score,
+       a.ranked_recent_only
+FROM (
+    SELECT matches.*, row_number() OVER (ORDER BY matches.timestamp DESC) AS recency,
+           count(*) OVER () > :max_candidates AS ranked_recent_only
+    FROM (
+        SELECT candidate.* FROM activity_logs candidate, to_tsquery('simple', :query) AS q(query)
+        WHERE to_tsvector('simple', {POSTGRES_DOCUMENTS["activity_logs"]}) @@ q.query
+        ORDER BY candidate.timestamp DESC LIMIT :max_candidates + 1
+    ) AS matches
+) AS a, to_tsquery('simple', :query) AS q(query)
+WHERE a.recency <= :max_candidates
+ORDER BY score DESC, a.timestamp DESC
+LIMIT :limit OFFSET :offset
+"""
+
+
+def search_terms(query, max_terms=8):
+    """Lower-cased word tokens of a free-text query, tokenized like the index"""
+    return [term.lower() for term in _TERM.findall(query)][:max_terms]
+
+
+class SearchUnavailable(Exception):
+    """The database has no full-text index (unsupported backend or SQLite without FTS5)"""
+
+
+class FullTextSearch:
+    """Ranked prefix search over users (name, email) and activity logs
+    (description, user name).
+
+    All terms must match; the last one is a prefix, so ``"ana sm"`` finds
+    Ana Smith and ``"ana@uni"`` finds ana@uni.edu. Statements are
+    built for the index created by migration 0006: FTS5 on SQLite,
+    tsvector expression indexes on PostgreSQL.
+
+    Results are ranked by relevance among the newest ``candidates`` matches
+    only, not across every match: that keeps a term found in most rows as
+    fast as a rare one. Each row's ``ranked_recent_only`` is true when
+    older matches were left out, so callers can ask for a narrower query.
+    """
+
+    def __init__(self, dialect_name, candidates=1000):
+        if dialect_name not in ("sqlite", "postgresql"):
+            raise SearchUnavailable(f"Full-text search is not supported on {dialect_name}")
+        self.dialect_name = dialect_name
+        self.candidates = candidates
+
+    def match_expression(self, terms):
+        # Only the last term is still being typed; matching earlier ones
+        # exactly keeps a prefix of a very common word from expanding
+        *words, partial = terms
+        if self.dialect_name == "sqlite":
+            # Quoted so FTS5 operators and column filters in user input stay literal
+            return " ".join(['"' + term + '"' for term in words] + ['"' + partial + '"*'])
+        return " & ".join(words + [f"{partial}:*"])
+
+    def _statement(self, sql, typed_columns, terms, limit, offset):
+        return text(sql).bindparams(
+            query=self.match_expression(terms), limit=limit, offset=offset,
+            max_candidates=max(self.candidates, limit + offset)
+        ).columns(ranked_recent_only=Boolean, **typed_columns)
+
+    def users(self, terms, limit, offset=0):
+        return self._statement(
+            SQLITE_USERS if self.dialect_name == "sqlite" else POSTGRES_USERS,
+            {"is_active": Boolean, "created_at": DateTime, "last_login": DateTime, "score": Float},
+            terms, limit, offset
+        )
+
+    def activities(self, terms, limit, offset=0):
+        return self._statement(
+            SQLITE_ACTIVITIES if self.dialect_name == "sqlite" else POSTGRES_ACTIVITIES,
+            {"timestamp": DateTime, "score": Float},
+            terms, limit, offset
+        )
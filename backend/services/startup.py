@@ -0,0 +1,116 @@
+import ast
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+try:
+    import fcntl
+except ImportError:  # Windows - startup is then only serialized within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_REVISION_ASSIGNMENT = re.compile(r"^(revision|down_revision)\b[^=\n]*=\s*(.+)$", re.MULTILINE)
+
+
+def _lock_key(name):
+    # pg_advisory_lock takes a signed 64-bit key
+    return int.from_bytes(hashlib.sha1(name.encode()).digest()[:8], "big", signed=True)
+
+
+def _lock_path(engine, name):
+    url = engine.url
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        identity = os.path.abspath(url.database)
+    else:
+        identity = url.render_as_string(hide_password=True)
+    digest = hashlib.sha1(f"{identity}:{name}".encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"startup-{digest}.lock")
+
+
+@contextmanager
+def deployment_lock(engine, name="startup"):
+    """Hold an exclusive lock shared by every process using engine's database.
+
+    PostgreSQL uses a session advisory lock, so workers on different hosts
+    are serialized too. Other databases (SQLite) use a lock file keyed by
+    the database path, which covers every worker on the host.
+    """
+    if engine.dialect.name == "postgresql":
+        key = _lock_key(name)
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+        return
+
+    with open(_lock_path(engine, name), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def declared_heads(versions_dir):
+    """Head revisions of the migration scripts, read from their source without importing Alembic"""
+    revisions, parents = set(), set()
+    for filename in os.listdir(versions_dir):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(versions_dir, filename)) as script:
+            assignments = dict(_REVISION_ASSIGNMENT.findall(script.read()))
+        try:
+            revisions.add(ast.literal_eval(assignments["revision"]))
+            down_revision = ast.literal_eval(assignments.get("down_revision", "None"))
+        except (KeyError, ValueError, SyntaxError):
+            return None  # unusual script - let Alembic work it out
+        if isinstance(down_revision, str):
+            parents.add(down_revision)
+        elif down_revision:
+            parents.update(down_revision)
+    return revisions - parents
+
+
+def database_heads(engine):
+    try:
+        with engine.connect() as connection:
+            return {row[0] for row in connection.execute(text("SELECT version_num FROM alembic_version"))}
+    except DBAPIError:
+        return set()  # not migrated yet
+
+
+def schema_is_current(engine, versions_dir):
+    """Fast check that the database is at every head; False means ask Alembic, not necessarily outdated"""
+    heads = declared_heads(versions_dir)
+    return bool(heads) and database_heads(engine) == heads
+
+
+def upgrade_schema(engine, config):
+    """Run pending migrations unless another process already has; returns True if this one did"""
+    from alembic import command
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    with deployment_lock(engine, "migrations"):
+        heads = set(ScriptDirectory.from_config(config).get_heads())
+        with engine.connect() as connection:
+            if set(MigrationContext.configure(connection).get_current_heads()) == heads:
+                return False
+        # A plain connection, not engine.begin(): env.py gives each migration its own
+        # transaction, and autocommit blocks (CREATE INDEX CONCURRENTLY) need to end it
+        with engine.connect() as connection:
+            config.attributes["connection"] = connection
+            command.upgrade(config, "head")
+        logger.info("Database schema upgraded to head")
+        return True
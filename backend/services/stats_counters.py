@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import event, select, update
+
+logger = logging.getLogger(__name__)
+
+
+class StatsCounters:
+    """Named counters kept in a table and mirrored in an in-memory snapshot.
+
+    Writers call ``incr``/``incr_sync`` with the session that makes the counted
+    change, so the counter update commits or rolls back together with it. The
+    snapshot is bumped once that transaction commits, and reloaded from the
+    table every ``refresh_interval`` seconds, which also picks up other
+    workers' writes. Reads never touch the database.
+    """
+
+    def __init__(self, session_factory, model, refresh_interval=5.0):
+        self.session_factory = session_factory
+        self.model = model
+        self.refresh_interval = refresh_interval
+        self._values = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._refreshes = 0
+        self._refresh_errors = 0
+
+    def _update_statements(self, deltas):
+        for name, delta in deltas.items():
+            if delta:
+                yield update(self.model).where(self.model.name == name).values(value=self.model.value + delta)
+
+    def _apply(self, deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self._values[name] = self._values.get(name, 0) + delta
+
+    def _apply_on_commit(self, session, deltas):
+        """Add deltas to the snapshot once session commits; a rollback discards them"""
+        target = getattr(session, "sync_session", session)
+        pending = target.info.get(self)
+        if pending is None:
+            pending = target.info[self] = {}
+            event.listen(target, "after_commit", lambda s: self._apply(s.info.pop(self, {})), once=True)
+            event.listen(target, "after_rollback", lambda s: s.info.pop(self, None), once=True)
+        for name, delta in deltas.items():
+            pending[name] = pending.get(name, 0) + delta
+
+    async def incr(self, session, deltas):
+        """Add deltas inside an AsyncSession transaction (caller commits)"""
+        for statement in self._update_statements(deltas):
+            await session.execute(statement)
+        self._apply_on_commit(session, deltas)
+
+    def incr_sync(self, session, deltas):
+        """Add deltas inside a sync Session transaction (caller commits)"""
+        for statement in self._update_statements(deltas):
+            session.execute(statement)
+        self._apply_on_commit(session, deltas)
+
+    def get(self, name, default=0):
+        with self._lock:
+            return self._values.get(name, default)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def refresh(self):
+        session = self.session_factory()
+        try:
+            rows = session.execute(select(self.model.name, self.model.value)).all()
+        finally:
+            session.close()
+        with self._lock:
+            self._values = {name: value for name, value in rows}
+            self._refreshes += 1
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-counters-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.refresh_interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                self._refresh_errors += 1
+                logger.exception("Refreshing stat counters failed")
+
+    def stats(self):
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "refresh_interval_seconds": self.refresh_interval,
+            "refreshes": self._refreshes,
+            "refresh_errors": self._refresh_errors,
+            "counters": self.snapshot(),
+        }
+
+
+def after_commit(session, callback):
+    """Call ``callback()`` once session's current transaction commits (sync or async session)"""
+    target = getattr(session, "sync_session", session)
+    event.listen(target, "after_commit", lambda _: callback(), once=True)
+
+
+class SharedGeneration:
+    """A counter row that tells every worker when data it caches has changed.
+
+    Writers call ``bump``/``bump_sync`` with the session that makes the
+    change, so the new generation commits together with it. Readers tag
+    cached entries with ``current`` and treat entries from another
+    generation as misses. The row is read at most every ``poll_interval``
+    seconds (on every call with the default of 0), which bounds how long a
+    change made through another worker can go unseen; after a local commit
+    the next call always reads it.
+    """
+
+    def __init__(self, model, name, poll_interval=0.0):
+        self.model = model
+        self.name = name
+        self.poll_interval = poll_interval
+        self._value = 0
+        self._read_at = None
+        self._expirations = 0
+        self._lock = threading.Lock()
+
+    async def current(self, session):
+        now = time.monotonic()
+        with self._lock:
+            if self._read_at is not None and now - self._read_at < self.poll_interval:
+                return self._value
+            expirations = self._expirations
+        value = await session.scalar(select(self.model.value).where(self.model.name == self.name)) or 0
+        with self._lock:
+            # A commit that landed while the row was being read may not be in value
+            if expirations == self._expirations:
+                self._value, self._read_at = value, now
+        return value
+
+    def expire(self):
+        with self._lock:
+            self._read_at = None
+            self._expirations += 1
+
+    def _bump_statement(self):
+        return update(self.model).where(self.model.name == self.name).values(value=self.model.value + 1)
+
+    async def bump(self, session):
+        """Advance the generation inside an AsyncSession transaction (caller commits)"""
+        await session.execute(self._bump_statement())
+        after_commit(session, self.expire)
+
+    def bump_sync(self, session):
+        """Advance the generation inside a sync Session transaction (caller commits)"""
+        session.execute(self._bump_statement())
+        after_commit(session, self.expire)
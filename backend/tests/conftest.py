@@ -0,0 +1,27 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# main reads its settings when it is imported, so point it at a throwaway database and
+# archive before any test module imports it
+TEST_DATA_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(TEST_DATA_DIR, "app.db")
+os.environ["ACTIVITY_ARCHIVE_DIR"] = os.path.join(TEST_DATA_DIR, "archive")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def alembic_config():
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import BigInteger, Column, DateTime, String, Text, create_engine, func, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from services.activity_archive import ActivityArchive
+from services.stats_counters import StatsCounters
+
+Base = declarative_base()
+
+
+class ActivityLog(Base):
+    __tablename__ = "activity_logs"
+    id = Column(String, primary_key=True)
+    user_id = Column(String)
+    user_name = Column(String)
+    type = Column(String)
+    description = Column(String)
+    details = Column(Text)
+    ip_address = Column(String)
+    user_agent = Column(String)
+    timestamp = Column(DateTime)
+
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def counters(session_factory):
+    with session_factory.begin() as session:
+        session.add(StatCounter(name="activity_logs_total", value=100))
+    counters = StatsCounters(session_factory, StatCounter)
+    counters.refresh()
+    return counters
+
+
+@pytest.fixture
+def archive(tmp_path, session_factory, counters):
+    now = datetime.utcnow()
+    with session_factory() as session:
+        # One row per day for the last 100 days, alternating users
+        session.add_all(
+            ActivityLog(id=f"a{age}", user_id=f"u{age % 2}", type="login" if age % 2 else "register",
+                        description=f"{age} days ago", details='{"age": %d}' % age,
+                        timestamp=now - timedelta(days=age, minutes=1))
+            for age in range(100)
+        )
+        session.commit()
+    archive = ActivityArchive(
+        str(tmp_path / "archive"), session_factory, ActivityLog, retention_days=30, batch_size=32,
+        on_archive=lambda session, rows: counters.incr_sync(session, {"activity_logs_total": -len(rows)})
+    )
+    archive.archive_expired()
+    return archive
+
+
+def test_expired_rows_move_into_daily_segments(archive, session_factory, counters):
+    assert archive.stats()["archived_rows"] == 70
+    assert len(archive.segment_days()) == 70
+    with session_factory() as session:
+        assert session.scalar(select(func.count()).select_from(ActivityLog)) == 30
+        assert session.get(StatCounter, "activity_logs_total").value == 30
+    assert counters.get("activity_logs_total") == 30
+    assert archive.archive_expired() == 0
+
+
+def test_read_returns_archived_rows_newest_first(archive):
+    records = archive.read(limit=5)
+    assert [record["id"] for record in records] == ["a30", "a31", "a32", "a33", "a34"]
+    assert records[0]["details"] == {"age": 30}
+    assert isinstance(records[0]["timestamp"], datetime)
+
+
+def test_read_applies_filters(archive):
+    records = archive.read(types=["login"], user_id="u1", limit=3)
+    assert [record["id"] for record in records] == ["a31", "a33", "a35"]
+    since = datetime.utcnow() - timedelta(days=40)
+    assert {record["id"] for record in archive.read(since=since)} == {f"a{age}" for age in range(30, 40)}
+
+
+def test_max_segments_bounds_an_unbounded_read(archive):
+    records = archive.read(user_id="missing", limit=100, max_segments=7)
+    assert records == []
+    records = archive.read(limit=100, max_segments=7)
+    assert len(records) == 7
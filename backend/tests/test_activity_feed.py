@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+from services.activity_feed import ActivityFeed
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_subscribers_get_the_types_they_asked_for():
+    async def scenario():
+        feed = ActivityFeed()
+        everything, logins = feed.subscribe(), feed.subscribe(types=["login"])
+        feed.publish({"type": "login", "user": "a"})
+        feed.publish({"type": "register", "user": "b"})
+        return feed, drain(everything), drain(logins)
+
+    feed, everything, logins = asyncio.run(scenario())
+    assert [event["type"] for _, event in everything] == ["login", "register"]
+    assert [event["type"] for _, event in logins] == ["login"]
+    assert everything[0][0] == f"{feed.boot_id}-1"
+
+
+def test_reconnecting_replays_events_after_the_last_id():
+    async def scenario():
+        feed = ActivityFeed(history_size=3, queue_size=10)
+        for number in range(5):
+            feed.publish({"type": "login", "number": number})
+        resumed = feed.subscribe(last_event_id=f"{feed.boot_id}-3")
+        from_another_boot = feed.subscribe(last_event_id="0000beef-4")
+        fresh = feed.subscribe()
+        return drain(resumed), drain(from_another_boot), drain(fresh)
+
+    resumed, from_another_boot, fresh = asyncio.run(scenario())
+    assert [event["number"] for _, event in resumed] == [3, 4]
+    assert [event["number"] for _, event in from_another_boot] == [2, 3, 4]  # the whole buffer
+    assert fresh == []
+
+
+def test_slow_consumers_are_disconnected():
+    async def scenario():
+        feed = ActivityFeed(queue_size=2)
+        slow = feed.subscribe()
+        for number in range(3):
+            feed.publish({"type": "login", "number": number})
+        return feed, await slow.get()
+
+    feed, marker = asyncio.run(scenario())
+    assert marker is None
+    assert feed.stats()["subscribers"] == 0
+    assert feed.stats()["slow_consumers_disconnected"] == 1
+
+
+def test_publish_from_another_thread_is_delivered_on_the_loop():
+    async def scenario():
+        feed = ActivityFeed()
+        subscription = feed.subscribe()
+        publisher = threading.Thread(target=feed.publish, args=({"type": "login"},))
+        publisher.start()
+        publisher.join()
+        return await asyncio.wait_for(subscription.get(), 1.0)
+
+    event_id, event = asyncio.run(scenario())
+    assert event == {"type": "login"}
@@ -0,0 +1,232 @@
+"""Endpoint tests, run against main.app and its lifespan on the throwaway database from conftest"""
+import asyncio
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import main
+from main import ActivityLogDB, SessionLocal, app, create_access_token
+
+ADMIN_TOKEN = create_access_token({"sub": os.getenv("DEFAULT_ADMIN_EMAIL", "admin@example.com")}, is_admin=True)
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def call_api(scenario):
+    """Run ``await scenario(client)`` inside the app's lifespan"""
+    async def run():
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await scenario(client)
+
+    return asyncio.run(run())
+
+
+async def asgi_get(path, query="", headers=(), first_chunk_only=False):
+    """``(status, body chunks)`` of a GET sent straight to the app, one chunk per ASGI body message.
+
+    httpx buffers the whole body, which hides how a response was streamed and never returns
+    from an endless one; with ``first_chunk_only`` the client disconnects after one chunk.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+        "client": ("127.0.0.1", 50000), "server": ("test", 80), "root_path": "",
+    }
+    response = {"status": None, "chunks": []}
+    disconnect = asyncio.Event()
+
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            response["chunks"].append(message["body"])
+            if first_chunk_only:
+                disconnect.set()
+
+    await app(scope, receive, send)
+    return response["status"], response["chunks"]
+
+
+def test_a_stream_ticket_opens_the_activity_stream_once():
+    async def scenario(client):
+        issued = await client.post("/admin/activities/stream/ticket", headers=bearer(ADMIN_TOKEN))
+        ticket = issued.json()["ticket"]
+        first = await asgi_get("/admin/activities/stream", f"ticket={ticket}", first_chunk_only=True)
+        again = await asgi_get("/admin/activities/stream", f"ticket={ticket}", first_chunk_only=True)
+        return issued, first, again
+
+    issued, (status, chunks), (status_again, _) = call_api(scenario)
+    assert issued.status_code == 201
+    assert status == 200 and chunks[0] == b"retry: 3000\n\n"
+    assert status_again == 401
+
+
+def test_expired_stream_tickets_are_rejected(monkeypatch):
+    monkeypatch.setattr(main, "ACTIVITY_STREAM_TICKET_SECONDS", 0)
+
+    async def scenario(client):
+        ticket = (await client.post("/admin/activities/stream/ticket", headers=bearer(ADMIN_TOKEN))).json()["ticket"]
+        return await asgi_get("/admin/activities/stream", f"ticket={ticket}", first_chunk_only=True)
+
+    status, _ = call_api(scenario)
+    assert status == 401
+
+
+@pytest.mark.parametrize("query", [f"access_token={ADMIN_TOKEN}", f"ticket={ADMIN_TOKEN}", ""])
+def test_the_activity_stream_rejects_access_tokens_in_the_query(query):
+    status, _ = call_api(lambda client: asgi_get("/admin/activities/stream", query, first_chunk_only=True))
+    assert status == 401
+
+
+def test_only_admins_get_stream_tickets():
+    user_token = create_access_token({"sub": "student@uni.edu"})
+    response = call_api(lambda client: client.post("/admin/activities/stream/ticket", headers=bearer(user_token)))
+    assert response.status_code == 401
+
+
+def test_register_login_and_profile_round_trip():
+    email = f"{uuid.uuid4().hex[:12]}@uni.edu"
+
+    async def scenario(client):
+        registered = await client.post("/register", json={"name": "Asha", "email": email, "password": "pw-123456"})
+        wrong = await client.post("/login", json={"email": email, "password": "wrong"})
+        logged_in = await client.post("/login", json={"email": email, "password": "pw-123456"})
+        token = logged_in.json()["access_token"]
+        me = await client.get("/me", headers=bearer(token))
+        unchanged = await client.get("/me", headers={**bearer(token), "If-None-Match": me.headers["etag"]})
+        renamed = await client.put("/profile", params={"name": "Asha K"}, headers=bearer(token))
+        me_again = await client.get("/me", headers=bearer(token))
+        return registered, wrong, logged_in, me, unchanged, renamed, me_again
+
+    registered, wrong, logged_in, me, unchanged, renamed, me_again = call_api(scenario)
+    assert registered.status_code == 200 and registered.json()["user"]["email"] == email
+    assert wrong.status_code == 401
+    assert logged_in.status_code == 200 and logged_in.json()["user"]["last_login"] is not None
+    assert me.json()["name"] == "Asha"
+    assert unchanged.status_code == 304
+    assert renamed.json()["name"] == "Asha K"
+    assert me_again.json()["name"] == "Asha K"  # the cached principal was replaced
+
+
+def test_admin_changes_reach_cached_principals_and_listings():
+    email = f"{uuid.uuid4().hex[:12]}@uni.edu"
+
+    async def scenario(client):
+        registered = (await client.post("/register", json={"name": "Ben", "email": email, "password": "pw-123456"})).json()
+        user_id, token = registered["user"]["id"], registered["access_token"]
+        listing = {"sort_by": "created_at", "sort_order": "desc", "limit": 100}
+        await client.get("/me", headers=bearer(token))  # cache the principal and the listing page
+        await client.get("/admin/users", params=listing, headers=bearer(ADMIN_TOKEN))
+        deactivated = await client.post(f"/admin/users/{user_id}/deactivate", headers=bearer(ADMIN_TOKEN))
+        me = await client.get("/me", headers=bearer(token))
+        users = (await client.get("/admin/users", params=listing, headers=bearer(ADMIN_TOKEN))).json()["users"]
+        detail = await client.get(f"/admin/users/{user_id}", headers=bearer(ADMIN_TOKEN))
+        login = await client.post("/login", json={"email": email, "password": "pw-123456"})
+        return deactivated, me, users, detail, login, user_id
+
+    deactivated, me, users, detail, login, user_id = call_api(scenario)
+    assert deactivated.status_code == 200
+    assert me.json()["is_active"] is False
+    assert [user["is_active"] for user in users if user["id"] == user_id] == [False]
+    assert detail.status_code == 200 and detail.json()["user"]["is_active"] is False
+    assert login.status_code == 400
+
+
+@pytest.fixture
+def fresh_readiness(monkeypatch):
+    monkeypatch.setitem(main._readiness, "checked_at", None)
+
+
+def test_probes_pass_while_the_database_is_up(fresh_readiness):
+    async def scenario(client):
+        return await client.get("/livez"), await client.get("/readyz")
+
+    live, ready = call_api(scenario)
+    assert live.status_code == 200 and live.json() == {"status": "alive"}
+    assert ready.status_code == 200 and ready.json()["status"] == "ready"
+
+
+def test_readyz_is_503_while_the_database_is_down(fresh_readiness, monkeypatch, tmp_path):
+    unreachable = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'app.db'}")
+
+    async def scenario(client):
+        with monkeypatch.context() as patch:
+            patch.setattr(main, "async_engine", unreachable)
+            down = await client.get("/readyz")
+            live = await client.get("/livez")
+        cached = await client.get("/readyz")  # within READINESS_CACHE_SECONDS, so not pinged again
+        main._readiness["checked_at"] = None
+        recovered = await client.get("/readyz")
+        await unreachable.dispose()
+        return down, live, cached, recovered
+
+    down, live, cached, recovered = call_api(scenario)
+    assert down.status_code == 503
+    assert down.json()["reason"].startswith("database unreachable")
+    assert live.status_code == 200  # liveness never touches the database
+    assert cached.status_code == 503
+    assert recovered.status_code == 200
+
+
+# A day inside the retention window, so the archiver leaves it alone, that no other test writes to
+EXPORT_DAY = datetime.combine(datetime.utcnow().date() - timedelta(days=30), datetime.min.time())
+
+
+@pytest.fixture
+def exported_rows(monkeypatch):
+    """Five activities on the export day, exported two rows per batch"""
+    monkeypatch.setattr(main, "ACTIVITY_EXPORT_BATCH_SIZE", 2)
+    day = EXPORT_DAY
+    rows = [
+        {"id": str(uuid.uuid4()), "user_id": f"u{number}", "user_name": f"Student {number}", "type": "login",
+         "description": f"login {number}", "details": {"n": number}, "ip_address": None, "user_agent": None,
+         "timestamp": day + timedelta(hours=number)}
+        for number in range(5)
+    ]
+    with SessionLocal.begin() as session:
+        session.add_all(ActivityLogDB(**row) for row in rows)
+    yield rows
+    with SessionLocal.begin() as session:
+        session.execute(delete(ActivityLogDB).where(ActivityLogDB.id.in_([row["id"] for row in rows])))
+
+
+def export(file_format):
+    query = f"format={file_format}&from={EXPORT_DAY.isoformat()}&to={(EXPORT_DAY + timedelta(days=1)).isoformat()}"
+    return call_api(lambda client: asgi_get("/admin/activities/export", query, [("Authorization", f"Bearer {ADMIN_TOKEN}")]))
+
+
+def test_ndjson_export_streams_one_chunk_per_batch(exported_rows):
+    status, chunks = export("ndjson")
+
+    assert status == 200
+    assert [len(chunk.splitlines()) for chunk in chunks] == [2, 2, 1]
+    records = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [record["id"] for record in records] == [row["id"] for row in exported_rows]
+    assert records[3]["details"] == {"n": 3}
+    assert records[3]["timestamp"] == (EXPORT_DAY + timedelta(hours=3)).isoformat()
+
+
+def test_csv_export_streams_a_header_and_one_chunk_per_batch(exported_rows):
+    status, chunks = export("csv")
+
+    assert status == 200
+    assert len(chunks) == 3
+    records = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [record["id"] for record in records] == [row["id"] for row in exported_rows]
+    assert json.loads(records[0]["details"]) == {"n": 0}
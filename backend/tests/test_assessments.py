@@ -0,0 +1,104 @@
+import random
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from main import AssessmentDB
+from services.assessments import SEVERITY_BANDS, CohortReport, Questionnaire, week_start
+
+ITEMS = ["mood", "energy", "stress"]
+NOW = datetime(2026, 6, 10, 12, 0)  # a Wednesday
+
+
+@pytest.fixture
+def questionnaire():
+    return Questionnaire("test", ITEMS, reverse_keyed={"stress"})
+
+
+def test_pack_round_trips_and_validates(questionnaire):
+    blob = questionnaire.pack({"mood": 4, "energy": 2, "stress": 5})
+    assert blob == bytes([4, 2, 5])
+    assert questionnaire.responses(blob) == {"mood": 4, "energy": 2, "stress": 5}
+    for responses in ({"mood": 4, "energy": 2}, {"mood": 4, "energy": 2, "stress": 6},
+                      {"mood": 4, "energy": 2, "stress": 2.5}):
+        with pytest.raises(ValueError):
+            questionnaire.pack(responses)
+
+
+def test_scores_flip_reverse_keyed_items_and_band_them(questionnaire):
+    answers = questionnaire.unpack([bytes([5, 5, 1]), bytes([1, 1, 5]), bytes([3, 2, 3]), bytes([4, 4, 3])])
+    scores, bands = questionnaire.score(answers)
+
+    assert scores.tolist() == pytest.approx([5.0, 1.0, 2.6667, 3.6667], abs=1e-4)
+    assert [SEVERITY_BANDS[band] for band in bands] == ["minimal", "severe", "moderate", "mild"]
+
+
+def test_week_start_is_monday():
+    for day in range(date(2026, 6, 8).toordinal(), date(2026, 6, 15).toordinal()):
+        assert week_start((date.fromordinal(day) - date(1970, 1, 1)).days) == date(2026, 6, 8)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'assessments.db'}")
+    AssessmentDB.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def submit(session_factory, questionnaire, rows):
+    with session_factory.begin() as session:
+        for department, submitted_at, answers in rows:
+            session.add(AssessmentDB(id=str(uuid.uuid4()), user_id="u1", department=department,
+                                     questionnaire="test", answers=bytes(answers), score=0, severity="",
+                                     submitted_at=submitted_at))
+
+
+def expected_report(questionnaire, rows, window_start):
+    cells = defaultdict(lambda: [0] * len(SEVERITY_BANDS) + [0.0])
+    for department, submitted_at, answers in rows:
+        if submitted_at < window_start:
+            continue
+        scores, bands = questionnaire.score(np.array([answers], dtype=np.uint8))
+        cell = cells[(department or "unassigned", week_start((submitted_at.date() - date(1970, 1, 1)).days))]
+        cell[int(bands[0])] += 1
+        cell[-1] += float(scores[0])
+    return {key: (dict(zip(SEVERITY_BANDS, cell[:-1])), round(cell[-1] / sum(cell[:-1]), 2))
+            for key, cell in cells.items()}
+
+
+def as_dict(report):
+    return {(row["department"], row["week_start"]): (row["bands"], row["mean_score"]) for row in report}
+
+
+def test_report_matches_a_row_by_row_count(session_factory, questionnaire):
+    rng = random.Random(3)
+    rows = [(rng.choice(["Physics", "Maths", None]),
+             NOW - timedelta(minutes=rng.randrange(0, 60 * 24 * 7 * 6)),
+             [rng.randint(1, 5) for _ in ITEMS]) for _ in range(500)]
+    submit(session_factory, questionnaire, rows)
+    report = CohortReport(session_factory, AssessmentDB, questionnaire, max_weeks=4, ttl=0, batch_size=64)
+
+    built = report.build(now=NOW)
+    assert as_dict(built) == expected_report(questionnaire, rows, datetime(2026, 5, 18))
+    assert [row["week_start"] for row in built] == sorted((row["week_start"] for row in built), reverse=True)
+
+
+def test_later_builds_only_add_new_submissions(session_factory, questionnaire):
+    old = [("Physics", NOW - timedelta(days=1), [5, 5, 1])]
+    submit(session_factory, questionnaire, old)
+    report = CohortReport(session_factory, AssessmentDB, questionnaire, max_weeks=4, settle_seconds=60, ttl=0)
+    report.build(now=NOW)
+    scored = report.stats()["rows_scored"]
+
+    new = [("Physics", NOW + timedelta(seconds=30), [1, 1, 5])]
+    submit(session_factory, questionnaire, new)
+    built = report.build(now=NOW + timedelta(minutes=1))
+
+    assert report.stats()["rows_scored"] - scored == 1  # the settled submission was not read again
+    assert as_dict(built) == expected_report(questionnaire, old + new, datetime(2026, 5, 18))
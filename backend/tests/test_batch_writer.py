@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import Column, Integer, create_engine, func, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from services.batch_writer import BatchWriter
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = "rows"
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rows.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def count_rows(session_factory):
+    with session_factory() as session:
+        return session.scalar(select(func.count()).select_from(Row))
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def stalled_writer(session_factory, **options):
+    """A writer whose first batch hangs until the returned event is set, leaving a full buffer behind it"""
+    release = threading.Event()
+
+    def slow_session():
+        release.wait(10)
+        return session_factory()
+
+    writer = BatchWriter(slow_session, Row, max_batch=2, max_buffer=2, **options)
+    writer.submit({"value": 1})
+    writer.submit({"value": 2})
+    assert wait_until(lambda: writer.stats()["buffered"] == 0)  # first batch taken, writer now stuck
+    writer.submit({"value": 3})
+    writer.submit({"value": 4})
+    return writer, release
+
+
+def test_first_row_is_written_after_the_flush_interval(session_factory):
+    writer = BatchWriter(session_factory, Row, max_batch=500, flush_interval=0.05)
+    try:
+        writer.submit({"value": 1})
+        assert wait_until(lambda: count_rows(session_factory) == 1, timeout=2.0)
+    finally:
+        writer.stop()
+
+
+def test_stop_drains_the_buffer(session_factory):
+    writer = BatchWriter(session_factory, Row, max_batch=500, flush_interval=60)
+    for value in range(10):
+        writer.submit({"value": value})
+    writer.stop()
+    assert count_rows(session_factory) == 10
+    assert writer.stats()["flushed"] == 10
+
+
+def test_drop_policy_drops_rows_when_the_buffer_is_full(session_factory):
+    writer, release = stalled_writer(session_factory)
+    try:
+        assert writer.submit({"value": 5}) is False
+        assert writer.stats()["dropped"] == 1
+    finally:
+        release.set()
+        writer.stop()
+    assert count_rows(session_factory) == 4
+
+
+def test_block_policy_waits_for_room_off_the_event_loop(session_factory):
+    writer, release = stalled_writer(session_factory, overflow_policy="block", block_timeout=5.0)
+    try:
+        threading.Timer(0.1, release.set).start()
+        started = time.monotonic()
+        assert writer.submit({"value": 5}) is True
+        assert time.monotonic() - started >= 0.05
+    finally:
+        release.set()
+        writer.stop()
+    assert count_rows(session_factory) == 5
+
+
+def test_block_policy_never_blocks_the_event_loop(session_factory):
+    writer, release = stalled_writer(session_factory, overflow_policy="block", block_timeout=5.0)
+
+    async def submit_from_a_route():
+        started = time.monotonic()
+        accepted = writer.submit({"value": 5})
+        return accepted, time.monotonic() - started
+
+    try:
+        accepted, waited = asyncio.run(submit_from_a_route())
+        assert accepted is False
+        assert waited < 1.0
+        assert writer.stats()["dropped"] == 1
+    finally:
+        release.set()
+        writer.stop()
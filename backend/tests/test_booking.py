@@ -0,0 +1,112 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from main import BookingDB, CounselorDB
+from services.booking import AvailabilityIndex, SlotGrid
+
+TODAY = date(2026, 6, 1)
+
+
+def at(day, hour, minute=0):
+    return datetime(2026, 6, day, hour, minute)
+
+
+def test_grid_masks_the_opening_hours():
+    grid = SlotGrid(slot_minutes=30, hours="09:00-10:30,14:15-15:00")
+    assert grid.open_slots() == [18, 19, 20, 29]  # 14:15 rounds up to the 14:30 slot
+    assert grid.slot_of(at(2, 9, 30)) == (at(2, 0).toordinal(), 19)
+    assert grid.start_of(at(2, 0).toordinal(), 29) == at(2, 14, 30)
+    for moment in (at(2, 10, 30), at(2, 9, 15), datetime(2026, 6, 2, 9, 0, 1)):
+        with pytest.raises(ValueError):
+            grid.slot_of(moment)
+    with pytest.raises(ValueError):
+        SlotGrid(slot_minutes=7)
+    with pytest.raises(ValueError):
+        SlotGrid(hours="18:00-09:00")
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bookings.db'}")
+    CounselorDB.__table__.create(engine)
+    BookingDB.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    with factory.begin() as session:
+        session.add_all([CounselorDB(id="c1", name="Dr Rao"), CounselorDB(id="c2", name="Dr Shah"),
+                         CounselorDB(id="gone", name="Dr Old", is_active=False)])
+    yield factory
+    engine.dispose()
+
+
+def book(session_factory, booking_id, counselor_id, slot_start, status="booked"):
+    with session_factory.begin() as session:
+        session.add(BookingDB(id=booking_id, counselor_id=counselor_id, user_id="u1", slot_start=slot_start,
+                              status=status, session_type="video"))
+
+
+def index_for(session_factory):
+    index = AvailabilityIndex(session_factory, BookingDB, CounselorDB, SlotGrid(), horizon_days=14, ttl=60)
+    index.refresh(TODAY)
+    return index
+
+
+def test_database_rejects_a_second_active_booking_of_a_slot(session_factory):
+    book(session_factory, "b1", "c1", at(2, 9))
+    with pytest.raises(IntegrityError):
+        book(session_factory, "b2", "c1", at(2, 9))
+
+    book(session_factory, "b3", "c2", at(2, 9))  # another counselor
+    book(session_factory, "b4", "c1", at(2, 10), status="cancelled")
+    book(session_factory, "b5", "c1", at(2, 10))  # a cancelled booking does not hold the slot
+
+
+def test_index_reports_booked_slots_as_taken(session_factory):
+    book(session_factory, "b1", "c1", at(2, 9))
+    book(session_factory, "b2", "c1", at(2, 10), status="cancelled")
+    index = index_for(session_factory)
+
+    assert not index.is_free("c1", at(2, 9))
+    assert index.is_free("c1", at(2, 10))
+    assert index.is_free("c2", at(2, 9))
+    assert not index.is_free("gone", at(2, 9))  # inactive counselors have no slots
+    assert not index.has_counselor("gone")
+    with pytest.raises(ValueError):
+        index.is_free("c1", at(2, 13))
+
+
+def test_mark_applies_local_bookings_and_cancellations(session_factory):
+    index = index_for(session_factory)
+
+    index.mark("c1", at(3, 14), booked=True)
+    assert not index.is_free("c1", at(3, 14))
+    index.mark("c1", at(3, 14), booked=False)
+    assert index.is_free("c1", at(3, 14))
+    index.mark("c1", at(3, 14, 30), booked=True)  # not a slot of this grid: ignored
+
+
+def test_next_free_skips_booked_and_past_slots(session_factory):
+    book(session_factory, "b1", "c1", at(2, 10))
+    book(session_factory, "b2", "c1", at(2, 11))
+    index = index_for(session_factory)
+
+    assert index.next_free("c1", at(2, 9, 30), limit=3) == [at(2, 14), at(2, 15), at(2, 16)]
+    assert index.next_free("c1", at(2, 17, 1), limit=2) == [at(3, 9), at(3, 10)]
+    assert index.next_free("c1", at(2, 9), limit=10, days=1) == [at(2, 9), at(2, 14), at(2, 15), at(2, 16), at(2, 17)]
+    assert index.next_free("nobody", at(2, 9)) == []
+
+
+def test_refresh_keeps_local_marks_made_while_it_queried(session_factory):
+    index = AvailabilityIndex(session_factory, BookingDB, CounselorDB, SlotGrid(), horizon_days=14, ttl=0)
+    index.refresh(TODAY)
+
+    def session_with_a_concurrent_booking():
+        index.mark("c1", at(4, 9), booked=True)  # committed after the refresh's snapshot was taken
+        return session_factory()
+
+    index.session_factory = session_with_a_concurrent_booking
+    index.refresh(TODAY)
+    assert not index.is_free("c1", at(4, 9))
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime
+
+import orjson
+import pytest
+
+from services.group_chat import GroupChat, RoomMember, auth_token
+
+
+def message(number):
+    return {"id": f"m{number}", "user_id": "u1", "user_name": "Asha", "body": f"hello {number}",
+            "sent_at": datetime(2026, 5, 1, 10, number)}
+
+
+@pytest.mark.parametrize("data, token", [
+    ('{"type": "auth", "token": "abc"}', "abc"),
+    ('{"type": "auth", "token": ""}', None),
+    ('{"type": "auth", "token": 42}', None),
+    ('{"type": "message", "body": "hi"}', None),
+    ('["auth", "abc"]', None),
+    ("not json", None),
+    (None, None),
+])
+def test_auth_token(data, token):
+    assert auth_token(data) == token
+
+
+def test_joiners_get_the_history_and_later_messages():
+    async def scenario():
+        persisted = []
+        chat = GroupChat(history_size=2, on_message=persisted.append)
+        chat.open_room("g1", [message(1)])
+        chat.publish("g1", message(2))
+        chat.publish("g1", message(3))
+
+        member = RoomMember("u2", "Ben")
+        history = orjson.loads(chat.join("g1", member))
+        chat.publish("g1", message(4))
+        return history, orjson.loads(await member.get()), persisted
+
+    history, frame, persisted = asyncio.run(scenario())
+    assert [item["id"] for item in history["messages"]] == ["m2", "m3"]  # only the newest history_size
+    assert frame["type"] == "message" and frame["body"] == "hello 4"
+    assert [row["id"] for row in persisted] == ["m2", "m3", "m4"]
+    assert all(row["group_id"] == "g1" for row in persisted)
+
+
+def test_a_slow_member_is_disconnected_without_holding_up_the_room():
+    async def scenario():
+        chat = GroupChat(queue_size=2)
+        chat.open_room("g1")
+        slow, reader = RoomMember("u1", "Asha", 2), RoomMember("u2", "Ben", 10)
+        chat.join("g1", slow)
+        chat.join("g1", reader)
+        for number in range(3):
+            chat.publish("g1", message(number))
+        return await slow.get(), [await reader.get() for _ in range(3)], chat.stats()
+
+    marker, frames, stats = asyncio.run(scenario())
+    assert marker is None  # tells the connection to close
+    assert len(frames) == 3
+    assert stats["members"] == 1
+    assert stats["slow_members_disconnected"] == 1
+
+
+def test_leave_stops_delivery():
+    async def scenario():
+        chat = GroupChat()
+        chat.open_room("g1")
+        member = RoomMember("u1", "Asha")
+        chat.join("g1", member)
+        chat.leave("g1", member)
+        chat.publish("g1", message(1))
+        return member.queue.empty()
+
+    assert asyncio.run(scenario())
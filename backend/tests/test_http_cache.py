@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from services.http_cache import (
+    CompressionMiddleware, PRIVATE_REVALIDATE, ResponseCache, body_etag, entity_etag, etag_matches, not_modified
+)
+
+BODY = b'{"users": []}' * 200
+
+
+def test_etags_are_weak_and_versioned():
+    assert entity_etag("user", "u1", 1).startswith('W/"')
+    assert entity_etag("user", "u1", 1) != entity_etag("user", "u1", 2)
+    assert body_etag(BODY) == body_etag(bytes(BODY))
+
+
+def test_etag_matches_uses_weak_comparison():
+    etag = entity_etag("user", "u1", 1)
+    opaque = etag.removeprefix("W/")
+    assert etag_matches(etag, etag)
+    assert etag_matches(opaque, etag)
+    assert etag_matches(f'"other", {opaque}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('W/"other"', etag)
+
+
+def test_cache_ignores_a_put_from_before_an_invalidation():
+    cache = ResponseCache(ttl=60)
+    generation = cache.generation
+    cache.invalidate()
+    cache.put("page", BODY, generation)
+    assert cache.get("page") is None
+
+    etag = cache.put("page", BODY, cache.generation)
+    assert cache.get("page") == (etag, BODY)
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.http_cache.time.monotonic", lambda: now[0])
+    cache = ResponseCache(ttl=30)
+    cache.put("page", BODY, cache.generation)
+    now[0] += 29
+    assert cache.get("page") is not None
+    now[0] += 2
+    assert cache.get("page") is None
+
+
+async def listing(request):
+    etag = body_etag(BODY)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return Response(BODY, media_type="application/json", headers={"ETag": etag, "Cache-Control": PRIVATE_REVALIDATE})
+
+
+async def plain(request):
+    return Response(BODY, media_type="application/json")
+
+
+@pytest.fixture
+def app():
+    return CompressionMiddleware(Starlette(routes=[Route("/listing", listing), Route("/plain", plain)]))
+
+
+def get(app, path, headers):
+    async def request():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(path, headers=headers)
+
+    return asyncio.run(request())
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "identity"])
+def test_responses_with_an_etag_vary_on_encoding(app, encoding):
+    response = get(app, "/listing", {"Accept-Encoding": encoding})
+
+    assert response.headers.get("content-encoding") == (encoding if encoding == "gzip" else None)
+    assert response.headers["vary"].lower() == "accept-encoding"
+    assert response.headers["etag"] == body_etag(BODY)
+    assert response.content == BODY
+
+
+def test_not_modified_varies_on_encoding(app):
+    response = get(app, "/listing", {"Accept-Encoding": "gzip", "If-None-Match": body_etag(BODY)})
+
+    assert response.status_code == 304
+    assert response.headers["vary"].lower() == "accept-encoding"
+
+
+def test_responses_without_an_etag_are_left_alone(app):
+    response = get(app, "/plain", {"Accept-Encoding": "identity"})
+    assert "vary" not in response.headers
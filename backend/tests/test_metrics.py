@@ -0,0 +1,86 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from services.metrics import Counter, Histogram, Metrics, MetricsMiddleware, metric_family
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/users")
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/users",le="0.1"} 2',
+        'latency_seconds_bucket{route="/users",le="1.0"} 3',
+        'latency_seconds_bucket{route="/users",le="+Inf"} 4',
+        'latency_seconds_sum{route="/users"} 3.65',
+        'latency_seconds_count{route="/users"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("events_total", "Events.", ("name",))
+    counter.inc('say "hi"\\\n')
+    assert counter.render()[-1] == 'events_total{name="say \\"hi\\"\\\\\\n"} 1'
+    assert metric_family("gauge", "pool_size", "Pool size.", [({}, 5)])[-1] == "pool_size 5"
+
+
+def scrape(metrics, *paths):
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+
+    # Route templates come from the matched FastAPI route, as in main
+    api = FastAPI()
+
+    @api.get("/users")
+    async def users():
+        with engine.connect() as connection:
+            for user_id in range(12):  # one query per row: an N+1
+                connection.execute(text("SELECT :id"), {"id": user_id})
+        return "ok"
+
+    @api.get("/users/{user_id}")
+    async def user(user_id: str):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return "ok"
+
+    app = MetricsMiddleware(api, metrics)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for path in paths:
+                await client.get(path)
+
+    asyncio.run(run())
+    engine.dispose()
+    return metrics.render()
+
+
+def test_requests_are_labelled_by_route_template():
+    exposition = scrape(Metrics(), "/users/1", "/users/2", "/missing")
+
+    assert 'http_requests_total{method="GET",route="/users/{user_id}",status="200"} 2' in exposition
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in exposition
+    assert 'db_queries_total{route="/users/{user_id}"} 2' in exposition
+    assert 'http_requests_in_flight{method="GET"} 0' in exposition
+
+
+def test_repeated_statements_count_as_n_plus_one(caplog):
+    exposition = scrape(Metrics(n_plus_one_threshold=10), "/users", "/users", "/users/1")
+
+    assert 'db_n_plus_one_suspected_total{route="/users"} 2' in exposition
+    assert 'route="/users/{user_id}"' in exposition and 'db_n_plus_one_suspected_total{route="/users/{user_id}"}' not in exposition
+    assert len([record for record in caplog.records if "Possible N+1" in record.message]) == 1
+
+
+def test_a_failing_collector_does_not_break_the_scrape():
+    metrics = Metrics()
+    metrics.add_collector(lambda: 1 / 0)
+    metrics.add_collector(lambda: ["extra_metric 1"])
+    assert metrics.render().endswith("extra_metric 1\n")
@@ -0,0 +1,105 @@
+"""Migrations from the pre-Alembic schema to head.
+
+The PostgreSQL run needs a disposable database, given as TEST_POSTGRES_URL
+(for example postgresql://postgres@localhost/mental_health_test); it is
+skipped otherwise. Everything in that database is dropped.
+"""
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from services.startup import database_heads, declared_heads, schema_is_current, upgrade_schema
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations", "versions")
+
+# The tables as Base.metadata.create_all made them before migrations existed
+LEGACY_SCHEMA = [
+    """CREATE TABLE users (id VARCHAR NOT NULL PRIMARY KEY, name VARCHAR, email VARCHAR, password_hash VARCHAR,
+       is_active BOOLEAN, created_at DATETIME, last_login DATETIME)""",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE INDEX ix_users_name ON users (name)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    """CREATE TABLE admins (id VARCHAR NOT NULL PRIMARY KEY, name VARCHAR, email VARCHAR, password_hash VARCHAR,
+       is_active BOOLEAN, created_at DATETIME)""",
+    "CREATE INDEX ix_admins_id ON admins (id)",
+    "CREATE INDEX ix_admins_name ON admins (name)",
+    "CREATE UNIQUE INDEX ix_admins_email ON admins (email)",
+    """CREATE TABLE activity_logs (id VARCHAR NOT NULL PRIMARY KEY, user_id VARCHAR, user_name VARCHAR, type VARCHAR,
+       description VARCHAR, details TEXT, ip_address VARCHAR, user_agent VARCHAR, timestamp DATETIME)""",
+    "CREATE INDEX ix_activity_logs_id ON activity_logs (id)",
+    "CREATE INDEX ix_activity_logs_type ON activity_logs (type)",
+]
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    now = datetime(2026, 1, 5, 9, 30)
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(
+            text("INSERT INTO users VALUES ('u1', 'Asha', 'asha@uni.edu', 'hash', 1, :now, NULL)"), {"now": now}
+        )
+        connection.execute(
+            text("INSERT INTO activity_logs (id, user_id, user_name, type, description, details, timestamp) "
+                 "VALUES ('a1', 'u1', 'Asha', 'login', 'Asha logged in', :details, :now), "
+                 "       ('a2', 'u1', 'Asha', 'login', 'Asha logged in', 'not json', :now)"),
+            {"details": '{"method": "password"}', "now": now},
+        )
+    yield engine
+    engine.dispose()
+
+
+def test_upgrades_a_legacy_sqlite_database_to_head(legacy_engine, alembic_config):
+    assert not schema_is_current(legacy_engine, VERSIONS_DIR)
+    assert upgrade_schema(legacy_engine, alembic_config) is True
+
+    assert database_heads(legacy_engine) == declared_heads(VERSIONS_DIR)
+    assert schema_is_current(legacy_engine, VERSIONS_DIR)
+    tables = set(inspect(legacy_engine).get_table_names())
+    assert {"users", "admins", "activity_logs", "stat_counters", "import_jobs", "assessments",
+            "counselors", "bookings", "support_groups", "group_messages"} <= tables
+    with legacy_engine.connect() as connection:
+        user = connection.execute(text("SELECT name, email, version FROM users WHERE id = 'u1'")).one()
+        details = dict(connection.execute(text("SELECT id, details FROM activity_logs")).all())
+    assert tuple(user) == ("Asha", "asha@uni.edu", 1)
+    assert details == {"a1": '{"method": "password"}', "a2": None}  # unparseable details are cleared
+
+
+def test_second_upgrade_is_a_no_op(legacy_engine, alembic_config):
+    assert upgrade_schema(legacy_engine, alembic_config) is True
+    assert upgrade_schema(legacy_engine, alembic_config) is False
+
+
+def test_downgrade_to_base_and_upgrade_again(tmp_path, alembic_config):
+    from alembic import command
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    try:
+        with engine.connect() as connection:
+            alembic_config.attributes["connection"] = connection
+            command.upgrade(alembic_config, "head")
+            command.downgrade(alembic_config, "base")
+        assert set(inspect(engine).get_table_names()) <= {"alembic_version"}
+        assert upgrade_schema(engine, alembic_config) is True
+        assert schema_is_current(engine, VERSIONS_DIR)
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set")
+def test_upgrades_postgresql_to_head(alembic_config):
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA public CASCADE"))
+            connection.execute(text("CREATE SCHEMA public"))
+        # Runs 0002's CREATE INDEX CONCURRENTLY, which fails inside an outer transaction
+        assert upgrade_schema(engine, alembic_config) is True
+        assert schema_is_current(engine, VERSIONS_DIR)
+        assert upgrade_schema(engine, alembic_config) is False
+    finally:
+        engine.dispose()
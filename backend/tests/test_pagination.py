@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+
+from main import USER_SORT_COLUMNS, UserDB, decode_cursor, encode_cursor, keyset_after
+
+
+@pytest.mark.parametrize("sort_by, value", [
+    ("name", "Asha"),
+    ("email", "asha+1@uni.edu"),
+    ("created_at", datetime(2026, 2, 3, 4, 5, 6, 789)),
+    ("last_login", None),
+])
+def test_cursor_round_trip(sort_by, value):
+    cursor = encode_cursor(sort_by, "desc", value, "u1")
+    assert "=" not in cursor
+    assert decode_cursor(cursor, sort_by, "desc") == (value, "u1")
+
+
+def test_cursor_must_match_the_sort_order():
+    cursor = encode_cursor("name", "asc", "Asha", "u1")
+    for sort_by, sort_order in (("name", "desc"), ("email", "asc")):
+        with pytest.raises(HTTPException) as error:
+            decode_cursor(cursor, sort_by, sort_order)
+        assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "bm90IGpzb24", encode_cursor("created_at", "asc", "yesterday", "u1")])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, "created_at", "asc")
+    assert error.value.status_code == 400
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    UserDB.__table__.create(engine)
+    started = datetime(2026, 1, 1)
+    with engine.begin() as connection:
+        # Repeated names and logins, and users who never logged in, so ties and NULLs span pages
+        connection.execute(UserDB.__table__.insert(), [
+            {"id": f"u{number:02d}", "name": f"Student {number % 4}", "email": f"s{number}@uni.edu",
+             "password_hash": "hash", "is_active": True, "created_at": started + timedelta(hours=number),
+             "last_login": None if number % 3 == 0 else started + timedelta(days=number % 5)}
+            for number in range(23)
+        ])
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("sort_by", sorted(USER_SORT_COLUMNS))
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_pages_cover_every_row_once_in_order(engine, sort_by, sort_order):
+    column = USER_SORT_COLUMNS[sort_by]
+    descending = sort_order == "desc"
+    order = (column.desc().nulls_last(), UserDB.id.desc()) if descending else (column.asc().nulls_last(), UserDB.id.asc())
+    with engine.connect() as connection:
+        expected = connection.execute(select(UserDB.id).order_by(*order)).scalars().all()
+
+        seen, cursor = [], None
+        while True:
+            query = select(UserDB.id, column.label("value")).order_by(*order).limit(5)
+            if cursor:
+                value, row_id = decode_cursor(cursor, sort_by, sort_order)
+                query = query.where(keyset_after(column, UserDB.id, value, row_id, descending))
+            page = connection.execute(query).all()
+            if not page:
+                break
+            seen.extend(row.id for row in page)
+            cursor = encode_cursor(sort_by, sort_order, page[-1].value, page[-1].id)
+
+    assert seen == expected
@@ -0,0 +1,76 @@
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from services.password_hashing import HashQueueFull, PasswordHasher
+
+
+class BrokenExecutor:
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("a worker died")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+class AlwaysBrokenHasher(PasswordHasher):
+    def __init__(self):
+        super().__init__(workers=1, max_pending=2)
+        self.executors = []
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = BrokenExecutor()
+            self.executors.append(self._executor)
+        return self._executor
+
+
+def test_hash_and_verify_round_trip():
+    hasher = PasswordHasher(workers=0)
+    try:
+        hashed = hasher.hash("correct horse")
+        assert hasher.verify("correct horse", hashed)
+        assert not hasher.verify("wrong horse", hashed)
+        assert hasher.stats()["completed"] == 3
+        assert hasher.stats()["queue_depth"] == 0
+    finally:
+        hasher.shutdown()
+
+
+def test_process_pool_workers_are_not_forked():
+    hasher = PasswordHasher(workers=1)
+    try:
+        hashed = hasher.hash("correct horse")
+        assert hasher.verify("correct horse", hashed)
+        assert hasher._get_executor()._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        hasher.shutdown()
+
+
+def test_rejects_when_max_pending_jobs_are_queued():
+    hasher = PasswordHasher(workers=0, max_pending=1)
+    release = threading.Event()
+    try:
+        running = hasher._submit(lambda: (release.wait(5), 0.0))
+        with pytest.raises(HashQueueFull):
+            hasher._submit(lambda: ("x", 0.0))
+        release.set()
+        running.result()
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        release.set()
+        hasher.shutdown()
+
+
+def test_failed_retry_after_broken_pool_releases_its_slot():
+    hasher = AlwaysBrokenHasher()
+    for _ in range(5):
+        with pytest.raises(BrokenProcessPool):
+            hasher.hash("secret")
+    # Without releasing the slot the third attempt would have raised HashQueueFull
+    assert hasher.stats()["queue_depth"] == 0
+    assert all(executor.shut_down for executor in hasher.executors[:-1])
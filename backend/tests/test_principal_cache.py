@@ -0,0 +1,73 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from services.principal_cache import Principal, PrincipalCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.principal_cache.time.monotonic", lambda: now[0])
+    return now
+
+
+def principal(email, version=1):
+    return Principal(id=email, name="Asha", email=email, is_active=True, created_at=datetime(2026, 1, 1), version=version)
+
+
+def test_from_row_fills_in_admin_defaults():
+    admin = SimpleNamespace(id="a1", name="Admin", email="admin@uni.edu", is_active=True,
+                            created_at=datetime(2026, 1, 1))
+    assert Principal.from_row(admin) == Principal("a1", "Admin", "admin@uni.edu", True, datetime(2026, 1, 1), None, 1)
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PrincipalCache(ttl=60)
+    cache.put(("user", "a@uni.edu"), principal("a@uni.edu"))
+
+    clock[0] += 59
+    assert cache.get(("user", "a@uni.edu")) == principal("a@uni.edu")
+    clock[0] += 1
+    assert cache.get(("user", "a@uni.edu")) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = PrincipalCache(max_entries=2)
+    cache.put("a", principal("a"))
+    cache.put("b", principal("b"))
+    cache.get("a")
+    cache.put("c", principal("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_drops_a_changed_principal(clock):
+    cache = PrincipalCache()
+    cache.put("a", principal("a"))
+    cache.invalidate("a")
+    cache.invalidate("missing")
+
+    assert cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_a_zero_size_cache_stores_nothing(clock):
+    cache = PrincipalCache(max_entries=0)
+    cache.put("a", principal("a"))
+    assert cache.get("a") is None
+    assert cache.stats()["hit_ratio"] == 0.0
+
+
+def test_entries_from_another_generation_are_stale(clock):
+    cache = PrincipalCache()
+    cache.put("a", principal("a"), generation=1)
+
+    assert cache.get("a", generation=1) == principal("a")
+    assert cache.get("a", generation=2) is None
+    assert cache.get("a", generation=1) is None  # dropped, not kept for the old generation
+    assert cache.stats()["stale"] == 1
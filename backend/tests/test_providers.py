@@ -0,0 +1,93 @@
+import math
+
+import numpy as np
+import pytest
+
+from services.providers import ProviderDatasetError, ProviderDirectory, ProviderSet, haversine_km, load_providers
+
+SPECIALIZATIONS = ["Anxiety", "Depression", "Trauma"]
+
+
+@pytest.fixture(scope="module")
+def providers():
+    rng = np.random.default_rng(7)
+    # Clusters around a city, the antimeridian and a pole, plus a global scatter
+    latitudes = np.concatenate([rng.normal(28.6, 0.3, 400), rng.uniform(-20, 20, 200),
+                                rng.uniform(85, 90, 100), rng.uniform(-90, 90, 300)])
+    longitudes = np.concatenate([rng.normal(77.2, 0.3, 400), rng.choice([-1, 1], 200) * rng.uniform(178, 180, 200),
+                                 rng.uniform(-180, 180, 100), rng.uniform(-180, 180, 300)])
+    latitudes = np.clip(latitudes, -90, 90)
+    records = [{"id": str(number), "name": f"Provider {number}", "specialization": SPECIALIZATIONS[number % 3]}
+               for number in range(len(latitudes))]
+    return ProviderSet(records, latitudes, longitudes, cell_degrees=0.25)
+
+
+def brute_force(providers, lat, lon, specialization=None):
+    distances = haversine_km(math.radians(lat), math.radians(lon), providers.latitudes, providers.longitudes)
+    indexes = [index for index in np.argsort(distances, kind="stable").tolist()
+               if specialization is None or providers.records[index]["specialization"] == specialization]
+    return [(index, float(distances[index])) for index in indexes]
+
+
+QUERIES = [(28.6, 77.2), (0.0, 179.9), (5.0, -179.95), (89.5, 10.0), (-89.9, 0.0), (-45.0, 60.0)]
+
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+@pytest.mark.parametrize("k", [1, 10, 50])
+def test_nearest_matches_brute_force(providers, lat, lon, k):
+    found = providers.nearest(lat, lon, k)
+    expected = brute_force(providers, lat, lon)[:k]
+
+    assert [index for index, _ in found] == [index for index, _ in expected]
+    assert [distance for _, distance in found] == pytest.approx([distance for _, distance in expected])
+
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+@pytest.mark.parametrize("radius_km", [5, 300, 3000])
+def test_within_matches_brute_force(providers, lat, lon, radius_km):
+    found = providers.within(lat, lon, radius_km)
+    expected = [(index, distance) for index, distance in brute_force(providers, lat, lon) if distance <= radius_km]
+    assert [index for index, _ in found] == [index for index, _ in expected]
+
+
+def test_specialization_filter_matches_brute_force(providers):
+    found = providers.nearest(28.6, 77.2, 20, specialization=" trauma ")
+    expected = brute_force(providers, 28.6, 77.2, specialization="Trauma")[:20]
+    assert [index for index, _ in found] == [index for index, _ in expected]
+    assert providers.nearest(28.6, 77.2, 5, specialization="Unknown") == []
+
+
+def test_max_km_bounds_the_search(providers):
+    found = providers.nearest(-45.0, 60.0, 5, max_km=100)
+    assert all(distance <= 100 for _, distance in found)
+    assert len(found) < 5
+
+
+def test_load_skips_invalid_rows(tmp_path):
+    path = tmp_path / "providers.csv"
+    path.write_text("Name,Latitude,Longitude,Specialization\n"
+                    "Clinic A,28.61,77.21,Anxiety\n"
+                    ",28.6,77.2,\n"
+                    "Clinic B,north,77.2,\n"
+                    "Clinic C,95,77.2,\n"
+                    "Clinic D,28.7,77.3,\n")
+    providers = load_providers(str(path))
+
+    assert len(providers) == 2
+    assert providers.skipped == 3
+    index, distance = providers.nearest(28.61, 77.21, 1)[0]
+    assert providers.record(index, distance)["name"] == "Clinic A"
+
+
+def test_reload_keeps_the_current_set_when_the_new_file_is_bad(tmp_path):
+    good = tmp_path / "providers.ndjson"
+    good.write_text('{"name": "Clinic A", "latitude": 1, "longitude": 2}\n')
+    bad = tmp_path / "bad.csv"
+    bad.write_text("name,lat,lon\nClinic,1,2\n")
+    directory = ProviderDirectory(str(good))
+    current = directory.reload()
+
+    with pytest.raises(ProviderDatasetError):
+        directory.reload(str(bad))
+    assert directory.current is current
+    assert "latitude" in directory.stats()["last_error"]
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from services.rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.rate_limiter.time.monotonic", lambda: now[0])
+    return now
+
+
+def hits(limiter, key, count):
+    async def run():
+        return [await limiter.hit(key) for _ in range(count)]
+
+    return asyncio.run(run())
+
+
+def test_a_burst_up_to_the_limit_is_allowed_then_denied(clock):
+    limiter = RateLimiter(limit=5, period=60)
+
+    assert hits(limiter, "ip", 5) == [0.0] * 5
+    assert hits(limiter, "ip", 1) == [pytest.approx(12.0)]  # one token every 60 / 5 seconds
+    assert hits(limiter, "other", 1) == [0.0]  # keys are independent
+
+
+def test_tokens_come_back_one_interval_at_a_time(clock):
+    limiter = RateLimiter(limit=5, period=60)
+    hits(limiter, "ip", 5)
+
+    clock[0] += 11.9
+    assert hits(limiter, "ip", 1)[0] == pytest.approx(0.1)
+    clock[0] += 0.1
+    assert hits(limiter, "ip", 2) == [0.0, pytest.approx(12.0)]
+
+    clock[0] += 60
+    assert hits(limiter, "ip", 5) == [0.0] * 5
+
+
+def test_denied_hits_do_not_push_the_retry_time_back(clock):
+    limiter = RateLimiter(limit=2, period=10)
+    hits(limiter, "ip", 2)
+
+    assert hits(limiter, "ip", 3) == [pytest.approx(5.0)] * 3
+    clock[0] += 5
+    assert hits(limiter, "ip", 1) == [0.0]
+
+
+def test_reset_forgets_a_key(clock):
+    limiter = RateLimiter(limit=1, period=60)
+    hits(limiter, "ip", 1)
+    asyncio.run(limiter.reset("ip"))
+    assert hits(limiter, "ip", 1) == [0.0]
+
+
+def test_refilled_buckets_are_dropped_and_keys_are_bounded(clock):
+    limiter = RateLimiter(limit=5, period=60, max_keys=3)
+    for number in range(5):
+        hits(limiter, f"ip{number}", 1)
+    stats = limiter.stats()
+    assert stats["tracked_keys"] == 3
+    assert stats["evictions"] == 2
+
+    clock[0] += 60
+    hits(limiter, "late", 1)
+    assert limiter.stats()["tracked_keys"] == 1
+
+
+def test_disabled_limiter_allows_everything(clock):
+    assert hits(RateLimiter(limit=0, period=60), "ip", 100) == [0.0] * 100
+
+
+class FailingStore:
+    async def hit(self, key, interval, period):
+        raise ConnectionError("store is down")
+
+    async def reset(self, key):
+        raise ConnectionError("store is down")
+
+
+def test_falls_back_to_local_buckets_when_the_store_fails(clock):
+    limiter = RateLimiter(limit=1, period=60, store=FailingStore())
+
+    assert hits(limiter, "ip", 2) == [0.0, pytest.approx(60.0)]
+    asyncio.run(limiter.reset("ip"))
+    assert limiter.stats()["store_errors"] == 3
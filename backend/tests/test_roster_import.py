@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from main import ImportJobDB, StatCounterDB, UserDB
+from services.roster_import import RosterImporter, clean_record
+from services.stats_counters import StatsCounters
+
+
+class PlainHasher:
+    """Stands in for the bcrypt pool, which has its own tests"""
+
+    def hash_many(self, passwords):
+        return [f"hashed:{password}" for password in passwords]
+
+
+class GatedHasher(PlainHasher):
+    """Holds every chunk until the test opens the gate"""
+
+    def __init__(self):
+        self.hashing = threading.Event()
+        self.gate = threading.Event()
+
+    def hash_many(self, passwords):
+        self.hashing.set()
+        assert self.gate.wait(10)
+        return super().hash_many(passwords)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'roster.db'}")
+    for model in (UserDB, ImportJobDB, StatCounterDB):
+        model.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    with factory.begin() as session:
+        session.add(UserDB(id="u0", name="Existing", email="taken@uni.edu", password_hash="x"))
+        session.add_all([StatCounterDB(name="users_total", value=1), StatCounterDB(name="users_active", value=1)])
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def importer(session_factory):
+    counters = StatsCounters(session_factory, StatCounterDB)
+    importer = RosterImporter(session_factory, UserDB, ImportJobDB, PlainHasher(), counters, chunk_size=2)
+    yield importer
+    importer.stop()
+
+
+def run_import(importer, tmp_path, name, content, file_format):
+    path = tmp_path / name
+    path.write_text(content)
+    finished = threading.Event()
+    jobs = []
+    importer.submit(str(path), file_format, created_by="a1", on_finish=lambda job: (jobs.append(job), finished.set()))
+    assert finished.wait(10)
+    assert not path.exists()  # the importer removes the upload
+    return jobs[0]
+
+
+def test_clean_record_normalizes_and_validates():
+    assert clean_record({"name": " Asha ", "email": "Asha@Uni.edu", "password": "pw", "department": ""}) == \
+        ("Asha", "Asha@uni.edu", "pw", None)
+    for record in ({"email": "a@uni.edu", "password": "pw"}, {"name": "A", "email": "a@uni.edu"},
+                   {"name": "A", "email": "not an email", "password": "pw"}):
+        with pytest.raises(ValueError):
+            clean_record(record)
+
+
+def test_csv_import_skips_duplicates_and_invalid_rows(importer, session_factory, tmp_path):
+    job = run_import(importer, tmp_path, "roster.csv", (
+        "Name,Email,Password,Department\n"
+        "Asha,asha@uni.edu,pw1,Physics\n"
+        "Ben,ben@uni.edu,pw2,\n"
+        "Asha Again,asha@uni.edu,pw3,\n"
+        ",nameless@uni.edu,pw4,\n"
+        "\n"
+        "Old,taken@uni.edu,pw5,\n"
+        "Chen,chen@uni.edu,pw6,Maths\n"
+    ), "csv")
+
+    assert job["status"] == "completed"
+    assert (job["total_rows"], job["processed_rows"]) == (6, 6)
+    assert (job["created_count"], job["duplicate_count"], job["invalid_count"]) == (3, 2, 1)
+    assert {error["error"] for error in job["errors"]} == {
+        "duplicate email in roster", "name is required", "email already registered"}
+    with session_factory() as session:
+        users = dict(session.execute(select(UserDB.email, UserDB.password_hash)).all())
+        counters = dict(session.execute(select(StatCounterDB.name, StatCounterDB.value)).all())
+    assert users["asha@uni.edu"] == "hashed:pw1"
+    assert len(users) == 4
+    assert counters == {"users_total": 4, "users_active": 4}
+
+
+def test_ndjson_import_reports_bad_lines(importer, tmp_path):
+    job = run_import(importer, tmp_path, "roster.ndjson", (
+        '{"name": "Asha", "email": "asha@uni.edu", "password": "pw"}\n'
+        "not json\n"
+        '["a", "list"]\n'
+    ), "ndjson")
+
+    assert job["status"] == "completed"
+    assert (job["created_count"], job["invalid_count"]) == (1, 2)
+    assert [error["row"] for error in job["errors"]] == [2, 3]
+
+
+def test_a_bad_header_fails_the_job(importer, tmp_path):
+    job = run_import(importer, tmp_path, "roster.csv", "name,mail\nAsha,asha@uni.edu\n", "csv")
+
+    assert job["status"] == "failed"
+    assert "email" in job["errors"][0]["error"]
+    assert importer.stats()["failed"] == 1
+
+
+def test_unsupported_format_is_rejected(importer, tmp_path):
+    with pytest.raises(ValueError):
+        importer.submit(str(tmp_path / "roster.xlsx"), "xlsx")
+
+
+def write_roster(tmp_path, prefix, rows):
+    path = tmp_path / f"{prefix}.csv"
+    path.write_text("name,email,password\n" + "".join(f"S{row},{prefix}{row}@uni.edu,pw\n" for row in range(rows)))
+    return str(path)
+
+
+def test_stop_interrupts_unfinished_jobs_and_removes_their_uploads(session_factory, tmp_path):
+    hasher = GatedHasher()
+    importer = RosterImporter(session_factory, UserDB, ImportJobDB, hasher,
+                              StatsCounters(session_factory, StatCounterDB), chunk_size=2)
+    running_path, queued_path = write_roster(tmp_path, "running", 5), write_roster(tmp_path, "queued", 3)
+    running, queued = importer.submit(running_path, "csv"), importer.submit(queued_path, "csv")
+    assert hasher.hashing.wait(10)
+
+    stopping = threading.Thread(target=importer.stop)
+    stopping.start()
+    time.sleep(0.2)  # stop cancels the queued job, then waits for the running one's chunk
+    hasher.gate.set()
+    stopping.join(10)
+
+    running_job, queued_job = importer.get(running), importer.get(queued)
+    assert (running_job["status"], running_job["created_count"]) == ("interrupted", 2)
+    assert (queued_job["status"], queued_job["started_at"]) == ("interrupted", None)
+    assert queued_job["errors"] == [{"row": None, "error": "the server stopped before the import started"}]
+    assert not os.path.exists(running_path) and not os.path.exists(queued_path)
+
+
+def test_start_interrupts_jobs_abandoned_by_a_stopped_worker(importer, session_factory, tmp_path):
+    upload = tmp_path / "abandoned.csv"
+    upload.write_text("name,email,password\n")
+    stale = datetime.utcnow() - timedelta(hours=1)
+    with session_factory.begin() as session:
+        session.add_all([
+            ImportJobDB(id="abandoned", status="queued", format="csv", heartbeat_at=stale, spool_path=str(upload)),
+            ImportJobDB(id="alive", status="running", format="csv", heartbeat_at=datetime.utcnow()),
+            ImportJobDB(id="finished", status="completed", format="csv", heartbeat_at=stale),
+        ])
+
+    importer.start()
+
+    assert {job_id: importer.get(job_id)["status"] for job_id in ("abandoned", "alive", "finished")} == {
+        "abandoned": "interrupted", "alive": "running", "finished": "completed"}
+    assert not upload.exists()
+    assert importer.stats()["interrupted"] == 1
@@ -0,0 +1,116 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from services.scheduler import PriorityMiddleware, PriorityScheduler, SchedulerBusy, current_priority, route_classifier
+
+
+def test_reserved_slots_are_left_for_crisis_requests():
+    async def scenario():
+        scheduler = PriorityScheduler(max_concurrency=3, reserved=1)
+        await scheduler.acquire("interactive")
+        await scheduler.acquire("interactive")
+        waiting = asyncio.create_task(scheduler.acquire("interactive"))
+        await asyncio.sleep(0)
+        queued_behind_reserve = not waiting.done()
+        await asyncio.wait_for(scheduler.acquire("crisis"), 0.1)  # the reserved slot
+        scheduler.release("interactive")
+        await asyncio.wait_for(waiting, 0.1)
+        return queued_behind_reserve, scheduler.stats()["classes"]
+
+    queued_behind_reserve, classes = asyncio.run(scenario())
+    assert queued_behind_reserve
+    assert classes["interactive"]["in_flight"] == 2
+    assert classes["crisis"]["in_flight"] == 1
+
+
+def test_freed_slots_go_to_the_highest_waiting_class():
+    async def scenario():
+        scheduler = PriorityScheduler(max_concurrency=1, reserved=0)
+        await scheduler.acquire("bulk")
+        order = []
+
+        async def request(priority):
+            await scheduler.acquire(priority)
+            order.append(priority)
+            scheduler.release(priority)
+
+        waiters = [asyncio.create_task(request(priority)) for priority in ("bulk", "interactive", "crisis")]
+        await asyncio.sleep(0)
+        scheduler.release("bulk")
+        await asyncio.gather(*waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["crisis", "interactive", "bulk"]
+
+
+def test_bulk_requests_have_their_own_cap_and_queue():
+    async def scenario():
+        scheduler = PriorityScheduler(max_concurrency=10, reserved=0, bulk_concurrency=1, bulk_queue=1)
+        await scheduler.acquire("bulk")
+        queued = asyncio.create_task(scheduler.acquire("bulk"))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusy):
+            await scheduler.acquire("bulk")
+        await asyncio.wait_for(scheduler.acquire("interactive"), 0.1)  # other classes are unaffected
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        return scheduler.stats()["classes"]["bulk"]
+
+    bulk = asyncio.run(scenario())
+    assert bulk["shed"] == 1
+    assert bulk["queued"] == 0  # the cancelled waiter left the queue
+
+
+def test_requests_waiting_past_the_timeout_are_shed():
+    async def scenario():
+        scheduler = PriorityScheduler(max_concurrency=1, reserved=0, interactive_timeout=0.01)
+        await scheduler.acquire("interactive")
+        with pytest.raises(SchedulerBusy):
+            await scheduler.acquire("interactive")
+        return scheduler.stats()["classes"]["interactive"]
+
+    interactive = asyncio.run(scenario())
+    assert interactive["shed"] == 1
+    assert interactive["queued"] == 0
+
+
+def test_route_classifier_uses_the_first_matching_rule():
+    classify = route_classifier([
+        (None, None, "/health"),
+        ("crisis", ("POST",), "/crisis/*"),
+        ("bulk", ("GET",), "/admin/activities/export"),
+    ])
+    assert classify("GET", "/health") is None
+    assert classify("POST", "/crisis/help") == "crisis"
+    assert classify("GET", "/crisis/help") == "interactive"
+    assert classify("GET", "/admin/activities/export") == "bulk"
+    assert classify("GET", "/admin/activities/export/more") == "interactive"
+
+
+def test_middleware_sheds_with_503_and_retry_after():
+    async def scenario():
+        scheduler = PriorityScheduler(max_concurrency=1, reserved=0, bulk_queue=0)
+        seen = []
+
+        async def endpoint(request):
+            seen.append(current_priority.get())
+            return PlainTextResponse("ok")
+
+        app = PriorityMiddleware(Starlette(routes=[Route("/export", endpoint)]), scheduler,
+                                 route_classifier([("bulk", None, "/export")]), retry_after=3)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            served = await client.get("/export")
+            await scheduler.acquire("interactive")  # take the only slot
+            shed = await client.get("/export")
+        return served, shed, seen, scheduler.stats()["classes"]["bulk"]
+
+    served, shed, seen, bulk = asyncio.run(scenario())
+    assert served.status_code == 200 and seen == ["bulk"]
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "3"
+    assert bulk["in_flight"] == 0
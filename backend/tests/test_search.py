@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from services.search import FullTextSearch, SearchUnavailable, search_terms
+from services.startup import upgrade_schema
+
+
+@pytest.fixture
+def engine(tmp_path, alembic_config):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    upgrade_schema(engine, alembic_config)
+    with engine.connect() as connection:
+        if not connection.execute(text("SELECT name FROM sqlite_master WHERE name = 'users_fts'")).first():
+            pytest.skip("this SQLite build has no FTS5")
+    yield engine
+    engine.dispose()
+
+
+def add_users(engine, *users):
+    started = datetime(2026, 3, 1)
+    with engine.begin() as connection:
+        for number, (name, email) in enumerate(users):
+            connection.execute(
+                text("INSERT INTO users (id, name, email, password_hash, is_active, created_at, version) "
+                     "VALUES (:id, :name, :email, 'hash', 1, :created_at, 1)"),
+                {"id": f"u{number}", "name": name, "email": email,
+                 "created_at": started + timedelta(minutes=number)},
+            )
+
+
+def run(engine, statement):
+    with engine.connect() as connection:
+        return [row._asdict() for row in connection.execute(statement).all()]
+
+
+def test_search_terms_tokenize_like_the_index():
+    assert search_terms("Ana  O'Brien ana_s@uni.edu") == ["ana", "o", "brien", "ana", "s", "uni", "edu"]
+    assert search_terms("* OR NEAR(") == ["or", "near"]
+    assert len(search_terms("a " * 20)) == 8
+
+
+def test_match_expression_quotes_sqlite_input_and_prefixes_the_last_term():
+    assert FullTextSearch("sqlite").match_expression(["ana", "sm"]) == '"ana" "sm"*'
+    assert FullTextSearch("postgresql").match_expression(["ana", "sm"]) == "ana & sm:*"
+
+
+def test_unsupported_dialect():
+    with pytest.raises(SearchUnavailable):
+        FullTextSearch("mysql")
+
+
+def test_last_term_matches_as_a_prefix(engine):
+    add_users(engine, ("Ana Smith", "ana@uni.edu"), ("Anand Rao", "anand@uni.edu"), ("Ben Smithers", "ben@uni.edu"))
+    search = FullTextSearch("sqlite")
+
+    names = {row["name"] for row in run(engine, search.users(["ana", "sm"], 10))}
+    assert names == {"Ana Smith"}  # earlier terms match whole words only
+    names = {row["name"] for row in run(engine, search.users(["smi"], 10))}
+    assert names == {"Ana Smith", "Ben Smithers"}
+    assert [row["email"] for row in run(engine, search.users(["anand", "uni"], 10))] == ["anand@uni.edu"]
+
+
+def test_name_matches_rank_above_email_matches(engine):
+    add_users(engine, ("Priya Shah", "kiran@uni.edu"), ("Kiran Das", "kd@uni.edu"))
+    rows = run(engine, FullTextSearch("sqlite").users(["kiran"], 10))
+
+    assert [row["name"] for row in rows] == ["Kiran Das", "Priya Shah"]
+    assert rows[0]["score"] > rows[1]["score"]
+    assert not any(row["ranked_recent_only"] for row in rows)
+
+
+def test_only_the_newest_candidates_are_ranked(engine):
+    add_users(engine, *[(f"Student {number}", f"s{number}@uni.edu") for number in range(10)])
+
+    rows = run(engine, FullTextSearch("sqlite", candidates=4).users(["student"], 4))
+    assert {row["id"] for row in rows} == {"u6", "u7", "u8", "u9"}
+    assert all(row["ranked_recent_only"] for row in rows)
+
+    rows = run(engine, FullTextSearch("sqlite", candidates=10).users(["student"], 10))
+    assert len(rows) == 10
+    assert not any(row["ranked_recent_only"] for row in rows)
+
+
+def test_a_page_past_the_candidates_widens_them(engine):
+    add_users(engine, *[(f"Student {number}", f"s{number}@uni.edu") for number in range(10)])
+
+    rows = run(engine, FullTextSearch("sqlite", candidates=2).users(["student"], 3, offset=3))
+    assert len(rows) == 3
@@ -0,0 +1,28 @@
+import threading
+import time
+
+from sqlalchemy import create_engine
+
+from services.startup import deployment_lock
+
+
+def test_deployment_lock_serializes_workers_sharing_a_database(tmp_path):
+    # Separate engines, as in separate worker processes
+    engines = [create_engine(f"sqlite:///{tmp_path / 'shared.db'}") for _ in range(2)]
+    events = []
+
+    def worker(engine, name):
+        with deployment_lock(engine, "test"):
+            events.append(f"{name} in")
+            time.sleep(0.05)
+            events.append(f"{name} out")
+
+    threads = [threading.Thread(target=worker, args=(engine, name)) for engine, name in zip(engines, "ab")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for engine in engines:
+        engine.dispose()
+
+    assert events in (["a in", "a out", "b in", "b out"], ["b in", "b out", "a in", "a out"])
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from sqlalchemy import BigInteger, Column, String, create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from services.stats_counters import SharedGeneration, StatsCounters
+
+Base = declarative_base()
+
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'counters.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory.begin() as session:
+        session.add_all([StatCounter(name="users_total", value=10), StatCounter(name="users_active", value=8)])
+    yield factory
+    engine.dispose()
+
+
+def stored(session_factory):
+    with session_factory() as session:
+        return dict(session.execute(select(StatCounter.name, StatCounter.value)).all())
+
+
+def test_increments_commit_with_the_counted_change(session_factory):
+    counters = StatsCounters(session_factory, StatCounter)
+    counters.refresh()
+    with session_factory.begin() as session:
+        counters.incr_sync(session, {"users_total": 1, "users_active": 1})
+
+    assert stored(session_factory) == {"users_total": 11, "users_active": 9}
+    assert counters.snapshot() == {"users_total": 11, "users_active": 9}
+
+
+def test_rolled_back_increments_never_reach_the_snapshot(session_factory):
+    counters = StatsCounters(session_factory, StatCounter)
+    counters.refresh()
+    with session_factory() as session:
+        counters.incr_sync(session, {"users_active": -1})
+        assert counters.get("users_active") == 8  # not before the commit
+        session.rollback()
+        counters.incr_sync(session, {"users_total": 2})
+        counters.incr_sync(session, {"users_total": 1})
+        session.commit()
+
+    assert counters.snapshot() == {"users_total": 13, "users_active": 8}
+    assert stored(session_factory) == counters.snapshot()
+
+
+def test_refresh_picks_up_other_workers(session_factory):
+    ours, theirs = StatsCounters(session_factory, StatCounter), StatsCounters(session_factory, StatCounter)
+    ours.refresh()
+    with session_factory.begin() as session:
+        theirs.incr_sync(session, {"users_total": 5, "users_active": 0})
+
+    assert ours.get("users_total") == 10
+    ours.refresh()
+    assert ours.get("users_total") == 15
+    assert ours.get("missing", default=None) is None
+
+
+def test_shared_generation_is_polled_and_read_after_a_local_commit(session_factory, tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.stats_counters.time.monotonic", lambda: now[0])
+    with session_factory.begin() as session:
+        session.add(StatCounter(name="generation", value=0))
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'counters.db'}")
+        factory = async_sessionmaker(engine)
+        ours, theirs = (SharedGeneration(StatCounter, "generation", poll_interval=1.0) for _ in range(2))
+        seen = []
+        async with factory() as session:
+            seen.append(await ours.current(session))
+            async with factory() as other_worker:
+                await theirs.bump(other_worker)
+                await other_worker.commit()
+            seen.append(await ours.current(session))  # within the poll interval
+            now[0] += 1.0
+            seen.append(await ours.current(session))
+            await ours.bump(session)
+            await session.commit()
+            seen.append(await ours.current(session))  # a local commit is seen at once
+        await engine.dispose()
+        return seen
+
+    assert asyncio.run(scenario()) == [0, 0, 1, 2]
+
+
+def test_shared_generation_bump_rolls_back_with_the_change(session_factory):
+    with session_factory.begin() as session:
+        session.add(StatCounter(name="generation", value=0))
+    generation = SharedGeneration(StatCounter, "generation")
+    with session_factory.begin() as session:
+        generation.bump_sync(session)
+    with session_factory() as session:
+        generation.bump_sync(session)
+        session.rollback()
+
+    assert stored(session_factory)["generation"] == 1
@@ -418,9 +418,10 @@ export const AuthProvider = ({ children }) => {
   // Admin functions
   const adminActions = {
     // Get all users
-    getAllUsers: async (sortBy = 'created_at', sortOrder = 'desc') => {
+    getAllUsers: async (sortBy = 'created_at', sortOrder = 'desc', cursor = null, limit = 50) => {
       try {
-        const data = await apiRequest(`/admin/users?sort_by=${sortBy}&sort_order=${sortOrder}`);
+        const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+        const data = await apiRequest(`/admin/users?sort_by=${sortBy}&sort_order=${sortOrder}&limit=${limit}${cursorParam}`);
         return { success: true, data };
       } catch (error) {
         return { success: false, error: error.message };